@@ -0,0 +1,104 @@
+"""
+Measure the memory parsed records take and the garbage collector work processing a log causes, with tracemalloc and
+gc.get_stats(). Records are kept as GCEvent objects: compare the bytes each takes against the namedtuple record
+holding a GCSizeInfo namedtuple that garbagedog.parser returned before, and run it on an earlier commit to compare
+the end to end numbers:
+
+    python benchmarks/bench_allocations.py --events 20000
+"""
+import argparse
+import contextlib
+import gc
+import os
+import tracemalloc
+from collections import namedtuple
+
+from typing import Any, Callable, List, Tuple
+
+from garbagedog.event_processor import GCEventProcessor
+from garbagedog.parser import GCEvent, RecordAssembler, parse_record
+from gc_log_generator import generate_gc_log
+
+# The record garbagedog.parser returned before GCEvent
+LegacyRecord = namedtuple("LegacyRecord", ["timestamp", "event_type", "duration", "size_info", "generation",
+                                           "stopped_time", "safepoint_time"])
+
+
+class NullStats(object):
+    def timing(self, *args, **kwargs):
+        pass
+
+    histogram = gauge = increment = timing
+
+
+def legacy_record(event: GCEvent) -> LegacyRecord:
+    return LegacyRecord(event.timestamp, event.event_type, event.duration, event.size_info, event.generation,
+                        event.stopped_time, event.safepoint_time)
+
+
+def gcevent_record(event: GCEvent) -> GCEvent:
+    return GCEvent(event.timestamp, event.event_type, event.duration, event.generation, event.stopped_time,
+                   event.safepoint_time, event.young_begin_k, event.young_end_k, event.young_total_k,
+                   event.whole_heap_begin_k, event.whole_heap_end_k, event.whole_heap_total_k)
+
+
+def retained_bytes(build: Callable[[GCEvent], Any], events: List[GCEvent]) -> float:
+    """
+    :return: Bytes per record of keeping a list of `build(event)` for every event. The fields are shared with
+             `events`, so this counts only what holding them in a record adds.
+    """
+    gc.collect()
+    tracemalloc.start()
+    records = [build(event) for event in events]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size / len(events)
+
+
+def gen0_collections() -> int:
+    return gc.get_stats()[0]["collections"]
+
+
+def process(lines: List[str]) -> Tuple[int, int]:
+    """
+    :return: Tuple of (peak bytes traced, young generation collections) processing `lines`
+    """
+    processor = GCEventProcessor("localhost", "9", None, stats=NullStats())
+    gc.collect()
+    tracemalloc.start()
+    collections = gen0_collections()
+    # GCEventProcessor prints promotion failures
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for line in lines:
+            processor._process_line(line)
+    collections = gen0_collections() - collections
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, collections
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    lines = generate_gc_log(args.events, args.seed)
+    assembler = RecordAssembler()
+    records = [record for record in (assembler.add_line(line.rstrip()) for line in lines) if record]
+    events = [event for event in (parse_record(record) for record in records) if event]
+    sized = [event for event in events if event.young_begin_k is not None]
+
+    print("{} records, {} with sizes".format(len(events), len(sized)))
+    for name, build in (("namedtuple", legacy_record), ("GCEvent", gcevent_record)):
+        print("{:>12} {:>8.1f} bytes/record {:>8.1f} bytes/sized record".format(
+            name, retained_bytes(build, events), retained_bytes(build, sized)))
+
+    peak, collections = process(lines)
+    print("processing {} lines: peak {:.1f} KB traced, {} young generation collections, {:.2f} per 1000 events"
+          .format(len(lines), peak / 1024, collections, collections * 1000 / args.events))
+
+
+if __name__ == "__main__":
+    main()
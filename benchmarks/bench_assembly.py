@@ -0,0 +1,79 @@
+"""
+Compare lines/sec of assembling records by string concatenation, as GCEventProcessor used to, against
+garbagedog.parser.RecordAssembler, on -XX:+PrintHeapAtGC -XX:+PrintTenuringDistribution heavy logs and on a record that
+never ends.
+
+    python benchmarks/bench_assembly.py --records 20000
+"""
+import argparse
+import time
+
+from garbagedog.parser import classify_line, RecordAssembler, RECORD_START, CONFLATED
+
+HEAP_BLOCK = """ par new generation   total 78656K, used 69952K [0x00000006c0000000, 0x00000006c5550000, 0x00000006eaaa0000)
+  eden space 69952K, 100% used [0x00000006c0000000, 0x00000006c4450000, 0x00000006c4450000)
+  from space 8704K,   0% used [0x00000006c4450000, 0x00000006c4450000, 0x00000006c4cd0000)
+  to   space 8704K,   0% used [0x00000006c4cd0000, 0x00000006c4cd0000, 0x00000006c5550000)
+ concurrent mark-sweep generation total 174784K, used 0K [0x00000006eaaa0000, 0x00000006f5550000, 0x00000007c0000000)
+ Metaspace       used 14212K, capacity 14446K, committed 14720K, reserved 1062912K
+  class space    used 1712K, capacity 1800K, committed 1920K, reserved 1048576K
+"""
+GC_RECORD = "{{Heap before GC invocations={0} (full 0):\n" + HEAP_BLOCK + \
+    "2017-07-27T18:01:22.410+0000: 1.025: [GC (Allocation Failure) 2017-07-27T18:01:22.410+0000: 1.025: [ParNew\n" \
+    "Desired survivor size 4456448 bytes, new threshold 15 (max 15)\n" + \
+    "".join("- age  {0:2d}:    6171496 bytes,    {1} total\n".format(age, age * 6171496) for age in range(1, 16)) + \
+    ": 69952K->6082K(78656K), 0.0148812 secs] 69952K->6082K(253440K), 0.0149906 secs] " \
+    "[Times: user=0.04 sys=0.01, real=0.02 secs]\n" \
+    "Heap after GC invocations={0} (full 0):\n" + HEAP_BLOCK + "}}\n"
+
+
+def concatenate(lines: list) -> int:
+    records = 0
+    previous_record = ""
+    for line in lines:
+        stripped_line = line.rstrip()
+        line_class, split = classify_line(stripped_line)
+        if line_class == RECORD_START:
+            records += 1
+            previous_record = stripped_line
+        elif line_class == CONFLATED:
+            records += 1
+            previous_record = stripped_line[split:]
+        else:
+            previous_record = previous_record + " " + stripped_line
+    return records
+
+
+def assemble(lines: list) -> int:
+    records = 0
+    assembler = RecordAssembler()
+    for line in lines:
+        if assembler.add_line(line.rstrip()) is not None:
+            records += 1
+    return records
+
+
+def lines_per_second(function, lines: list) -> float:
+    start = time.monotonic()
+    function(lines)
+    return len(lines) / (time.monotonic() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--endless-lines", type=int, default=50000)
+    args = parser.parse_args()
+
+    cases = [
+        ("PrintHeapAtGC", "".join(GC_RECORD.format(i) for i in range(args.records)).splitlines(True)),
+        ("endless record", ["2017-07-27T18:01:22.410+0000: 1.025: [GC\n"] +
+         [" garbage that never ends a record\n"] * args.endless_lines),
+    ]
+    for name, lines in cases:
+        for label, function in [("concatenation", concatenate), ("RecordAssembler", assemble)]:
+            print("{:>16} {:>16} {:>12.0f} lines/s".format(name, label, lines_per_second(function, lines)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Compare MB/sec of replaying a whole gc.log line by line through GCEventProcessor, like --log-dir or stdin do, against
+--backfill with one and with several parser processes.
+
+    python benchmarks/bench_backfill.py --megabytes 200 --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from garbagedog.backfill import backfill
+from garbagedog.event_processor import GCEventProcessor
+
+PAR_NEW_LINE = "{}: 2.346: [GC (Allocation Failure) {}: 2.346: [ParNew: 76034K->8704K(78656K), 0.0312710 secs] " \
+               "76034K->19240K(253440K), 0.0313630 secs] [Times: user=0.09 sys=0.01, real=0.03 secs]\n"
+FULL_GC_LINES = "{}: 6.127: [Full GC (Allocation Failure) 6.127: [CMS: 52101K->30562K(174784K), 0.0952091 secs]\n" \
+                " 128935K->30562K(253440K), [Metaspace: 21032K->21032K(1069056K)], 0.0953022 secs]\n" \
+                " [Times: user=0.09 sys=0.00, real=0.10 secs]\n"
+
+
+class NullStats(object):
+    def timing(self, *args, **kwargs):
+        pass
+
+    histogram = gauge = increment = timing
+
+
+def write_log(path: str, megabytes: int) -> None:
+    now = 1500000000.0
+    with open(path, "w") as f:
+        while f.tell() < megabytes * 1024 * 1024:
+            for i in range(1000):
+                now += 0.25
+                timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now)) + ".{:03d}+0000".format(
+                    int(now * 1000) % 1000)
+                f.write(FULL_GC_LINES.format(timestamp) if i % 50 == 0 else PAR_NEW_LINE.format(timestamp, timestamp))
+
+
+def line_by_line(path: str) -> float:
+    processor = GCEventProcessor("localhost", "9", None, stats=NullStats())
+    start = time.monotonic()
+    with open(path) as f:
+        for line in f:
+            processor._process_line(line)
+    return time.monotonic() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        path = os.path.join(log_dir, "gc.log")
+        write_log(path, args.megabytes)
+        megabytes = os.path.getsize(path) / (1024 * 1024)
+
+        print("{:>24} {:>10.1f} MB/s".format("line by line", megabytes / line_by_line(path)))
+        for workers in sorted({1, args.workers}):
+            processor = GCEventProcessor("localhost", "9", None, stats=NullStats())
+            result = backfill([path], processor, workers=workers, chunk_bytes=4 * 1024 * 1024)
+            print("{:>24} {:>10.1f} MB/s".format("backfill, {} workers".format(workers), megabytes / result.seconds))
+
+
+if __name__ == "__main__":
+    main()
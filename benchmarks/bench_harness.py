@@ -0,0 +1,190 @@
+"""
+Benchmark each parsing stage and end-to-end processing on a synthetic GC log (see gc_log_generator.py), sending to a
+stub DogStatsd that formats packets but never touches a socket. A unified logging G1 log of as many events is processed
+too, to compare the throughput of the two parsers per GC event. Save results as JSON to compare across commits:
+
+    python benchmarks/bench_harness.py --events 20000 --output before.json
+    git checkout my-branch
+    python benchmarks/bench_harness.py --events 20000 --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+
+from datadog.dogstatsd.base import DogStatsd
+from typing import Any, Callable, Dict, List, Optional
+
+from garbagedog.constants import GCEventType
+from garbagedog.event_processor import GCEventProcessor
+from garbagedog.parser import RecordAssembler, parse_record
+from garbagedog.unified import UnifiedLogParser
+from garbagedog.utils import parse_line_for_sizes, parse_line_for_times
+from gc_log_generator import generate_gc_log, generate_unified_gc_log
+
+# Stages slower than this fraction of the baseline are flagged by --compare
+REGRESSION_THRESHOLD = 0.9
+
+
+class StubDogStatsd(DogStatsd):
+    """DogStatsd that builds every packet as usual, then counts it instead of sending it"""
+
+    def __init__(self) -> None:
+        super().__init__(host="localhost", port=8125)
+        self.packets = 0
+        self.bytes = 0
+
+    def _send_to_server(self, packet, *args, **kwargs):
+        self.packets += 1
+        self.bytes += len(packet)
+
+
+def time_stage(function: Callable[[Any], Any], items: List[Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def assemble(lines: List[str]) -> List[str]:
+    assembler = RecordAssembler()
+    records = [assembler.add_line(line.rstrip()) for line in lines]
+    return [record for record in records if record]
+
+
+def pick_unified(lines: List[str]) -> List[str]:
+    log_parser = UnifiedLogParser()
+    records = [log_parser.add_line(line.rstrip()) for line in lines]
+    return [record for record in records if record]
+
+
+def process(lines: List[str], repeat: int) -> tuple:
+    """
+    :return: Tuple of (best seconds, stats of the last run)
+    """
+    best = float("inf")
+    stats = StubDogStatsd()
+    # GCEventProcessor prints promotion failures
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            stats = StubDogStatsd()
+            processor = GCEventProcessor("localhost", "8125", None, stats=stats)
+            start = time.perf_counter()
+            for line in lines:
+                processor._process_line(line)
+            best = min(best, time.perf_counter() - start)
+    return best, stats
+
+
+def run(events: int, seed: int, repeat: int) -> Dict[str, Any]:
+    lines = generate_gc_log(events, seed)
+    records = assemble(lines)
+
+    stages = {}  # type: Dict[str, Dict[str, float]]
+
+    def record_stage(name, seconds, count):
+        stages[name] = {"seconds": seconds, "per_second": count / seconds}
+
+    record_stage("assemble_records", time_stage(assemble, [lines], repeat), len(lines))
+    for name, function in [("parse_line_for_times", parse_line_for_times),
+                           ("parse_line_for_sizes", parse_line_for_sizes),
+                           ("GCEventType.from_gc_line", GCEventType.from_gc_line),
+                           ("parse_record", parse_record)]:
+        record_stage(name, time_stage(function, records, repeat), len(records))
+
+    best, stats = process(lines, repeat)
+    record_stage("process_line", best, len(lines))
+
+    unified_lines = generate_unified_gc_log(events, seed)
+    unified_records = pick_unified(unified_lines)
+    record_stage("pick_unified_records", time_stage(pick_unified, [unified_lines], repeat), len(unified_lines))
+    # Each run parses with a parser that has seen the log's heap lines, as it would in a real run
+    unified_parser = UnifiedLogParser()
+    for line in unified_lines:
+        unified_parser.add_line(line.rstrip())
+    record_stage("UnifiedLogParser.parse", time_stage(unified_parser.parse, unified_records, repeat),
+                 len(unified_records))
+    unified_best, _ = process(unified_lines, repeat)
+    record_stage("process_line_unified", unified_best, len(unified_lines))
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "events": events,
+        "seed": seed,
+        "lines": len(lines),
+        "records": len(records),
+        "megabytes": sum(len(line) for line in lines) / (1024 * 1024),
+        "lines_per_second": len(lines) / best,
+        "records_per_second": len(records) / best,
+        "events_per_second": events / best,
+        "unified_lines": len(unified_lines),
+        "unified_events_per_second": events / unified_best,
+        "packets": stats.packets,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "stages": stages,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    :return: Names of the stages more than 10% slower than in `baseline`
+    """
+    regressions = []
+    print("{:>28} {:>14} {:>14} {:>8}".format("stage", "baseline/s", "now/s", "ratio"))
+    for name, stage in sorted(results["stages"].items()):
+        if name not in baseline["stages"]:
+            continue
+        ratio = stage["per_second"] / baseline["stages"][name]["per_second"]
+        flag = ""
+        if ratio < REGRESSION_THRESHOLD:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print("{:>28} {:>14.0f} {:>14.0f} {:>8.2f}{}".format(
+            name, baseline["stages"][name]["per_second"], stage["per_second"], ratio, flag))
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Report the best of this many runs")
+    parser.add_argument("--output", help="Save results to this JSON file")
+    parser.add_argument("--compare", help="Compare against results saved by an earlier --output")
+    args = parser.parse_args()
+
+    results = run(args.events, args.seed, args.repeat)
+    print("{lines} lines, {records} records, {megabytes:.1f} MB: {lines_per_second:.0f} lines/s, "
+          "{records_per_second:.0f} records/s end to end, {packets} packets, peak RSS {peak_rss_kb} KB"
+          .format(**results))
+    print("{unified_lines} unified logging lines: {unified_events_per_second:.0f} GC events/s end to end, "
+          "{events_per_second:.0f} for JDK 8".format(**results))
+    for name, stage in results["stages"].items():
+        print("{:>28} {:>10.3f} s {:>14.0f} /s".format(name, stage["seconds"], stage["per_second"]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(results, json.load(f)):
+                raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compare memory and CPU per monitored JVM between one garbagedog process per log dir and a single process following
+every log dir with --source. Linux only, reads /proc.
+
+    python benchmarks/bench_multi_source.py --jvms 30 --seconds 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+GARBAGEDOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "bin", "garbagedog")
+PAR_NEW_LINE = "{}: 2.346: [GC (Allocation Failure) {}: 2.346: [ParNew: 76034K->8704K(78656K), 0.0312710 secs] " \
+               "76034K->19240K(253440K), 0.0313630 secs] [Times: user=0.09 sys=0.01, real=0.03 secs]\n"
+
+
+def rss_kb(pid: int) -> int:
+    with open("/proc/{}/status".format(pid)) as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def cpu_seconds(pid: int) -> float:
+    with open("/proc/{}/stat".format(pid)) as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def run(commands: list, log_dirs: list, seconds: float, events_per_second: int) -> tuple:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.join(os.path.dirname(GARBAGEDOG), os.pardir)] +
+                                                     sys.path))
+    processes = [subprocess.Popen([sys.executable, GARBAGEDOG, "--dogstatsd-port", "9"] + command, env=env)
+                 for command in commands]
+    try:
+        time.sleep(2)
+        log_files = [open(os.path.join(log_dir, "gc.log"), "a") for log_dir in log_dirs]
+        deadline = time.time() + seconds
+        now = time.time()
+        while now < deadline:
+            now = max(time.time(), now + 0.001)
+            timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now)) + ".{:03d}+0000".format(
+                int(now * 1000) % 1000)
+            for log_file in log_files:
+                log_file.write(PAR_NEW_LINE.format(timestamp, timestamp))
+                log_file.flush()
+            time.sleep(1 / events_per_second)
+        for log_file in log_files:
+            log_file.close()
+        time.sleep(1)
+        return sum(rss_kb(p.pid) for p in processes), sum(cpu_seconds(p.pid) for p in processes)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jvms", type=int, default=30)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--events-per-second", type=int, default=20, help="GC events written per JVM per second")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        log_dirs = []
+        for i in range(args.jvms):
+            log_dir = os.path.join(root, "jvm{}".format(i))
+            os.mkdir(log_dir)
+            open(os.path.join(log_dir, "gc.log"), "w").close()
+            log_dirs.append(log_dir)
+
+        per_process = [["--log-dir", log_dir] for log_dir in log_dirs]
+        single_process = [[argument for log_dir in log_dirs for argument in ("--source", "dir=" + log_dir)]]
+        for name, commands in (("process per JVM", per_process), ("one process", single_process)):
+            rss, cpu = run(commands, log_dirs, args.seconds, args.events_per_second)
+            print("{:16} total RSS {:>8} KB ({:>6.0f} KB/JVM), CPU {:.2f}s ({:.3f}s/JVM)".format(
+                name, rss, rss / args.jvms, cpu, cpu / args.jvms))
+
+
+if __name__ == "__main__":
+    main()
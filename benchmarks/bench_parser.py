@@ -0,0 +1,101 @@
+"""
+Compare lines/sec of the regex cascade GCEventProcessor used to run on every line against the single pass classifier
+and record parser in garbagedog.parser.
+
+    python benchmarks/bench_parser.py --repeat 2000
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+from garbagedog.constants import ABSOLUTE_TIME_REGEX, RELATIVE_TIME_REGEX, CONFLATED_RELATIVE_REGEX, \
+    CONFLATED_ABSOLUTE_REGEX, SIZE_REGEX, THREE_ARROWS_REGEX, TIMEFORMAT, TIMES_REGEX, GCEventType, GCSizeInfo
+from garbagedog.parser import classify_line, parse_record, RECORD_START, CONFLATED
+
+GOLDEN_LOG = os.path.join(os.path.dirname(__file__), os.pardir, "tests", "data", "jdk8_golden.log")
+
+
+def parse_line_for_times(line: str) -> None:
+    """What garbagedog.utils.parse_line_for_times ran before it wrapped parse_record"""
+    time_match = TIMES_REGEX.match(line)
+    if time_match:
+        GCEventType.from_gc_line(line), float(time_match.group(1))
+
+
+def parse_line_for_sizes(line: str) -> None:
+    """What garbagedog.utils.parse_line_for_sizes ran before it wrapped parse_record"""
+    size_match = SIZE_REGEX.match(line)
+    if size_match and not THREE_ARROWS_REGEX.match(line):
+        datetime.strptime(size_match.group(1), TIMEFORMAT), GCSizeInfo(*[int(size) for size in size_match.groups()[2:]])
+
+
+def regex_record(record: str) -> None:
+    if not record:
+        return
+    time_match = ABSOLUTE_TIME_REGEX.match(record)
+    if time_match:
+        # Once for frequency stats, once more in parse_line_for_sizes
+        datetime.strptime(time_match.group(1), TIMEFORMAT)
+        GCEventType.CMS_INITIAL_MARK.gc_text in record or GCEventType.FULL_GC.gc_text in record
+    parse_line_for_times(record)
+    parse_line_for_sizes(record)
+
+
+def regex_path(lines: list) -> None:
+    previous_record = ""
+    for line in lines:
+        stripped_line = line.rstrip()
+        conflated_relative = CONFLATED_RELATIVE_REGEX.match(stripped_line)
+        conflated_absolute = CONFLATED_ABSOLUTE_REGEX.match(stripped_line)
+        if ABSOLUTE_TIME_REGEX.match(stripped_line) or RELATIVE_TIME_REGEX.match(stripped_line):
+            regex_record(previous_record)
+            previous_record = stripped_line
+        elif conflated_relative:
+            regex_record(previous_record + conflated_relative.group(1))
+            previous_record = conflated_relative.group(2)
+        elif conflated_absolute:
+            regex_record(previous_record + conflated_absolute.group(1))
+            previous_record = conflated_absolute.group(2)
+        else:
+            previous_record = previous_record + " " + stripped_line
+
+
+def engine_record(record: str) -> None:
+    if not record:
+        return
+    parse_record(record)
+
+
+def engine_path(lines: list) -> None:
+    previous_record = ""
+    for line in lines:
+        stripped_line = line.rstrip()
+        line_class, split = classify_line(stripped_line)
+        if line_class == RECORD_START:
+            engine_record(previous_record)
+            previous_record = stripped_line
+        elif line_class == CONFLATED:
+            engine_record(previous_record + stripped_line[:split])
+            previous_record = stripped_line[split:]
+        else:
+            previous_record = previous_record + " " + stripped_line
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000, help="How many copies of the golden log to parse")
+    args = parser.parse_args()
+
+    with open(GOLDEN_LOG) as f:
+        lines = f.readlines() * args.repeat
+
+    for name, path in (("regex", regex_path), ("engine", engine_path)):
+        start = time.perf_counter()
+        path(lines)
+        elapsed = time.perf_counter() - start
+        print("{:8} {:>10.0f} lines/sec".format(name, len(lines) / elapsed))
+
+
+if __name__ == "__main__":
+    main()
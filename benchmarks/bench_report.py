@@ -0,0 +1,61 @@
+"""
+Time `garbagedog report` on a synthetic log (see gc_log_generator.py): parsing into columns with one and with several
+parser processes, then computing every series with NumPy, against feeding the same records one at a time through
+GCEventProcessor as --backfill does.
+
+    python benchmarks/bench_report.py --events 100000 --workers 8
+"""
+import argparse
+import contextlib
+import multiprocessing
+import os
+import tempfile
+import time
+
+from garbagedog.backfill import backfill
+from garbagedog.event_processor import GCEventProcessor
+from garbagedog.report import compute_series, load_columns, summarize
+from gc_log_generator import generate_gc_log
+
+
+class NullStats(object):
+    def timing(self, *args, **kwargs):
+        pass
+
+    histogram = gauge = increment = timing
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        path = os.path.join(log_dir, "gc.log")
+        with open(path, "w") as f:
+            f.writelines(generate_gc_log(args.events, args.seed))
+        megabytes = os.path.getsize(path) / (1024 * 1024)
+
+        for workers in sorted({1, args.workers}):
+            start = time.perf_counter()
+            columns = load_columns([path], workers=workers)
+            elapsed = time.perf_counter() - start
+            print("{:>32} {:>10.1f} MB/s".format("load_columns, {} workers".format(workers), megabytes / elapsed))
+
+        start = time.perf_counter()
+        summarize(compute_series(columns))
+        elapsed = time.perf_counter() - start
+        records = len(columns["timestamp"])
+        print("{:>32} {:>10.3f} s for {} records".format("compute_series and summarize", elapsed, records))
+
+        # GCEventProcessor prints promotion failures
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = backfill([path], GCEventProcessor("localhost", "9", None, stats=NullStats()),
+                              workers=args.workers)
+        print("{:>32} {:>10.1f} MB/s".format("backfill, {} workers".format(args.workers), megabytes / result.seconds))
+
+
+if __name__ == "__main__":
+    main()
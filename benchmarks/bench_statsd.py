@@ -0,0 +1,86 @@
+"""
+Compare sending one datagram per metric with DogStatsd against packing them with garbagedog.statsd.BufferedStatsd, on
+a synthetic GC log (see gc_log_generator.py) sent to a local unix socket sink. Each datagram is one send syscall.
+
+    python benchmarks/bench_statsd.py --events 20000
+"""
+import argparse
+import contextlib
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from datadog.dogstatsd.base import DogStatsd
+
+from garbagedog.event_processor import GCEventProcessor
+from garbagedog.statsd import BufferedStatsd
+from gc_log_generator import generate_gc_log
+
+
+class Sink(object):
+    """Local dogstatsd unix socket, counting the datagrams and metrics it receives"""
+
+    def __init__(self, path: str) -> None:
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+        self.socket.bind(path)
+        self.socket.settimeout(0.2)
+        self.packets = 0
+        self.metrics = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._thread.join()
+        self.socket.close()
+
+    def _receive(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                packet = self.socket.recv(65536)
+            except socket.timeout:
+                continue
+            self.packets += 1
+            self.metrics += len(packet.strip(b"\n").split(b"\n"))
+
+
+def run(name: str, make_stats, lines: list, socket_path: str) -> None:
+    sink = Sink(socket_path)
+    stats = make_stats()
+    processor = GCEventProcessor("localhost", "8125", None, stats=stats)
+    # GCEventProcessor prints promotion failures
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for line in lines:
+            processor._process_line(line)
+        if isinstance(stats, BufferedStatsd):
+            stats.stop()
+        seconds = time.perf_counter() - start
+    # Let the sink catch up
+    time.sleep(0.5)
+    sink.stop()
+    os.unlink(socket_path)
+    print("{:>28} {:>10.0f} lines/s {:>8} datagrams {:>8} metrics received".format(
+        name, len(lines) / seconds, sink.packets, sink.metrics))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-packet-size", type=int, default=8192)
+    args = parser.parse_args()
+
+    lines = generate_gc_log(args.events, args.seed)
+    socket_path = os.path.join(tempfile.mkdtemp(), "dsd.socket")
+    run("DogStatsd", lambda: DogStatsd(socket_path=socket_path), lines, socket_path)
+    run("BufferedStatsd", lambda: BufferedStatsd(socket_path=socket_path, max_packet_size=args.max_packet_size),
+        lines, socket_path)
+
+
+if __name__ == "__main__":
+    main()
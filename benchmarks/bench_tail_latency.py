@@ -0,0 +1,55 @@
+"""
+Measure the latency between a line being written to a gc.log and GCLogHandler yielding it, with inotify and with
+sleep polling.
+
+    python benchmarks/bench_tail_latency.py --samples 20
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from garbagedog.utils import GCLogHandler
+
+
+def measure(use_inotify: bool, samples: int, sleep_seconds: int) -> list:
+    with tempfile.TemporaryDirectory() as log_dir:
+        log_path = os.path.join(log_dir, "gc.log.0")
+        open(log_path, "w").close()
+        write_times = []
+
+        def writer():
+            with open(log_path, "a") as log_file:
+                for i in range(samples):
+                    time.sleep(random.uniform(0.05, 0.5))
+                    write_times.append(time.perf_counter())
+                    log_file.write("line {}\n".format(i))
+                    log_file.flush()
+
+        latencies = []
+        with GCLogHandler(log_dir, sleep_seconds=sleep_seconds, use_inotify=use_inotify) as handler:
+            thread = threading.Thread(target=writer)
+            thread.start()
+            for i, _ in zip(range(samples), handler.get_log_lines()):
+                latencies.append(time.perf_counter() - write_times[i])
+            thread.join()
+        return sorted(latencies)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--sleep-seconds", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(0)
+    for mode, use_inotify in (("inotify", True), ("poll", False)):
+        latencies = measure(use_inotify, args.samples, args.sleep_seconds)
+        print("{:8} p50={:.4f}s p99={:.4f}s max={:.4f}s".format(
+            mode, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)], latencies[-1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+Generate a realistic, deterministic JDK 8 GC log for benchmarks and tests. Every `GCEventType` is produced, along with
+the multi-line and conflated output real JVMs write: -XX:+PrintHeapAtGC blocks, -XX:+PrintTenuringDistribution ages,
+CMS concurrent phases interleaved with young collections, and application stopped time lines. With --unified, generate
+the JDK 9+ unified logging output of G1 instead, covering its young, mixed, remark, cleanup and full pauses.
+
+    python benchmarks/gc_log_generator.py --events 100000 --seed 1 > gc.log
+    python benchmarks/gc_log_generator.py --events 100000 --seed 1 --unified > gc.log
+"""
+import argparse
+import bisect
+import itertools
+import random
+import sys
+import time
+
+from typing import Iterator, List, Optional
+
+START_EPOCH = 1501178482.406
+YOUNG_TOTAL_K = 78656
+OLD_TOTAL_K = 174784
+TIMES = "[Times: user={:.2f} sys={:.2f}, real={:.2f} secs]"
+HEAP_BLOCK = [
+    " par new generation   total {young_total}K, used {young_used}K [0x00000006c0000000, 0x00000006c5550000, "
+    "0x00000006eaaa0000)",
+    "  eden space 69952K, {eden_percent:3d}% used [0x00000006c0000000, 0x00000006c4450000, 0x00000006c4450000)",
+    "  from space 8704K,   0% used [0x00000006c4450000, 0x00000006c4450000, 0x00000006c4cd0000)",
+    "  to   space 8704K,   0% used [0x00000006c4cd0000, 0x00000006c4cd0000, 0x00000006c5550000)",
+    " concurrent mark-sweep generation total {old_total}K, used {old_used}K [0x00000006eaaa0000, 0x00000006f5550000, "
+    "0x00000007c0000000)",
+    " Metaspace       used 14212K, capacity 14446K, committed 14720K, reserved 1062912K",
+    "  class space    used 1712K, capacity 1800K, committed 1920K, reserved 1048576K",
+]
+
+
+class GCLogGenerator(object):
+
+    def __init__(self, seed: int = 0, heap_at_gc: bool = True, tenuring_distribution: bool = True) -> None:
+        """
+        :param seed: Seed for the random choices, the same seed always gives the same log
+        :param heap_at_gc: If True, wrap young collections in -XX:+PrintHeapAtGC blocks
+        :param tenuring_distribution: If True, print -XX:+PrintTenuringDistribution ages in ParNew collections
+        """
+        self.rng = random.Random(seed)
+        self.heap_at_gc = heap_at_gc
+        self.tenuring_distribution = tenuring_distribution
+        self.now = START_EPOCH
+        self.invocations = 0
+        self.young_used_k = 0
+        self.old_used_k = 20000
+
+        # Every scenario runs once before any is chosen at random, so even short logs cover every event type
+        self.scenarios = [
+            (self.par_new, 50),
+            (self.cms_cycle, 4),
+            (self.conflated_par_new, 3),
+            (self.conflated_relative, 2),
+            (self.promotion_failed, 1),
+            (self.concurrent_mode_failure, 1),
+            (self.ps_young_gen, 12),
+            (self.parallel_full_gc, 2),
+            (self.def_new, 10),
+            (self.serial_full_gc, 2),
+            (self.g1_young_pause, 3),
+        ]  # type: List[tuple]
+
+    def events(self, count: int) -> Iterator[str]:
+        """
+        :param count: Number of GC events (scenarios) to generate
+        :return: Log lines, each ending with a newline
+        """
+        yield "Java HotSpot(TM) 64-Bit Server VM (25.131-b11) for linux-amd64 JRE (1.8.0_131-b11)\n"
+        yield "CommandLine flags: -XX:+PrintGCApplicationStoppedTime -XX:+PrintGCDateStamps -XX:+PrintGCDetails " \
+              "-XX:+PrintHeapAtGC -XX:+PrintTenuringDistribution -XX:+UseConcMarkSweepGC -XX:+UseParNewGC\n"
+        scenarios = [scenario for scenario, _ in self.scenarios]
+        cumulative_weights = list(itertools.accumulate(weight for _, weight in self.scenarios))
+        for index in range(count):
+            if index < len(scenarios):
+                scenario = scenarios[index]
+            else:
+                choice = self.rng.random() * cumulative_weights[-1]
+                scenario = scenarios[bisect.bisect(cumulative_weights, choice)]
+            self.now += self.rng.uniform(0.2, 2.0)
+            for line in scenario():
+                yield line + "\n"
+
+    def par_new(self) -> List[str]:
+        young_begin, young_end, heap_begin, heap_end, real = self._young_collection()
+        lines = self._heap_before()
+        lines.append("{0}: [GC (Allocation Failure) {0}: [ParNew".format(self._stamp()))
+        lines += self._tenuring()
+        lines.append(": {}K->{}K({}K), {:.7f} secs] {}K->{}K({}K), {:.7f} secs] {}".format(
+            young_begin, young_end, YOUNG_TOTAL_K, real, heap_begin, heap_end, YOUNG_TOTAL_K + OLD_TOTAL_K, real,
+            self._times(real)))
+        lines += self._heap_after()
+        lines += self._stopped(real)
+        return lines
+
+    def cms_cycle(self) -> List[str]:
+        lines = ["{}: [GC (CMS Initial Mark) [1 CMS-initial-mark: {}K({}K)] {}K({}K), 0.0041600 secs] {}".format(
+            self._stamp(), self.old_used_k, OLD_TOTAL_K, self.old_used_k + self.young_used_k,
+            YOUNG_TOTAL_K + OLD_TOTAL_K, self._times(0.004))]
+        lines += self._stopped(0.004)
+        for phase in ["mark", "preclean", "abortable-preclean"]:
+            lines.append(self._concurrent_start(phase))
+            lines.append(self._concurrent_end(phase))
+        stamp = self._stamp(0.002)
+        lines.append("{0}: [GC (CMS Final Remark) [YG occupancy: {1} K ({2} K)]{0}: [Rescan (parallel) , 0.0030 secs]"
+                     "{0}: [weak refs processing, 0.0000 secs]{0}: [class unloading, 0.0020 secs]"
+                     "{0}: [scrub symbol table, 0.0010 secs]{0}: [scrub string table, 0.0002 secs]"
+                     "[1 CMS-remark: {3}K({4}K)] {5}K({6}K), 0.0070 secs] {7}".format(
+                         stamp, self.young_used_k, YOUNG_TOTAL_K, self.old_used_k, OLD_TOTAL_K,
+                         self.old_used_k + self.young_used_k, YOUNG_TOTAL_K + OLD_TOTAL_K, self._times(0.007)))
+        lines += self._stopped(0.007)
+        self.old_used_k = max(10000, self.old_used_k // 3)
+        for phase in ["sweep", "reset"]:
+            lines.append(self._concurrent_start(phase))
+            lines.append(self._concurrent_end(phase))
+        return lines
+
+    def conflated_par_new(self) -> List[str]:
+        # A concurrent phase finishing in the middle of a young collection
+        young_begin, young_end, heap_begin, heap_end, real = self._young_collection()
+        stamp = self._stamp()
+        lines = ["{0}: [GC (Allocation Failure) {0}: [ParNew{1}".format(stamp, self._concurrent_end("abortable-preclean")),
+                 ": {}K->{}K({}K), {:.7f} secs] {}K->{}K({}K), {:.7f} secs] {}".format(
+                     young_begin, young_end, YOUNG_TOTAL_K, real, heap_begin, heap_end, YOUNG_TOTAL_K + OLD_TOTAL_K,
+                     real, self._times(real))]
+        lines += self._stopped(real)
+        return lines
+
+    def conflated_relative(self) -> List[str]:
+        # Without -XX:+PrintGCDateStamps a concurrent phase can follow a young collection on the same line
+        young_begin, young_end, heap_begin, heap_end, real = self._young_collection()
+        uptime = self._uptime()
+        return ["{0:.3f}: [GC (Allocation Failure) {0:.3f}: [ParNew: {1}K->{2}K({3}K), {4:.7f} secs] "
+                "{5}K->{6}K({7}K), {4:.7f} secs] {8}{9:.3f}: [CMS-concurrent-sweep: 0.041/0.041 secs] {10}".format(
+                    uptime, young_begin, young_end, YOUNG_TOTAL_K, real, heap_begin, heap_end,
+                    YOUNG_TOTAL_K + OLD_TOTAL_K, self._times(real), uptime + real, self._times(0.04))]
+
+    def promotion_failed(self) -> List[str]:
+        real = self.rng.uniform(0.5, 3.0)
+        uptime = self._uptime()
+        old_end = max(10000, self.old_used_k // 2)
+        line = "{0}: [GC {1:.3f}: [ParNew (promotion failed): {2}K->{2}K({2}K), 0.0347877 secs] {3:.3f}: " \
+               "[CMS: {4}K->{5}K({6}K), {7:.7f} secs] {8}K->{5}K({9}K), [Metaspace: 21032K->21032K(1069056K)], " \
+               "{7:.7f} secs] {10}".format(self._stamp(), uptime, YOUNG_TOTAL_K, uptime + 0.035, self.old_used_k,
+                                           old_end, OLD_TOTAL_K, real, self.old_used_k + YOUNG_TOTAL_K,
+                                           YOUNG_TOTAL_K + OLD_TOTAL_K, self._times(real))
+        self.young_used_k, self.old_used_k = 0, old_end
+        return [line] + self._stopped(real)
+
+    def concurrent_mode_failure(self) -> List[str]:
+        real = self.rng.uniform(0.5, 3.0)
+        stamp = self._stamp()
+        old_end = max(10000, self.old_used_k // 2)
+        lines = ["{0}: [GC (Allocation Failure) {0}: [ParNew: {1}K->{1}K({1}K), 0.0000210 secs]{0}: [CMS{2}".format(
+                     stamp, YOUNG_TOTAL_K, self._concurrent_end("abortable-preclean")),
+                 " (concurrent mode failure): {}K->{}K({}K), {:.7f} secs] {}K->{}K({}K), "
+                 "[Metaspace: 21032K->21032K(1069056K)], {:.7f} secs] {}".format(
+                     OLD_TOTAL_K - 1, old_end, OLD_TOTAL_K, real, OLD_TOTAL_K + YOUNG_TOTAL_K - 1, old_end,
+                     YOUNG_TOTAL_K + OLD_TOTAL_K, real, self._times(real))]
+        self.young_used_k, self.old_used_k = 0, old_end
+        return lines + self._stopped(real)
+
+    def ps_young_gen(self) -> List[str]:
+        young_begin, young_end, heap_begin, heap_end, real = self._young_collection()
+        return ["{}: [GC (Allocation Failure) [PSYoungGen: {}K->{}K({}K)] {}K->{}K({}K), {:.7f} secs] {}".format(
+            self._stamp(), young_begin, young_end, YOUNG_TOTAL_K, heap_begin, heap_end, YOUNG_TOTAL_K + OLD_TOTAL_K,
+            real, self._times(real))] + self._stopped(real)
+
+    def parallel_full_gc(self) -> List[str]:
+        real = self.rng.uniform(0.1, 1.0)
+        old_end = max(10000, self.old_used_k // 2)
+        line = "{}: [Full GC (Ergonomics) [PSYoungGen: {}K->0K({}K)] [ParOldGen: {}K->{}K({}K)] {}K->{}K({}K), " \
+               "[Metaspace: 3412K->3412K(1056768K)], {:.7f} secs] {}".format(
+                   self._stamp(), self.young_used_k, YOUNG_TOTAL_K, self.old_used_k, old_end, OLD_TOTAL_K,
+                   self.young_used_k + self.old_used_k, old_end, YOUNG_TOTAL_K + OLD_TOTAL_K, real,
+                   self._times(real))
+        self.young_used_k, self.old_used_k = 0, old_end
+        return [line] + self._stopped(real)
+
+    def def_new(self) -> List[str]:
+        young_begin, young_end, heap_begin, heap_end, real = self._young_collection()
+        return ["{0}: [GC (Allocation Failure) {1:.3f}: [DefNew: {2}K->{3}K({4}K), {5:.7f} secs] {6}K->{7}K({8}K), "
+                "{5:.7f} secs] {9}".format(self._stamp(), self._uptime(), young_begin, young_end, YOUNG_TOTAL_K, real,
+                                           heap_begin, heap_end, YOUNG_TOTAL_K + OLD_TOTAL_K, self._times(real))]
+
+    def serial_full_gc(self) -> List[str]:
+        real = self.rng.uniform(0.1, 1.0)
+        old_end = max(10000, self.old_used_k // 2)
+        line = "{0}: [Full GC (Allocation Failure) {1:.3f}: [Tenured: {2}K->{3}K({4}K), {5:.7f} secs] " \
+               "{6}K->{3}K({7}K), [Metaspace: 2715K->2715K(1056768K)], {5:.7f} secs] {8}".format(
+                   self._stamp(), self._uptime(), self.old_used_k, old_end, OLD_TOTAL_K, real,
+                   self.old_used_k + self.young_used_k, YOUNG_TOTAL_K + OLD_TOTAL_K, self._times(real))
+        self.young_used_k, self.old_used_k = 0, old_end
+        return [line]
+
+    def g1_young_pause(self) -> List[str]:
+        # Not a collector garbagedog knows, counted as an UNKNOWN event
+        real = self.rng.uniform(0.005, 0.05)
+        return ["{}: [GC pause (G1 Evacuation Pause) (young), {:.7f} secs]".format(self._stamp(), real),
+                "   [Parallel Time: {:.1f} ms, GC Workers: 4]".format(real * 900),
+                "   [Eden: 24.0M(24.0M)->0.0B(24.0M) Survivors: 0.0B->3072.0K Heap: 24.0M(256.0M)->4096.0K(256.0M)]",
+                " " + self._times(real)] + self._stopped(real)
+
+    def _young_collection(self) -> tuple:
+        young_begin = self.rng.randint(YOUNG_TOTAL_K * 3 // 4, YOUNG_TOTAL_K)
+        young_end = self.rng.randint(YOUNG_TOTAL_K // 20, YOUNG_TOTAL_K // 8)
+        promoted = self.rng.randint(0, young_end)
+        heap_begin = young_begin + self.old_used_k
+        self.old_used_k = min(OLD_TOTAL_K - 1, self.old_used_k + promoted)
+        self.young_used_k = young_end
+        real = self.rng.uniform(0.005, 0.05)
+        return young_begin, young_end, heap_begin, young_end + self.old_used_k, real
+
+    def _heap_before(self) -> List[str]:
+        if not self.heap_at_gc:
+            return []
+        self.invocations += 1
+        return ["{{Heap before GC invocations={} (full 0):".format(self.invocations - 1)] + self._heap(100)
+
+    def _heap_after(self) -> List[str]:
+        if not self.heap_at_gc:
+            return []
+        return ["Heap after GC invocations={} (full 0):".format(self.invocations)] + self._heap(0) + ["}"]
+
+    def _heap(self, eden_percent: int) -> List[str]:
+        return [line.format(young_total=YOUNG_TOTAL_K, young_used=self.young_used_k, eden_percent=eden_percent,
+                            old_total=OLD_TOTAL_K, old_used=self.old_used_k) for line in HEAP_BLOCK]
+
+    def _tenuring(self) -> List[str]:
+        if not self.tenuring_distribution:
+            return []
+        lines = ["Desired survivor size 4456448 bytes, new threshold 6 (max 6)"]
+        total = 0
+        for age in range(1, self.rng.randint(2, 7)):
+            size = self.rng.randint(10000, 3000000)
+            total += size
+            lines.append("- age {:3d}: {:10d} bytes, {:10d} total".format(age, size, total))
+        return lines
+
+    def _stopped(self, real: float) -> List[str]:
+        return ["{}: Total time for which application threads were stopped: {:.7f} seconds, "
+                "Stopping threads took: 0.0000612 seconds".format(self._stamp(real + 0.0005), real + 0.0004)]
+
+    def _concurrent_start(self, phase: str) -> str:
+        return "{}: [CMS-concurrent-{}-start]".format(self._stamp(0.0001), phase)
+
+    def _concurrent_end(self, phase: str) -> str:
+        seconds = self.rng.uniform(0.001, 0.5)
+        return "{}: [CMS-concurrent-{}: {:.3f}/{:.3f} secs] {}".format(
+            self._stamp(seconds), phase, seconds, seconds * 1.5, self._times(seconds))
+
+    def _stamp(self, advance: float = 0) -> str:
+        # "2017-07-27T18:01:22.406+0000: 1.021", the absolute and relative time of the event
+        self.now += advance
+        millis = int(round(self.now * 1000))
+        return "{}.{:03d}+0000: {:.3f}".format(time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(millis // 1000)),
+                                                millis % 1000, self._uptime())
+
+    def _uptime(self) -> float:
+        return self.now - START_EPOCH + 1
+
+    def _times(self, real: float) -> str:
+        return TIMES.format(real * 3, real / 10, real)
+
+
+REGION_K = 1024
+HEAP_REGIONS = 256
+UNIFIED_TIME = "[{}.{:03d}+0000][{:.3f}s][info][{:<12}] "
+
+
+class UnifiedGCLogGenerator(object):
+
+    def __init__(self, seed: int = 0, details: bool = True) -> None:
+        """
+        :param seed: Seed for the random choices, the same seed always gives the same log
+        :param details: If True, log the phase, task and cpu lines `-Xlog:gc*` adds around each pause summary
+        """
+        self.rng = random.Random(seed)
+        self.details = details
+        self.now = START_EPOCH
+        self.gc_id = 0
+        self.eden_regions = 24
+        self.old_regions = 10
+
+        # As in GCLogGenerator, every scenario runs once first
+        self.scenarios = [
+            (self.young_pause, 60),
+            (self.concurrent_cycle, 4),
+            (self.mixed_pause, 8),
+            (self.full_pause, 1),
+        ]  # type: List[tuple]
+
+    def events(self, count: int) -> Iterator[str]:
+        """
+        :param count: Number of GC events (scenarios) to generate
+        :return: Log lines, each ending with a newline
+        """
+        yield self._line("gc,init", "Version: 17.0.2+8 (release)")
+        yield self._line("gc", "Using G1")
+        yield self._line("gc,init", "Heap Region Size: {}M".format(REGION_K // 1024))
+        yield self._line("gc,init", "Heap Max Capacity: {}M".format(HEAP_REGIONS * REGION_K // 1024))
+        scenarios = [scenario for scenario, _ in self.scenarios]
+        cumulative_weights = list(itertools.accumulate(weight for _, weight in self.scenarios))
+        for index in range(count):
+            if index < len(scenarios):
+                scenario = scenarios[index]
+            else:
+                choice = self.rng.random() * cumulative_weights[-1]
+                scenario = scenarios[bisect.bisect(cumulative_weights, choice)]
+            self.now += self.rng.uniform(0.2, 2.0)
+            for line in scenario():
+                yield line
+
+    def young_pause(self, kind: str = "Normal", cause: str = "G1 Evacuation Pause") -> List[str]:
+        return self._pause("Pause Young ({}) ({})".format(kind, cause), old_regions_freed=0)
+
+    def mixed_pause(self) -> List[str]:
+        return self._pause("Pause Young (Mixed) (G1 Evacuation Pause)", old_regions_freed=self.old_regions // 3)
+
+    def concurrent_cycle(self) -> List[str]:
+        lines = self.young_pause("Concurrent Start", "G1 Humongous Allocation")
+        gc_id = self._next_id()
+        lines.append(self._line("gc", "GC({}) Concurrent Mark Cycle".format(gc_id)))
+        cycle_start = self.now
+        self.now += self.rng.uniform(0.01, 0.2)
+        heap = self._heap_m()
+        for name, real in [("Remark", self.rng.uniform(0.001, 0.01)), ("Cleanup", self.rng.uniform(0.0001, 0.001))]:
+            lines.append(self._line("gc,start", "GC({}) Pause {}".format(gc_id, name)))
+            self.now += real
+            lines.append(self._line("gc", "GC({}) Pause {} {}M->{}M({}M) {:.3f}ms".format(
+                gc_id, name, heap, heap, HEAP_REGIONS * REGION_K // 1024, real * 1000)))
+            lines += self._stopped(real)
+            self.now += self.rng.uniform(0.001, 0.05)
+        lines.append(self._line("gc", "GC({}) Concurrent Mark Cycle {:.3f}ms".format(
+            gc_id, (self.now - cycle_start) * 1000)))
+        lines += self.young_pause("Prepare Mixed")
+        return lines
+
+    def full_pause(self) -> List[str]:
+        gc_id = self._next_id()
+        real = self.rng.uniform(0.1, 1.0)
+        heap_before = self._heap_m()
+        self.old_regions = max(5, self.old_regions // 2)
+        self.eden_regions = 0
+        lines = [self._line("gc,start", "GC({}) Pause Full (G1 Compaction Pause)".format(gc_id))]
+        self.now += real
+        lines.append(self._line("gc", "GC({}) Pause Full (G1 Compaction Pause) {}M->{}M({}M) {:.3f}ms".format(
+            gc_id, heap_before, self._heap_m(), HEAP_REGIONS * REGION_K // 1024, real * 1000)))
+        return lines + self._stopped(real)
+
+    def _pause(self, name: str, old_regions_freed: int) -> List[str]:
+        gc_id = self._next_id()
+        real = self.rng.uniform(0.005, 0.05)
+        eden_before = self.rng.randint(20, 40)
+        survivor_after = self.rng.randint(1, 4)
+        promoted = self.rng.randint(0, 2)
+        heap_before = self._heap_m(eden_before)
+        old_before = self.old_regions
+        self.old_regions = min(HEAP_REGIONS - 50, self.old_regions + promoted - old_regions_freed)
+        lines = [self._line("gc,start", "GC({}) {}".format(gc_id, name))]
+        if self.details:
+            lines += [self._line("gc,task", "GC({}) Using 4 workers of 4 for evacuation".format(gc_id)),
+                      self._line("gc,phases", "GC({})   Pre Evacuate Collection Set: 0.1ms".format(gc_id)),
+                      self._line("gc,phases", "GC({})   Evacuate Collection Set: {:.1f}ms".format(gc_id, real * 900))]
+        survivor_before = self.rng.randint(0, 4)
+        lines += [self._line("gc,heap", "GC({}) Eden regions: {}->0({})".format(gc_id, eden_before, eden_before)),
+                  self._line("gc,heap", "GC({}) Survivor regions: {}->{}(4)".format(
+                      gc_id, survivor_before, survivor_after)),
+                  self._line("gc,heap", "GC({}) Old regions: {}->{}".format(gc_id, old_before, self.old_regions)),
+                  self._line("gc,heap", "GC({}) Humongous regions: 0->0".format(gc_id))]
+        self.eden_regions = survivor_after
+        self.now += real
+        lines.append(self._line("gc", "GC({}) {} {}M->{}M({}M) {:.3f}ms".format(
+            gc_id, name, heap_before, self._heap_m(), HEAP_REGIONS * REGION_K // 1024, real * 1000)))
+        if self.details:
+            lines.append(self._line("gc,cpu", "GC({}) User={:.2f}s Sys={:.2f}s Real={:.2f}s".format(
+                gc_id, real * 3, real / 10, real)))
+        return lines + self._stopped(real)
+
+    def _stopped(self, real: float) -> List[str]:
+        self.now += 0.0005
+        return [self._line("safepoint", "Safepoint \"G1CollectForAllocation\", Time since last: {} ns, Reaching "
+                                        "safepoint: 61200 ns, At safepoint: {} ns, Total: {} ns".format(
+                                            self.rng.randint(10 ** 8, 10 ** 9), int(real * 1e9) + 400000,
+                                            int(real * 1e9) + 461200))]
+
+    def _heap_m(self, young_regions: Optional[int] = None) -> int:
+        if young_regions is None:
+            young_regions = self.eden_regions
+        return (young_regions + self.old_regions) * REGION_K // 1024
+
+    def _next_id(self) -> int:
+        self.gc_id += 1
+        return self.gc_id - 1
+
+    def _line(self, tags: str, message: str) -> str:
+        millis = int(round(self.now * 1000))
+        return UNIFIED_TIME.format(time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(millis // 1000)), millis % 1000,
+                                   self.now - START_EPOCH + 1, tags) + message + "\n"
+
+
+def generate_gc_log(events: int, seed: int = 0, heap_at_gc: bool = True,
+                    tenuring_distribution: bool = True) -> List[str]:
+    """
+    :param events: Number of GC events to generate
+    :param seed: Seed for the random choices
+    :param heap_at_gc: If True, include -XX:+PrintHeapAtGC blocks
+    :param tenuring_distribution: If True, include -XX:+PrintTenuringDistribution ages
+    :return: Log lines, each ending with a newline
+    """
+    return list(GCLogGenerator(seed, heap_at_gc, tenuring_distribution).events(events))
+
+
+def generate_unified_gc_log(events: int, seed: int = 0, details: bool = True) -> List[str]:
+    """
+    :param events: Number of GC events to generate
+    :param seed: Seed for the random choices
+    :param details: If True, include the phase, task and cpu lines of `-Xlog:gc*`
+    :return: Log lines, each ending with a newline
+    """
+    return list(UnifiedGCLogGenerator(seed, details).events(events))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-heap-at-gc", action="store_true")
+    parser.add_argument("--no-tenuring-distribution", action="store_true")
+    parser.add_argument("--unified", action="store_true", help="Generate a JDK 9+ unified logging G1 log")
+    args = parser.parse_args()
+
+    if args.unified:
+        sys.stdout.writelines(UnifiedGCLogGenerator(args.seed).events(args.events))
+        return
+    generator = GCLogGenerator(args.seed, not args.no_heap_at_gc, not args.no_tenuring_distribution)
+    sys.stdout.writelines(generator.events(args.events))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import threading
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .sketch import DDSketch
+
+DEFAULT_PERCENTILES = (0.5, 0.95, 0.99)
+
+
+class MetricAggregator(object):
+
+    def __init__(self,
+                 stats,
+                 flush_interval: float = 10,
+                 percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                 relative_accuracy: float = 0.01,
+                 max_bins: int = 2048) -> None:
+        """
+        Stand in for a DogStatsd client that aggregates `timing` and `histogram` samples in process, and sends a small
+        fixed set of summary metrics for each metric and tag set every `flush_interval` seconds, instead of one packet
+        per sample. Summaries use the suffixes the dogstatsd agent gives histograms (`.median`, `.95percentile`,
+        `.max`, `.avg`, `.count`), so existing dashboards keep working; `.99percentile` and `.sum` are added.
+
+        Other DogStatsd calls are passed straight through to `stats`.
+
+        :param stats: DogStatsd client to flush summaries to
+        :param flush_interval: How often (in seconds) to flush when started with `start`
+        :param percentiles: Percentiles (between 0 and 1) to send for each metric
+        :param relative_accuracy: Maximum relative error of the percentiles sent
+        :param max_bins: Maximum number of sketch bins kept for each metric and tag set
+        """
+        self.stats = stats
+        self.flush_interval = flush_interval
+        self.percentiles = percentiles
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+
+        self._sketches = {}  # type: Dict[Tuple[str, Tuple[str, ...]], DDSketch]
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flush_thread = None  # type: Optional[threading.Thread]
+
+    def timing(self, metric: str, value: float, tags: Optional[List[str]] = None, sample_rate: float = 1) -> None:
+        self._add(metric, value, tags)
+
+    def histogram(self, metric: str, value: float, tags: Optional[List[str]] = None, sample_rate: float = 1) -> None:
+        self._add(metric, value, tags)
+
+    def __getattr__(self, name: str):
+        # gauge, increment, event, ... are sent as they are
+        return getattr(self.stats, name)
+
+    def start(self) -> None:
+        """
+        Flush every `flush_interval` seconds from a background thread
+        """
+        self._stop_event.clear()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="garbagedog-aggregator", daemon=True)
+        self._flush_thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread, and flush anything aggregated since the last flush
+        """
+        self._stop_event.set()
+        if self._flush_thread:
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Send summaries of everything aggregated since the last flush
+        """
+        with self._lock:
+            sketches, self._sketches = self._sketches, {}
+
+        for (metric, tags), sketch in sketches.items():
+            tag_list = list(tags) or None
+            for percentile in self.percentiles:
+                self.stats.gauge(_percentile_name(metric, percentile), sketch.quantile(percentile), tags=tag_list)
+            self.stats.gauge(metric + ".max", sketch.max, tags=tag_list)
+            self.stats.gauge(metric + ".avg", sketch.sum / sketch.count, tags=tag_list)
+            self.stats.gauge(metric + ".sum", sketch.sum, tags=tag_list)
+            self.stats.increment(metric + ".count", sketch.count, tags=tag_list)
+
+    def _add(self, metric: str, value: float, tags: Optional[List[str]]) -> None:
+        key = (metric, tuple(tags) if tags else ())
+        with self._lock:
+            sketch = self._sketches.get(key)
+            if sketch is None:
+                sketch = self._sketches[key] = DDSketch(self.relative_accuracy, self.max_bins)
+            sketch.add(value)
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+
+def _percentile_name(metric: str, percentile: float) -> str:
+    if percentile == 0.5:
+        return metric + ".median"
+    return "{}.{:g}percentile".format(metric, percentile * 100)
@@ -0,0 +1,306 @@
+import heapq
+import json
+import mmap
+import multiprocessing
+import os
+import time
+from collections import deque, namedtuple
+
+from typing import Any, Callable, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from .constants import GCEventType
+from .formats import FORMAT_AUTO, FORMAT_JDK8, create_log_parser, sniff_lines
+from .parser import GCEvent, RECORD_START, classify_line
+
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Chunks parsed ahead of the merge, for each parser process
+_CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+BackfillResult = namedtuple("BackfillResult", "records, bytes, seconds")
+
+# Records are sent back from the parser processes as plain tuples of `GCEvent`'s fields, with the event type as its
+# index in `GCEventType`, which pickle in half the time of objects holding an enum
+EVENT_TYPES = list(GCEventType)
+_EVENT_TYPE_INDEXES = {event_type: index for index, event_type in enumerate(EVENT_TYPES)}
+
+
+def split_chunks(path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> List[Tuple[int, int]]:
+    """
+    Split a log file into byte ranges of roughly `chunk_bytes`, each starting at a line that starts a record, so every
+    record is whole within one chunk.
+
+    :param path: Path of the log file
+    :param chunk_bytes: Approximate size of each chunk
+    :return: List of (start, end) byte offsets covering the whole file
+    """
+    size = os.path.getsize(path)
+    if not size:
+        return []
+
+    boundaries = [0]
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        target = chunk_bytes
+        while target < size:
+            boundary = _next_record_start(mapped, target, size)
+            if boundary >= size:
+                break
+            boundaries.append(boundary)
+            target = boundary + chunk_bytes
+    boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def parse_chunk(path: str, start: int, end: int, log_format: str = FORMAT_JDK8) -> List[GCEvent]:
+    """
+    Assemble and parse the records in one chunk of a log file. The record pending at the end of the chunk is parsed
+    too, as the next chunk starts with a new record.
+
+    :param path: Path of the log file
+    :param start: Offset of the start of the chunk
+    :param end: Offset of the end of the chunk
+    :param log_format: Format of the log file (see `garbagedog.formats`)
+    :return: Parsed records, in log order
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        lines = mapped[start:end].decode("utf-8", errors="replace").split("\n")
+    if lines and not lines[-1]:
+        lines.pop()
+
+    records = []  # type: List[GCEvent]
+    log_parser = create_log_parser(log_format)
+    for line in lines:
+        _append_record(records, log_parser, log_parser.add_line(line.rstrip()))
+    _append_record(records, log_parser, log_parser.pending())
+    return records
+
+
+def parse_chunk_packed(path: str, start: int, end: int, log_format: str) -> List[tuple]:
+    """
+    `parse_chunk`, with each record as a tuple of its fields in the order of `GCEvent.__slots__`, and the event type
+    as its index in `EVENT_TYPES`
+    """
+    return [(record.timestamp,
+             None if record.event_type is None else _EVENT_TYPE_INDEXES[record.event_type],
+             record.duration,
+             record.generation,
+             record.stopped_time,
+             record.safepoint_time,
+             record.young_begin_k,
+             record.young_end_k,
+             record.young_total_k,
+             record.whole_heap_begin_k,
+             record.whole_heap_end_k,
+             record.whole_heap_total_k)
+            for record in parse_chunk(path, start, end, log_format)]
+
+
+def split_files(paths: List[str],
+                log_format: str = FORMAT_AUTO,
+                chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> List[Tuple[str, int, int, str]]:
+    """
+    Split log files into chunks that can be parsed independently. Unified logs are one chunk per file, as the region
+    size and heap sizes a pause summary needs are logged on earlier lines.
+
+    :param paths: Log files
+    :param log_format: Format of the log files, sniffed from each file if FORMAT_AUTO
+    :param chunk_bytes: Approximate size of the chunks JDK 8 logs are split into
+    :return: List of (path, start, end, log format) chunks, in the order of `paths`
+    """
+    chunks = []  # type: List[Tuple[str, int, int, str]]
+    for path in paths:
+        path_format = _log_format(path, log_format)
+        if path_format == FORMAT_JDK8:
+            chunks.extend((path, start, end, path_format) for start, end in split_chunks(path, chunk_bytes))
+        elif os.path.getsize(path):
+            chunks.append((path, 0, os.path.getsize(path), path_format))
+    return chunks
+
+
+def map_chunks(function: Callable[[str, int, int, str], Any],
+               chunks: List[Tuple[str, int, int, str]],
+               workers: Optional[int] = None) -> List[Any]:
+    """
+    :param function: Module level function of (path, start, end, log format) to run on each chunk
+    :param chunks: Chunks from `split_files`
+    :param workers: Number of processes to run `function` in, defaults to the number of CPUs
+    :return: Result of `function` for each chunk, in order
+    """
+    if len(chunks) > 1 and workers != 1:
+        with multiprocessing.Pool(workers) as pool:
+            return pool.starmap(function, chunks)
+    return [function(*chunk) for chunk in chunks]
+
+
+def backfill(paths: List[str],
+             processor,
+             workers: Optional[int] = None,
+             chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+             output: Optional["JSONLinesEmitter"] = None) -> BackfillResult:
+    """
+    Replay whole GC log files through `processor`. Each file is split into chunks at record boundaries and the chunks
+    are parsed in a pool of `workers` processes (see `split_files`). The records are then merged in timestamp order,
+    so rotated files can be given in any order, and fed to the processor in this process so its allocation, promotion
+    and frequency state carries across chunk and file edges. Chunks are parsed only a little ahead of the merge, so
+    memory is bounded by the chunks in flight rather than growing with the size of the logs.
+
+    :param paths: Log files to replay
+    :param processor: GCEventProcessor to feed the records to
+    :param workers: Number of parser processes, defaults to the number of CPUs
+    :param chunk_bytes: Approximate size of the chunks files are split into
+    :param output: If set, write metrics to it stamped with their record's time, instead of sending them
+    :return: Number of records, bytes read and seconds taken
+    """
+    start_time = time.monotonic()
+    chunks = split_files(paths, processor.log_format, chunk_bytes)
+
+    pool = None
+    max_in_flight = 0
+    if len(chunks) > 1 and workers != 1:
+        pool = multiprocessing.Pool(workers)
+        max_in_flight = (workers or multiprocessing.cpu_count()) * _CHUNKS_IN_FLIGHT_PER_WORKER
+    streams = _ChunkStreams(pool, max_in_flight)
+
+    processor_stats = processor.stats
+    if output:
+        processor.stats = output
+    count = 0
+    try:
+        file_records = [streams.records([chunk for chunk in chunks if chunk[0] == path]) for path in paths]
+        for record in _merge_by_time(file_records):
+            if output and record[0] is not None:
+                output.timestamp = record[0]
+            processor._process_record(_unpack(record))
+            count += 1
+    finally:
+        processor.stats = processor_stats
+        if pool:
+            pool.terminate()
+
+    return BackfillResult(records=count,
+                          bytes=sum(os.path.getsize(path) for path in paths),
+                          seconds=time.monotonic() - start_time)
+
+
+class JSONLinesEmitter(object):
+
+    def __init__(self, out: TextIO, constant_tags: Optional[List[str]] = None) -> None:
+        """
+        Stand in for a DogStatsd client that writes each metric as a line of JSON, stamped with `timestamp`, so
+        backfilled metrics keep the time of the GC event that produced them
+
+        :param out: File to write to
+        :param constant_tags: Tags added to every metric
+        """
+        self.out = out
+        self.constant_tags = constant_tags or []
+        self.timestamp = None  # type: Optional[float]
+
+    def timing(self, metric: str, value: float, tags: Optional[List[str]] = None, sample_rate: float = 1) -> None:
+        self._write("timing", metric, value, tags)
+
+    def histogram(self, metric: str, value: float, tags: Optional[List[str]] = None, sample_rate: float = 1) -> None:
+        self._write("histogram", metric, value, tags)
+
+    def gauge(self, metric: str, value: float, tags: Optional[List[str]] = None, sample_rate: float = 1) -> None:
+        self._write("gauge", metric, value, tags)
+
+    def increment(self, metric: str, value: float = 1, tags: Optional[List[str]] = None,
+                  sample_rate: float = 1) -> None:
+        self._write("count", metric, value, tags)
+
+    def _write(self, metric_type: str, metric: str, value: float, tags: Optional[List[str]]) -> None:
+        self.out.write(json.dumps({
+            "timestamp": self.timestamp,
+            "metric": metric,
+            "type": metric_type,
+            "value": value,
+            "tags": self.constant_tags + (tags or []),
+        }) + "\n")
+
+
+class _ChunkStreams(object):
+
+    def __init__(self, pool: Any, max_in_flight: int) -> None:
+        """
+        Parse chunks in `pool` as the records of each file are consumed. Once a file's next chunk is needed, its
+        following chunks are submitted too while fewer than `max_in_flight` are parsed or waiting to be consumed, so a
+        file being merged keeps every process busy without the others' chunks piling up. Without a pool, each chunk is
+        parsed in this process when it is needed.
+        """
+        self.pool = pool
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+
+    def records(self, file_chunks: List[Tuple[str, int, int, str]]) -> Iterator[tuple]:
+        """
+        :param file_chunks: Chunks of one file, in order
+        :return: Packed records of the file, in log order
+        """
+        remaining = deque(file_chunks)
+        submitted = deque()  # type: deque
+        while remaining or submitted:
+            if not submitted:
+                submitted.append(self._submit(remaining.popleft()))
+            records = submitted.popleft()()
+            self.in_flight -= 1
+            while remaining and self.in_flight < self.max_in_flight:
+                submitted.append(self._submit(remaining.popleft()))
+            yield from records
+
+    def _submit(self, chunk: Tuple[str, int, int, str]) -> Callable[[], List[tuple]]:
+        # A function returning the chunk's records
+        self.in_flight += 1
+        if self.pool is None:
+            return lambda: parse_chunk_packed(*chunk)
+        return self.pool.apply_async(parse_chunk_packed, chunk).get
+
+
+def _next_record_start(mapped: Any, offset: int, size: int) -> int:
+    # Offset of the first line at or after the line following `offset` that starts a record
+    line_start = mapped.find(b"\n", offset) + 1
+    while 0 < line_start < size:
+        line_end = mapped.find(b"\n", line_start)
+        if line_end < 0:
+            line_end = size
+        line = mapped[line_start:line_end].decode("utf-8", errors="replace").rstrip()
+        if classify_line(line)[0] == RECORD_START:
+            return line_start
+        line_start = line_end + 1
+    return size
+
+
+def _log_format(path: str, log_format: str) -> str:
+    # The processor's format if it was given, else sniffed from the file
+    if log_format != FORMAT_AUTO:
+        return log_format
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return sniff_lines(f)
+
+
+def _append_record(records: List[GCEvent], log_parser: Any, record: Optional[str]) -> None:
+    if record:
+        parsed = log_parser.parse(record)
+        if parsed:
+            records.append(parsed)
+
+
+def _unpack(packed: tuple) -> GCEvent:
+    event = GCEvent(*packed)
+    if event.event_type is not None:
+        event.event_type = EVENT_TYPES[event.event_type]
+    return event
+
+
+def _merge_by_time(record_lists: Iterable[Iterable[tuple]]) -> Iterator[tuple]:
+    # Records without an absolute timestamp keep their place after the last record of their file that had one
+    def keyed(file_index, records):
+        last_timestamp = 0.0
+        for sequence, record in enumerate(records):
+            if record[0] is not None:
+                last_timestamp = record[0]
+            yield last_timestamp, file_index, sequence, record
+
+    merged = heapq.merge(*[keyed(file_index, records) for file_index, records in enumerate(record_lists)])
+    for _, _, _, record in merged:
+        yield record
@@ -0,0 +1,64 @@
+import json
+import os
+import time
+
+from typing import Any, Dict, Optional
+
+from .utils import printv
+
+CHECKPOINT_VERSION = 2
+
+
+class Checkpointer(object):
+
+    def __init__(self, state_file: str, interval_seconds: float = 10, verbose: bool = False) -> None:
+        """
+        Persist the read position and event processor state to `state_file`, so a restarted garbagedog resumes where
+        the previous one stopped. The file is replaced atomically, so a crash mid-write leaves the old checkpoint.
+
+        :param state_file: Path of the checkpoint file
+        :param interval_seconds: Minimum time (in seconds) between two checkpoint writes
+        :param verbose: If True, print extra info when checkpoints are loaded
+        """
+        self.state_file = state_file
+        self.interval_seconds = interval_seconds
+        self.verbose = verbose
+
+        self._last_save = time.monotonic()
+
+    def due(self) -> bool:
+        """
+        :return: True if `interval_seconds` have passed since the last checkpoint was written
+        """
+        return time.monotonic() - self._last_save >= self.interval_seconds
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        :return: The last saved state, or None if there is no usable checkpoint
+        """
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            printv("Ignoring unreadable checkpoint {}: {}".format(self.state_file, e), self.verbose)
+            return None
+
+        if not isinstance(state, dict) or state.get("version") != CHECKPOINT_VERSION:
+            printv("Ignoring checkpoint {} with unknown version".format(self.state_file), self.verbose)
+            return None
+        return state
+
+    def save(self, state: Dict[str, Any]) -> None:
+        """
+        Atomically replace the checkpoint file with `state`
+
+        :param state: JSON serializable state
+        """
+        state = dict(state, version=CHECKPOINT_VERSION)
+        tmp_file = "{}.tmp".format(self.state_file)
+        with open(tmp_file, "w") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp_file, self.state_file)
+        self._last_save = time.monotonic()
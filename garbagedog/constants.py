@@ -5,11 +5,11 @@ import re
 
 # These regexes are modified from https://github.com/Netflix-Skunkworks/gcviz, Copyright 2013 Netflix, under APACHE 2.0
 THREE_ARROWS_REGEX = re.compile("->.*->.*->", re.MULTILINE)
-SIZE_REGEX = re.compile(r"^([0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}[.][0-9]{3}[+]0000):"
+SIZE_REGEX = re.compile(r"^([0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}[.][0-9]{3}[+-][0-9]{4}):"
                         r" ([0-9]+[.][0-9]{3}): .* ([0-9]+)K->([0-9]+)K\(([0-9]+)K\).*"
                         r" ([0-9]+)K->([0-9]+)K\(([0-9]+)K\)", re.MULTILINE)
 
-ABSOLUTE_TIME_REGEX = re.compile(r"^([0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}[.][0-9]{3}[+]0000):", re.MULTILINE)
+ABSOLUTE_TIME_REGEX = re.compile(r"^([0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}[.][0-9]{3}[+-][0-9]{4}):", re.MULTILINE)
 RELATIVE_TIME_REGEX = re.compile(r"^[0-9]+[.][0-9]+: ")
 
 CONFLATED_RELATIVE_REGEX = re.compile(r"(^.*[0-9]+[.][0-9]+ secs])([0-9]+[.][0-9]+: .*$)", re.MULTILINE)
@@ -39,6 +39,12 @@ class GCEventType(Enum):
     CMS_CONCURRENT_RESET = ("CMS_concurrent_reset", "CMS-concurrent-reset", False)
     PS_YOUNG_GEN = ("PSYoungGen", "PSYoungGen", True)
     DEF_NEW = ("DefNew", "DefNew", True)
+    # Only logged through JDK 9+ unified logging, which `UnifiedLogParser` classifies without matching gc_text
+    G1_YOUNG = ("G1_young", None, True)
+    G1_MIXED = ("G1_mixed", None, True)
+    G1_REMARK = ("G1_remark", None, True)
+    G1_CLEANUP = ("G1_cleanup", None, True)
+    G1_CONCURRENT_CYCLE = ("G1_concurrent_cycle", None, False)
 
     def __init__(self, stats_name: str, gc_text: str = None, is_stop_the_world: bool = False) -> None:
         self.stats_name = stats_name
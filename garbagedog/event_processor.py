@@ -1,14 +1,22 @@
 import sys
-from datetime import datetime
+import time
 
 from datadog.dogstatsd.base import DogStatsd
-from typing import Tuple, Optional, List
+from typing import Any, Dict, Optional, List, Sequence
 
-from .constants import ABSOLUTE_TIME_REGEX, RELATIVE_TIME_REGEX, CONFLATED_RELATIVE_REGEX, CONFLATED_ABSOLUTE_REGEX, \
-    TIMEFORMAT
-from .constants import GCEventType, GCSizeInfo
-from .utils import GCLogHandler
-from .utils import parse_line_for_times, parse_line_for_sizes
+from .constants import GCEventType
+from .aggregator import MetricAggregator
+from .checkpoint import Checkpointer
+from .formats import FORMAT_AUTO, FORMAT_JDK8, create_log_parser, sniff_format
+from .health import DEFAULT_THRESHOLDS, HealthMonitor, HealthThresholds
+from .mmu import DEFAULT_WINDOWS, MMUTracker
+from .parser import GCEvent
+from .parser import GENERATION_NONE, GENERATION_MINOR, GENERATION_MAJOR
+from .pipeline import Pipeline
+from .prometheus import PrometheusExporter
+from .self_metrics import SelfMetrics
+from .statsd import BufferedStatsd
+from .utils import GCLogHandler, printv
 
 
 class GCEventProcessor(object):
@@ -17,28 +25,146 @@ class GCEventProcessor(object):
                  dogstatsd_host: str,
                  dogstatsd_port: str,
                  extra_tags: Optional[List[str]],
-                 verbose: bool = False) -> None:
+                 verbose: bool = False,
+                 aggregate_interval: float = 0,
+                 stats: Any = None,
+                 self_metrics_interval: float = 0,
+                 dogstatsd_socket: Optional[str] = None,
+                 max_packet_size: int = 0,
+                 packet_flush_interval: float = 1,
+                 mmu_interval: float = 0,
+                 mmu_windows: Sequence[float] = DEFAULT_WINDOWS,
+                 log_format: str = FORMAT_AUTO,
+                 prometheus_port: int = 0,
+                 health_interval: float = 0,
+                 health_thresholds: HealthThresholds = DEFAULT_THRESHOLDS) -> None:
         """
         Given a dogstatsd connection, provide an object for processing JVM garbage collector logs and emitting
         relevant events over dogstatsd. GC logs can be input via a log directory or STDIN.
 
+        Several processors can share one client by passing it as `stats`; `extra_tags` are then added to each metric
+        this processor sends, instead of being set as the client's constant tags.
+
         :param dogstatsd_host: dogstatsd connection host
         :param dogstatsd_port: dogstatsd connection port
         :param extra_tags: dogstatsd constant tags
         :param verbose: If True, print extra info when processing logs
+        :param aggregate_interval: If set, aggregate timings and histograms in process and send percentile summaries
+                                   every `aggregate_interval` seconds instead of sending every sample
+        :param stats: Shared DogStatsd compatible client to send metrics with, instead of creating one
+        :param self_metrics_interval: If set, send garbagedog's own throughput, lag and parse failure metrics every
+                                      `self_metrics_interval` seconds (see `SelfMetrics`)
+        :param dogstatsd_socket: If set, send to the dogstatsd unix domain socket at this path instead of over UDP
+        :param max_packet_size: If set, pack metrics into datagrams of up to this many bytes (see `BufferedStatsd`)
+                                instead of sending one datagram per metric
+        :param packet_flush_interval: How often (in seconds) to send a partly filled datagram, with `max_packet_size`
+        :param mmu_interval: If set, send the minimum mutator utilization over `mmu_windows` every `mmu_interval`
+                             seconds (see `MMUTracker`)
+        :param mmu_windows: Window lengths (in seconds) to send the minimum mutator utilization of
+        :param log_format: Format of the GC logs (see `garbagedog.formats`), by default told from the first record
+        :param prometheus_port: If set, also serve pause, allocation, promotion and GC frequency histograms over the
+                                last 1, 5 and 15 minutes for Prometheus on this port (see `PrometheusExporter`)
+        :param health_interval: If set, send GC time fraction, pause and old gen trend gauges every `health_interval`
+                                seconds, and events when `health_thresholds` are crossed (see `HealthMonitor`)
+        :param health_thresholds: When to send GC health events, with `health_interval`
         """
-        self.stats = DogStatsd(host=dogstatsd_host, port=dogstatsd_port, constant_tags=extra_tags)
         self.verbose = verbose
+        self.source_tags = None  # type: Optional[List[str]]
+        self.buffered_stats = None  # type: Optional[BufferedStatsd]
+        if stats is not None:
+            self.stats = stats  # type: Any
+            self.source_tags = extra_tags or None
+        elif max_packet_size:
+            self.buffered_stats = BufferedStatsd(host=dogstatsd_host, port=int(dogstatsd_port),
+                                                 socket_path=dogstatsd_socket, constant_tags=extra_tags,
+                                                 max_packet_size=max_packet_size, flush_interval=packet_flush_interval)
+            self.buffered_stats.start()
+            self.stats = self.buffered_stats
+        else:
+            self.stats = DogStatsd(host=dogstatsd_host, port=dogstatsd_port, constant_tags=extra_tags,
+                                   socket_path=dogstatsd_socket)
+
+        # Set once the format is known
+        self.log_format = FORMAT_AUTO
+        self.log_parser = None  # type: Any
+
+        # Tags only depend on the event type, so build each list once
+        self._event_tags = {}  # type: Dict[GCEventType, List[str]]
+
+        self.aggregator = None  # type: Optional[MetricAggregator]
+        if aggregate_interval and stats is None:
+            self.aggregator = MetricAggregator(self.stats, flush_interval=aggregate_interval)
+            self.aggregator.start()
+            self.stats = self.aggregator
+
+        self.prometheus = None  # type: Optional[PrometheusExporter]
+        if prometheus_port and stats is None:
+            self.prometheus = PrometheusExporter(self.stats, prometheus_port, constant_tags=extra_tags)
+            self.prometheus.start()
+            self.stats = self.prometheus
 
-        self.last_time_and_size_info = None  # type: Optional[Tuple[datetime, GCSizeInfo]]
-        self.last_minor_time = None  # type: Optional[datetime]
-        self.last_major_time = None  # type: Optional[datetime]
+        self.self_metrics = None  # type: Optional[SelfMetrics]
+        if self_metrics_interval:
+            self.self_metrics = SelfMetrics(self.stats, flush_interval=self_metrics_interval, tags=self.source_tags)
+            self.self_metrics.start()
+
+        self.mmu = None  # type: Optional[MMUTracker]
+        if mmu_interval:
+            self.mmu = MMUTracker(self.stats, windows=mmu_windows, flush_interval=mmu_interval, tags=self.source_tags)
+            self.mmu.start()
+
+        self.health = None  # type: Optional[HealthMonitor]
+        if health_interval:
+            self.health = HealthMonitor(self.stats, thresholds=health_thresholds, flush_interval=health_interval,
+                                        tags=self.source_tags)
+            self.health.start()
+
+        if log_format != FORMAT_AUTO:
+            self.set_log_format(log_format)
+
+        # Timestamps are seconds since the epoch
+        # The last event with sizes, allocation and promotion rates are measured from it
+        self.last_sized_event = None  # type: Optional[GCEvent]
+        self.last_minor_time = None  # type: Optional[float]
+        self.last_major_time = None  # type: Optional[float]
+
+    def set_log_format(self, log_format: str) -> None:
+        """
+        Parse lines in `log_format` from now on
+
+        :param log_format: FORMAT_JDK8 or FORMAT_UNIFIED
+        """
+        self.log_format = log_format
+        self.log_parser = create_log_parser(log_format)
+        if self.self_metrics:
+            self.self_metrics.assembler = self.log_parser
+
+    def close(self) -> None:
+        """
+        Flush any metrics still held in process
+        """
+        if self.self_metrics:
+            self.self_metrics.stop()
+        if self.mmu:
+            self.mmu.stop()
+        if self.health:
+            self.health.stop()
+        if self.prometheus:
+            self.prometheus.stop()
+        if self.aggregator:
+            self.aggregator.stop()
+        if self.buffered_stats:
+            self.buffered_stats.stop()
 
     def process_log_directory(self,
                               log_directory: str,
                               glob_pattern: str = "gc.log*",
                               refresh_logfiles_seconds: int = 60,
-                              sleep_seconds: int = 1) -> None:
+                              sleep_seconds: int = 1,
+                              use_inotify: bool = True,
+                              checkpointer: Optional[Checkpointer] = None,
+                              max_catchup_bytes: Optional[int] = None,
+                              pipeline: Optional[Pipeline] = None) -> None:
         """
         Given a directory of GC logs, generate datadog stats from log lines as they are added to the newest gc* log file
 
@@ -46,98 +172,199 @@ class GCEventProcessor(object):
         :param glob_pattern: Pattern to match for garbage collection logs
         :param refresh_logfiles_seconds: How often (in seconds) to check for newer rotated log files
         :param sleep_seconds: How often (in seconds) to poll for new log lines
+        :param use_inotify: If True, wait for inotify events instead of polling when inotify is available
+        :param checkpointer: If set, resume from its checkpoint and periodically save the read position and state
+        :param max_catchup_bytes: Maximum number of bytes to replay when resuming from a checkpoint
+        :param pipeline: If set, read, parse and send in separate threads through its queues. Can not be used with
+                         `checkpointer`, as lines are read ahead of being processed
         """
+        if pipeline and checkpointer:
+            raise ValueError("A pipeline can not be used with a checkpointer")
+
+        state = checkpointer.load() if checkpointer else None
+        resume_position = None
+        if state:
+            resume_position = (state["log"]["device"], state["log"]["inode"], state["log"]["offset"])
+
         with GCLogHandler(log_directory,
                           glob_pattern=glob_pattern,
                           refresh_logfiles_seconds=refresh_logfiles_seconds,
                           sleep_seconds=sleep_seconds,
-                          verbose=self.verbose) as log_handler:
-            previous_record = ""
-            for line in log_handler:
-                previous_record = self._process_line(line, previous_record)
+                          verbose=self.verbose,
+                          use_inotify=use_inotify,
+                          resume_position=resume_position,
+                          max_catchup_bytes=max_catchup_bytes) as log_handler:
+            if self.self_metrics:
+                self.self_metrics.log_handler = log_handler
+            if pipeline:
+                pipeline.run(log_handler, self)
+                return
+
+            if state and log_handler.resumed:
+                self.restore_state(state["processor"])
+
+            try:
+                for line in log_handler:
+                    self._process_line(line)
+                    if checkpointer and checkpointer.due():
+                        self._save_checkpoint(checkpointer, log_handler, log_handler.offset)
+            finally:
+                if checkpointer:
+                    # The line being processed when interrupted, if any, is read again on restart
+                    self._save_checkpoint(checkpointer, log_handler, log_handler.consumed_offset)
 
-    def process_stdin(self) -> None:
+    def process_stdin(self, pipeline: Optional[Pipeline] = None) -> None:
         """
         Generate datadog stats from log lines from STDIN
+
+        :param pipeline: If set, read, parse and send in separate threads through its queues
         """
-        previous_record = ""
+        if pipeline:
+            pipeline.run(iter(sys.stdin.readline, ""), self)
+            return
+
         while True:
             inline = sys.stdin.readline()
             if not inline:
                 break
-            previous_record = self._process_line(inline, previous_record)
-
-    def _process_for_frequency_stats(self, stripped_line: str) -> None:
-        line_time_match = ABSOLUTE_TIME_REGEX.match(stripped_line)
-        if line_time_match:
-            line_time = datetime.strptime(line_time_match.group(1), TIMEFORMAT)
-            if GCEventType.CMS_INITIAL_MARK.gc_text in stripped_line or GCEventType.FULL_GC.gc_text in stripped_line:
-                if self.last_major_time:
-                    elapsed = (line_time - self.last_major_time).total_seconds()
-                    self.stats.histogram("garbagedog_time_between_old_gc", elapsed)
-                self.last_major_time = line_time
-            elif GCEventType.PAR_NEW.gc_text in stripped_line or GCEventType.PS_YOUNG_GEN.gc_text in stripped_line:
-                if self.last_minor_time:
-                    elapsed = (line_time - self.last_minor_time).total_seconds()
-                    self.stats.histogram("garbagedog_time_between_young_gc", elapsed)
-                self.last_minor_time = line_time
+            self._process_line(inline)
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Return the state carried between log records, including the partially assembled record not yet processed, as
+        a JSON serializable dict
+
+        :return: Processor state
+        """
+        last_time_and_size_info = None
+        last_sized_event = self.last_sized_event
+        if last_sized_event:
+            last_time_and_size_info = [last_sized_event.timestamp, list(last_sized_event.size_info)]
+        return {
+            "last_time_and_size_info": last_time_and_size_info,
+            "last_minor_time": self.last_minor_time,
+            "last_major_time": self.last_major_time,
+            "previous_record": self.log_parser.pending() if self.log_parser else "",
+            "log_format": self.log_format,
+            "log_parser": self.log_parser.get_state() if self.log_parser else {},
+        }
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        """
+        Restore state saved by `get_state`
+
+        :param state: Processor state
+        """
+        self.last_sized_event = None
+        if state["last_time_and_size_info"]:
+            timestamp, size_info = state["last_time_and_size_info"]
+            self.last_sized_event = GCEvent(timestamp, None, None, GENERATION_NONE, None, None, *size_info)
+        self.last_minor_time = state["last_minor_time"]
+        self.last_major_time = state["last_major_time"]
+        # Checkpoints from before unified logging was supported don't say
+        log_format = state.get("log_format", FORMAT_JDK8)
+        if self.log_format == FORMAT_AUTO and log_format != FORMAT_AUTO:
+            self.set_log_format(log_format)
+        if self.log_parser:
+            self.log_parser.reset(state["previous_record"])
+            self.log_parser.restore_state(state.get("log_parser", {}))
+
+    def _save_checkpoint(self, checkpointer: Checkpointer, log_handler: GCLogHandler, offset: int) -> None:
+        if not log_handler.file_identity:
+            return
+        device, inode = log_handler.file_identity
+        checkpointer.save({
+            "log": {"path": log_handler.log_path, "device": device, "inode": inode, "offset": offset},
+            "processor": self.get_state(),
+        })
+
+    def _process_for_frequency_stats(self, record: GCEvent) -> None:
+        if record.generation == GENERATION_MAJOR:
+            if self.last_major_time:
+                elapsed = record.timestamp - self.last_major_time
+                self.stats.histogram("garbagedog_time_between_old_gc", elapsed, tags=self.source_tags)
+            self.last_major_time = record.timestamp
+        elif record.generation == GENERATION_MINOR:
+            if self.last_minor_time:
+                elapsed = record.timestamp - self.last_minor_time
+                self.stats.histogram("garbagedog_time_between_young_gc", elapsed, tags=self.source_tags)
+            self.last_minor_time = record.timestamp
 
     def _process_eventline(self, stripped_line: str) -> None:
         if stripped_line:
             if self.verbose:
                 print('.', end='', flush=True)
 
-            self._process_for_frequency_stats(stripped_line)
-
-            time_info = parse_line_for_times(stripped_line)
-            if time_info:
-                event_type, duration = time_info
-                if event_type == GCEventType.PROMOTION_FAILED:
-                    print(event_type)
-                    print(event_type.is_stop_the_world)
-                    print(event_type.stats_name)
-                tags = ["stw:{}".format(event_type.is_stop_the_world), "event_type:{}".format(event_type.stats_name)]
-                self.stats.timing("garbagedog_gc_event_duration", duration, tags=tags)
-
-            time_and_size_info = parse_line_for_sizes(stripped_line)
-            if time_and_size_info:
-                timestamp, size_info = time_and_size_info
-                if self.last_time_and_size_info:
-                    event_time = timestamp
-                    last_event_time, last_size_info = self.last_time_and_size_info
-                    elapsed = (event_time - last_event_time).total_seconds()
-
-                    # Allocation rate
-                    bytes_added = abs(size_info.young_begin_k - last_size_info.young_end_k)
-                    self.stats.histogram("garbagedog_allocation_rate_histogram", bytes_added / elapsed)
-
-                    # Promotion rate
-                    young_decreased = abs(size_info.young_begin_k - size_info.young_end_k)
-                    total_decreased = abs(size_info.whole_heap_begin_k - size_info.whole_heap_end_k)
-                    if total_decreased < young_decreased:
-                        promoted = abs(total_decreased - young_decreased)
-                        self.stats.histogram("garbagedog_promotion_rate_histogram", promoted / elapsed)
-
-                self.last_time_and_size_info = (timestamp, size_info)
-
-    def _process_line(self, inline: str, previous_record: str) -> str:
-        stripped_line = inline.rstrip()
-
-        conflated_relative = CONFLATED_RELATIVE_REGEX.match(stripped_line)
-        conflated_absolute = CONFLATED_ABSOLUTE_REGEX.match(stripped_line)
-
-        if ABSOLUTE_TIME_REGEX.match(stripped_line) or RELATIVE_TIME_REGEX.match(stripped_line):
-            self._process_eventline(previous_record)
-            previous_record = stripped_line
-        elif conflated_relative:
-            previous_record = previous_record + conflated_relative.group(1)
-            self._process_eventline(previous_record)
-            previous_record = conflated_relative.group(2)
-        elif conflated_absolute:
-            previous_record = previous_record + conflated_absolute.group(1)
-            self._process_eventline(previous_record)
-            previous_record = conflated_absolute.group(2)
-        else:
-            previous_record = previous_record + " " + stripped_line
+            self_metrics = self.self_metrics
+            if self_metrics is None:
+                record = self.log_parser.parse(stripped_line)
+            else:
+                start = time.perf_counter()
+                record = self.log_parser.parse(stripped_line)
+                self_metrics.count_record(record, time.perf_counter() - start)
+            if record:
+                self._process_record(record)
+
+    def _process_safepoint(self, record: GCEvent) -> None:
+        self.stats.timing("garbagedog_app_stopped_time", record.stopped_time, tags=self.source_tags)
+        if record.safepoint_time is not None:
+            self.stats.timing("garbagedog_time_to_safepoint", record.safepoint_time, tags=self.source_tags)
+        if self.mmu is not None and record.timestamp is not None:
+            self.mmu.add_pause(record.timestamp, record.stopped_time)
+
+    def _process_record(self, record: GCEvent) -> None:
+        if record.stopped_time is not None:
+            self._process_safepoint(record)
+            return
+
+        self._process_for_frequency_stats(record)
+        if self.health is not None:
+            self.health.add_record(record)
+
+        if record.event_type:
+            event_type = record.event_type
+            if event_type == GCEventType.PROMOTION_FAILED:
+                print(event_type)
+                print(event_type.is_stop_the_world)
+                print(event_type.stats_name)
+            tags = self._event_tags.get(event_type)
+            if tags is None:
+                tags = self._event_tags[event_type] = [
+                    "stw:{}".format(event_type.is_stop_the_world),
+                    "event_type:{}".format(event_type.stats_name)] + (self.source_tags or [])
+            self.stats.timing("garbagedog_gc_event_duration", record.duration, tags=tags)
+
+        if record.young_begin_k is not None:
+            last_event = self.last_sized_event
+            # Records logged in the same millisecond, or out of order, have no rate between them
+            if last_event and record.timestamp > last_event.timestamp:
+                elapsed = record.timestamp - last_event.timestamp
+
+                # Allocation rate
+                bytes_added = abs(record.young_begin_k - last_event.young_end_k)
+                self.stats.histogram("garbagedog_allocation_rate_histogram", bytes_added / elapsed,
+                                     tags=self.source_tags)
+
+                # Promotion rate
+                young_decreased = abs(record.young_begin_k - record.young_end_k)
+                total_decreased = abs(record.whole_heap_begin_k - record.whole_heap_end_k)
+                if total_decreased < young_decreased:
+                    promoted = abs(total_decreased - young_decreased)
+                    self.stats.histogram("garbagedog_promotion_rate_histogram", promoted / elapsed,
+                                         tags=self.source_tags)
+
+            self.last_sized_event = record
 
-        return previous_record
+    def _process_line(self, inline: str) -> None:
+        if self.self_metrics is not None:
+            self.self_metrics.lines += 1
+        line = inline.rstrip()
+        if self.log_parser is None:
+            log_format = sniff_format(line)
+            if log_format is None:
+                return
+            printv("Reading {} format logs".format(log_format), self.verbose)
+            self.set_log_format(log_format)
+        record = self.log_parser.add_line(line)
+        if record:
+            self._process_eventline(record)
@@ -0,0 +1,72 @@
+from typing import Any, Dict, Iterable, Optional, Union
+
+from .parser import RECORD_START, RecordAssembler, classify_line, parse_record
+from .unified import UNIFIED_LINE_AT, UnifiedLogParser
+
+FORMAT_AUTO = "auto"
+# -XX:+PrintGCDetails logs of the CMS, Parallel and Serial collectors
+FORMAT_JDK8 = "jdk8"
+# JDK 9+ -Xlog:gc* logs
+FORMAT_UNIFIED = "unified"
+LOG_FORMATS = (FORMAT_AUTO, FORMAT_JDK8, FORMAT_UNIFIED)
+
+# How many lines to look for a record in before sniffing a file gives up
+_SNIFF_LINES = 1000
+
+
+class JDK8LogParser(RecordAssembler):
+    """
+    `RecordAssembler` with `parse_record` as `parse`, so both formats are handled alike
+    """
+    parse = staticmethod(parse_record)
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        :return: Nothing, the pending record is all the state there is
+        """
+        return {}
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        pass
+
+
+def create_log_parser(log_format: str) -> Union[JDK8LogParser, UnifiedLogParser]:
+    """
+    :param log_format: FORMAT_JDK8 or FORMAT_UNIFIED
+    :return: A parser for logs of that format, with `add_line` to pick out records, `parse` to parse them,
+             `pending`, `reset`, `get_state`, `restore_state` and `truncated_records`
+    """
+    if log_format == FORMAT_JDK8:
+        return JDK8LogParser()
+    if log_format == FORMAT_UNIFIED:
+        return UnifiedLogParser()
+    raise ValueError("Unknown log format {!r}".format(log_format))
+
+
+def sniff_format(line: str) -> Optional[str]:
+    """
+    Tell the format of a log from one of its lines. Lines that are not records in either format, ie the header of
+    a JDK 8 log or a continuation line, tell nothing.
+
+    :param line: Log line with trailing whitespace removed
+    :return: FORMAT_JDK8, FORMAT_UNIFIED, or None if the line doesn't tell
+    """
+    if line[:1] == "[":
+        return FORMAT_UNIFIED if UNIFIED_LINE_AT.match(line) else None
+    if classify_line(line)[0] == RECORD_START:
+        return FORMAT_JDK8
+    return None
+
+
+def sniff_lines(lines: Iterable[str]) -> str:
+    """
+    :param lines: The first lines of a log
+    :return: The format of the first record among the first lines, FORMAT_JDK8 if there is none
+    """
+    for index, line in enumerate(lines):
+        if index == _SNIFF_LINES:
+            break
+        log_format = sniff_format(line.rstrip())
+        if log_format:
+            return log_format
+    return FORMAT_JDK8
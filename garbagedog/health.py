@@ -0,0 +1,297 @@
+import math
+import threading
+from collections import namedtuple
+
+from typing import Any, List, Optional
+
+from .constants import GCEventType
+from .parser import GCEvent, GENERATION_MINOR
+
+HealthThresholds = namedtuple("HealthThresholds", "gc_fraction, old_gen_fraction, seconds_to_full, "
+                                                  "back_to_back_full_gcs, full_gc_interval, alert_interval")
+
+DEFAULT_THRESHOLDS = HealthThresholds(
+    # Fraction of wall time spent in stop the world pauses
+    gc_fraction=0.1,
+    # Old gen occupancy after a major collection, as a fraction of its capacity
+    old_gen_fraction=0.9,
+    # How soon the old gen after major collections is projected to fill its capacity, in seconds
+    seconds_to_full=3600.0,
+    # Full GCs in a row, each starting within `full_gc_interval` seconds of the one before
+    back_to_back_full_gcs=3,
+    full_gc_interval=60.0,
+    # Least seconds of log time between two alerts of the same kind
+    alert_interval=600.0,
+)
+
+# Time constant (in seconds) of the GC time fraction's exponential decay
+DEFAULT_GC_FRACTION_SECONDS = 300.0
+# Weight of each new pause in the pause duration EWMA
+DEFAULT_PAUSE_ALPHA = 0.1
+# Major collections the old gen trend is fitted over, older ones fade out exponentially
+DEFAULT_TREND_POINTS = 10
+
+# Collections after which the old gen holds about only what is live, measured at the next young collection
+_MAJOR_COLLECTION_ENDS = (GCEventType.FULL_GC, GCEventType.CMS_CONCURRENT_SWEEP)
+_PROMOTION_FAILURES = (GCEventType.PROMOTION_FAILED, GCEventType.CONCURRENT_MODE_FAILURE)
+
+
+def parse_thresholds(spec: str, defaults: HealthThresholds = DEFAULT_THRESHOLDS) -> HealthThresholds:
+    """
+    Parse a thresholds spec such as `gc_fraction=0.05,seconds_to_full=1800`, where each key is a field of
+    `HealthThresholds` and the ones left out keep their default
+
+    :param spec: Thresholds spec
+    :param defaults: Thresholds the spec overrides
+    :return: Thresholds
+    :raises ValueError: If the spec is malformed
+    """
+    values = {}
+    for item in spec.replace(" ", "").split(","):
+        if not item:
+            continue
+        key, separator, value = item.partition("=")
+        if not separator or key not in HealthThresholds._fields:
+            raise ValueError("Expected one of {} as key=value, got {!r}".format(HealthThresholds._fields, item))
+        values[key] = type(getattr(defaults, key))(value)
+    return defaults._replace(**values)
+
+
+class _DecayedTrend(object):
+
+    def __init__(self, points: int) -> None:
+        """
+        Least squares line through (time, value) points, each weighted `1 - 1 / points` times the one after it, so it
+        follows about the last `points` points in O(1) memory. Times are kept relative to the first point.
+        """
+        self.decay = 1 - 1.0 / points
+        self.count = 0
+        self._origin = None  # type: Optional[float]
+        self._weight = self._sum_t = self._sum_v = self._sum_tt = self._sum_tv = 0.0
+
+    def add(self, timestamp: float, value: float) -> None:
+        if self._origin is None:
+            self._origin = timestamp
+        t = timestamp - self._origin
+        decay = self.decay
+        self._weight = self._weight * decay + 1
+        self._sum_t = self._sum_t * decay + t
+        self._sum_v = self._sum_v * decay + value
+        self._sum_tt = self._sum_tt * decay + t * t
+        self._sum_tv = self._sum_tv * decay + t * value
+        self.count += 1
+
+    @property
+    def slope(self) -> Optional[float]:
+        """
+        Change of the value per second, None until there are 3 points at different times
+        """
+        spread = self._weight * self._sum_tt - self._sum_t * self._sum_t
+        if self.count < 3 or spread <= 0:
+            return None
+        return (self._weight * self._sum_tv - self._sum_t * self._sum_v) / spread
+
+
+class HealthMonitor(object):
+
+    def __init__(self,
+                 stats,
+                 thresholds: HealthThresholds = DEFAULT_THRESHOLDS,
+                 flush_interval: float = 10,
+                 tags: Optional[List[str]] = None,
+                 gc_fraction_seconds: float = DEFAULT_GC_FRACTION_SECONDS,
+                 pause_alpha: float = DEFAULT_PAUSE_ALPHA,
+                 trend_points: int = DEFAULT_TREND_POINTS) -> None:
+        """
+        Watch the parsed records of one JVM for the signs of a GC death spiral or a heap leak, keeping only running
+        statistics, so O(1) memory however long it runs:
+
+        - the fraction of wall time in stop the world pauses, decayed exponentially over `gc_fraction_seconds`
+        - an EWMA of the stop the world pause durations
+        - the old gen occupancy after each major collection (a full GC, or the end of a CMS cycle), read from the heap
+          and young gen sizes before the next young collection, and a decaying least squares trend of it
+        - the number of full GCs in a row that started within `thresholds.full_gc_interval` of the one before
+
+        A DogStatsd event is sent as soon as a record trips one of `thresholds`, or is a promotion failure or
+        concurrent mode failure, at most once per `thresholds.alert_interval` seconds of log time for each kind of
+        alert. Every `flush_interval` seconds the statistics are sent as gauges: `garbagedog_gc_time_fraction`,
+        `garbagedog_pause_time_ewma`, `garbagedog_old_gen_after_major_gc` (KB), `garbagedog_old_gen_growth_rate`
+        (KB/s) and `garbagedog_old_gen_seconds_to_full` while it grows.
+
+        :param stats: DogStatsd compatible client to send with
+        :param thresholds: When to alert
+        :param flush_interval: How often (in seconds) to send gauges when started with `start`
+        :param tags: Tags added to every gauge and event
+        :param gc_fraction_seconds: Time constant (in seconds) of the GC time fraction
+        :param pause_alpha: Weight of each new pause in the pause duration EWMA
+        :param trend_points: Major collections the old gen trend follows
+        """
+        self.stats = stats
+        self.thresholds = thresholds
+        self.flush_interval = flush_interval
+        self.tags = tags
+        self.gc_fraction_seconds = gc_fraction_seconds
+        self.pause_alpha = pause_alpha
+
+        # Timestamps are seconds since the epoch
+        self.first_time = None  # type: Optional[float]
+        self.last_pause_time = None  # type: Optional[float]
+        self.decayed_pause_seconds = 0.0
+        self.pause_ewma = None  # type: Optional[float]
+        self.old_gen_k = None  # type: Optional[int]
+        self.old_gen_capacity_k = None  # type: Optional[int]
+        self.old_gen_trend = _DecayedTrend(trend_points)
+        self.last_full_gc_time = None  # type: Optional[float]
+        self.full_gcs_in_a_row = 0
+
+        self._major_collection_ended = False
+        self._last_alerts = {}  # type: dict
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flush_thread = None  # type: Optional[threading.Thread]
+
+    def add_record(self, record: GCEvent) -> None:
+        """
+        :param record: Parsed record, in log order
+        """
+        timestamp = record.timestamp
+        event_type = record.event_type
+        if timestamp is None:
+            return
+        with self._lock:
+            if self.first_time is None:
+                self.first_time = timestamp
+            if event_type is not None and event_type.is_stop_the_world and record.duration is not None:
+                self._add_pause(timestamp, record.duration)
+            if event_type in _PROMOTION_FAILURES:
+                self._alert("promotion_failure", timestamp, "error", "{} in the JVM's GC log".format(
+                    event_type.stats_name), "The young gen could not be promoted into the old gen, which was "
+                    "collected in a full stop the world GC instead.")
+            if event_type == GCEventType.FULL_GC:
+                self._add_full_gc(timestamp)
+            if event_type in _MAJOR_COLLECTION_ENDS:
+                self._major_collection_ended = True
+            elif self._major_collection_ended and record.generation == GENERATION_MINOR:
+                if record.young_begin_k is None:
+                    return
+                self._major_collection_ended = False
+                self._add_old_gen(timestamp, record.whole_heap_begin_k - record.young_begin_k,
+                                  record.whole_heap_total_k - record.young_total_k)
+
+    @property
+    def gc_fraction(self) -> Optional[float]:
+        """
+        Fraction of wall time spent in stop the world pauses, up to the last pause
+        """
+        if self.last_pause_time is None or self.first_time is None:
+            return None
+        # The weight of the time since the first record, so early on this is not diluted by time before the log started
+        elapsed = self.last_pause_time - self.first_time
+        elapsed_weight = self.gc_fraction_seconds * -math.expm1(-elapsed / self.gc_fraction_seconds)
+        if elapsed_weight <= 0:
+            return None
+        return min(1.0, self.decayed_pause_seconds / elapsed_weight)
+
+    @property
+    def seconds_to_full(self) -> Optional[float]:
+        """
+        Seconds until the old gen after major collections reaches its capacity at its current rate of growth, None
+        while it is not growing
+        """
+        slope = self.old_gen_trend.slope
+        if not slope or slope <= 0 or self.old_gen_k is None or self.old_gen_capacity_k is None:
+            return None
+        return max(0.0, (self.old_gen_capacity_k - self.old_gen_k) / slope)
+
+    def start(self) -> None:
+        """
+        Flush every `flush_interval` seconds from a background thread
+        """
+        self._stop_event.clear()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="garbagedog-health", daemon=True)
+        self._flush_thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread, and send the gauges once more
+        """
+        self._stop_event.set()
+        if self._flush_thread:
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Send the gauges of every statistic there is data for
+        """
+        with self._lock:
+            gauges = [("garbagedog_gc_time_fraction", self.gc_fraction),
+                      ("garbagedog_pause_time_ewma", self.pause_ewma),
+                      ("garbagedog_old_gen_after_major_gc", self.old_gen_k),
+                      ("garbagedog_old_gen_growth_rate", self.old_gen_trend.slope),
+                      ("garbagedog_old_gen_seconds_to_full", self.seconds_to_full)]
+        for metric, value in gauges:
+            if value is not None:
+                self.stats.gauge(metric, value, tags=self.tags)
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def _add_pause(self, timestamp: float, duration: float) -> None:
+        if self.last_pause_time is not None and timestamp > self.last_pause_time:
+            self.decayed_pause_seconds *= math.exp(-(timestamp - self.last_pause_time) / self.gc_fraction_seconds)
+        if self.last_pause_time is None or timestamp > self.last_pause_time:
+            self.last_pause_time = timestamp
+        self.decayed_pause_seconds += duration
+        if self.pause_ewma is None:
+            self.pause_ewma = duration
+        else:
+            self.pause_ewma += self.pause_alpha * (duration - self.pause_ewma)
+
+        gc_fraction = self.gc_fraction
+        if gc_fraction is None or gc_fraction <= self.thresholds.gc_fraction:
+            return
+        # Not before a whole time constant has passed, one long pause at startup is no spiral
+        if self.first_time is not None and timestamp - self.first_time >= self.gc_fraction_seconds:
+            self._alert("gc_fraction", timestamp, "warning", "GC took {:.0%} of wall time".format(gc_fraction),
+                        "Stop the world pauses took {:.0%} of the last {:g} seconds, over the {:.0%} threshold."
+                        .format(gc_fraction, self.gc_fraction_seconds, self.thresholds.gc_fraction))
+
+    def _add_full_gc(self, timestamp: float) -> None:
+        if self.last_full_gc_time is not None and timestamp - self.last_full_gc_time <= self.thresholds.full_gc_interval:
+            self.full_gcs_in_a_row += 1
+        else:
+            self.full_gcs_in_a_row = 1
+        self.last_full_gc_time = timestamp
+        if self.full_gcs_in_a_row >= self.thresholds.back_to_back_full_gcs:
+            self._alert("back_to_back_full_gcs", timestamp, "error",
+                        "{} full GCs in a row".format(self.full_gcs_in_a_row),
+                        "{} full GCs started within {:g} seconds of each other: the old gen is nearly full of live "
+                        "objects.".format(self.full_gcs_in_a_row, self.thresholds.full_gc_interval))
+
+    def _add_old_gen(self, timestamp: float, old_gen_k: int, capacity_k: int) -> None:
+        self.old_gen_k = old_gen_k
+        self.old_gen_capacity_k = capacity_k
+        self.old_gen_trend.add(timestamp, old_gen_k)
+
+        if capacity_k > 0 and old_gen_k / capacity_k > self.thresholds.old_gen_fraction:
+            self._alert("old_gen_fraction", timestamp, "warning",
+                        "Old gen {:.0%} full after a major GC".format(old_gen_k / capacity_k),
+                        "{}K of the old gen's {}K was still in use after a major collection, over the {:.0%} "
+                        "threshold.".format(old_gen_k, capacity_k, self.thresholds.old_gen_fraction))
+        slope, seconds_to_full = self.old_gen_trend.slope, self.seconds_to_full
+        if slope is not None and seconds_to_full is not None and seconds_to_full < self.thresholds.seconds_to_full:
+            self._alert("seconds_to_full", timestamp, "warning",
+                        "Old gen projected to fill in {:.0f} seconds".format(seconds_to_full),
+                        "The old gen in use after major collections is growing by {:.0f}K/s, and at {}K of {}K "
+                        "fills in {:.0f} seconds.".format(slope, old_gen_k, capacity_k, seconds_to_full))
+
+    def _alert(self, kind: str, timestamp: float, alert_type: str, title: str, text: str) -> None:
+        last_alert = self._last_alerts.get(kind)
+        if last_alert is not None and timestamp - last_alert < self.thresholds.alert_interval:
+            return
+        self._last_alerts[kind] = timestamp
+        self.stats.event("garbagedog: " + title, text, alert_type=alert_type, date_happened=int(timestamp),
+                         aggregation_key="garbagedog_" + kind, source_type_name="garbagedog", tags=self.tags)
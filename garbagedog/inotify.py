@@ -0,0 +1,122 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+
+from typing import List, Tuple
+
+IN_MODIFY = 0x00000002
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+
+def _load_libc():
+    libc_name = ctypes.util.find_library("c")
+    if not libc_name:
+        return None
+    try:
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+_libc = _load_libc()
+
+
+def inotify_available() -> bool:
+    """
+    :return: True if this platform's libc exposes the inotify API
+    """
+    return _libc is not None
+
+
+class InotifyWatcher(object):
+
+    def __init__(self, directory: str, mask: int = IN_MODIFY | IN_CREATE | IN_MOVED_TO) -> None:
+        """
+        Watch a single directory for inotify events. The watcher is level-triggered over a non-blocking file
+        descriptor, so events written between two calls to `wait` are queued by the kernel rather than lost.
+
+        :param directory: Directory to watch
+        :param mask: inotify event mask to register for
+        :raises OSError: If inotify is unavailable or the directory cannot be watched
+        """
+        if _libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+
+        self.directory = directory
+        self.fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        self.wd = _libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if self.wd < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            self.fd = -1
+            raise OSError(err, os.strerror(err), directory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def wait(self, timeout: float) -> List[Tuple[int, str]]:
+        """
+        Block until at least one event is available or `timeout` seconds pass
+
+        :param timeout: Maximum time (in seconds) to wait
+        :return: List of (mask, file name) events, empty on timeout
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        return self.read_events()
+
+    def read_events(self) -> List[Tuple[int, str]]:
+        """
+        Drain all currently queued events without blocking
+
+        :return: List of (mask, file name) events
+        """
+        events = []  # type: List[Tuple[int, str]]
+        while True:
+            try:
+                data = os.read(self.fd, _READ_SIZE)
+            except BlockingIOError:
+                return events
+            if not data:
+                return events
+
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + name_length].rstrip(b"\0")
+                offset += name_length
+                events.append((mask, os.fsdecode(name)))
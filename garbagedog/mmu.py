@@ -0,0 +1,127 @@
+import threading
+from collections import deque
+
+from typing import List, Optional, Sequence
+
+DEFAULT_WINDOWS = (1.0, 10.0, 60.0)
+
+# Pauses kept for each window, the oldest two are merged beyond this
+DEFAULT_MAX_PAUSES = 4096
+
+
+class _Window(object):
+
+    def __init__(self, seconds: float, max_pauses: int) -> None:
+        self.seconds = seconds
+        self.max_pauses = max_pauses
+        self.min_utilization = None  # type: Optional[float]
+
+        # (start, end, seconds paused) of the pauses ending within the last `seconds`, oldest first
+        self._pauses = deque()  # type: deque
+        self._paused = 0.0
+
+    def add(self, start: float, end: float) -> None:
+        pauses = self._pauses
+        cutoff = end - self.seconds
+        while pauses and pauses[0][1] <= cutoff:
+            self._paused -= pauses.popleft()[2]
+        if not pauses:
+            # Don't let rounding errors add up
+            self._paused = 0.0
+
+        pauses.append((start, end, end - start))
+        self._paused += end - start
+        if len(pauses) > self.max_pauses:
+            first_start, _, first_paused = pauses.popleft()
+            _, second_end, second_paused = pauses.popleft()
+            pauses.appendleft((first_start, second_end, first_paused + second_paused))
+
+        paused = self._paused
+        first_start, first_end, first_paused = pauses[0]
+        if first_start < cutoff:
+            # Only the part of the oldest pause after the cutoff is in the window, spread evenly for merged pauses
+            paused -= first_paused * (cutoff - first_start) / (first_end - first_start)
+        utilization = max(0.0, 1 - paused / self.seconds)
+        if self.min_utilization is None or utilization < self.min_utilization:
+            self.min_utilization = utilization
+
+
+class MMUTracker(object):
+
+    def __init__(self,
+                 stats,
+                 windows: Sequence[float] = DEFAULT_WINDOWS,
+                 flush_interval: float = 10,
+                 tags: Optional[List[str]] = None,
+                 max_pauses: int = DEFAULT_MAX_PAUSES) -> None:
+        """
+        Track the minimum mutator utilization (MMU) of the JVM: for each window length, the smallest fraction of any
+        window of that length the application threads were running, rather than stopped at a safepoint. Every
+        `flush_interval` seconds the MMU of the windows ending at each pause added since the last flush is sent as the
+        `garbagedog_mmu` gauge, tagged `window:<seconds>s`. The least utilized window always ends as a pause ends, so
+        no other windows need to be looked at; nothing is sent for a window length if there were no pauses.
+
+        Each window length keeps the pauses ending within it, so adding a pause is amortized O(1). To bound memory
+        when pauses are very frequent, beyond `max_pauses` the oldest two are merged, and a merged pause straddling
+        the start of a window is counted pro rata.
+
+        :param stats: DogStatsd compatible client to send with
+        :param windows: Window lengths (in seconds)
+        :param flush_interval: How often (in seconds) to send when started with `start`
+        :param tags: Tags added to every metric
+        :param max_pauses: Maximum number of pauses kept for each window length
+        """
+        self.stats = stats
+        self.flush_interval = flush_interval
+        self.windows = [_Window(seconds, max_pauses) for seconds in windows]
+
+        self._window_tags = [["window:{:g}s".format(seconds)] + (tags or []) for seconds in windows]
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flush_thread = None  # type: Optional[threading.Thread]
+
+    def add_pause(self, end: float, duration: float) -> None:
+        """
+        :param end: When the pause ended, in seconds since the epoch
+        :param duration: How long (in seconds) the application threads were stopped
+        """
+        start = end - duration
+        with self._lock:
+            for window in self.windows:
+                window.add(start, end)
+
+    def start(self) -> None:
+        """
+        Flush every `flush_interval` seconds from a background thread
+        """
+        self._stop_event.clear()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="garbagedog-mmu", daemon=True)
+        self._flush_thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread, and flush the pauses added since the last flush
+        """
+        self._stop_event.set()
+        if self._flush_thread:
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Send the MMU of each window length over the pauses added since the last flush
+        """
+        with self._lock:
+            utilizations = []  # type: List[Optional[float]]
+            for window in self.windows:
+                utilizations.append(window.min_utilization)
+                window.min_utilization = None
+
+        for utilization, tags in zip(utilizations, self._window_tags):
+            if utilization is not None:
+                self.stats.gauge("garbagedog_mmu", utilization, tags=tags)
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
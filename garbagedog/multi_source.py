@@ -0,0 +1,231 @@
+import asyncio
+from collections import namedtuple
+
+from datadog.dogstatsd.base import DogStatsd
+from typing import Any, List, Optional, Sequence
+
+from .aggregator import MetricAggregator
+from .event_processor import GCEventProcessor
+from .formats import FORMAT_AUTO
+from .health import DEFAULT_THRESHOLDS, HealthThresholds
+from .mmu import DEFAULT_WINDOWS
+from .prometheus import PrometheusExporter
+from .statsd import BufferedStatsd
+from .utils import GCLogHandler, printv
+
+SourceConfig = namedtuple("SourceConfig", "log_dir, glob_pattern, tags")
+
+# Lines to process for one source before letting the others run
+_LINES_PER_TURN = 1000
+
+
+def parse_source_spec(spec: str, default_glob_pattern: str = "gc.log*") -> SourceConfig:
+    """
+    Parse a source spec such as `dir=/var/log/app1,glob=gc.log*,tags=app:foo,env:prod`. Keys are `dir` (required),
+    `glob` and `tags`; items without a `=` continue the previous key, so tags can be listed like `--tags`.
+
+    :param spec: Source spec
+    :param default_glob_pattern: Glob pattern used when the spec has no `glob`
+    :return: Source config
+    :raises ValueError: If the spec is malformed
+    """
+    values = {"dir": [], "glob": [], "tags": []}  # type: dict
+    key = None
+    for item in spec.replace(" ", "").split(","):
+        if not item:
+            continue
+        if "=" in item:
+            key, value = item.split("=", 1)
+            if key not in values:
+                raise ValueError("Unknown key {!r} in source {!r}".format(key, spec))
+        elif key == "tags":
+            value = item
+        else:
+            raise ValueError("Expected key=value, got {!r} in source {!r}".format(item, spec))
+        values[key].append(value)
+
+    if len(values["dir"]) != 1 or len(values["glob"]) > 1:
+        raise ValueError("Source {!r} needs exactly one dir and at most one glob".format(spec))
+    return SourceConfig(log_dir=values["dir"][0],
+                        glob_pattern=values["glob"][0] if values["glob"] else default_glob_pattern,
+                        tags=values["tags"])
+
+
+def load_source_file(path: str, default_glob_pattern: str = "gc.log*") -> List[SourceConfig]:
+    """
+    Read source specs from a file, one per line. Blank lines and lines starting with `#` are ignored.
+
+    :param path: Path of the source file
+    :param default_glob_pattern: Glob pattern used when a spec has no `glob`
+    :return: List of source configs
+    """
+    with open(path) as f:
+        return [parse_source_spec(line.strip(), default_glob_pattern)
+                for line in f if line.strip() and not line.strip().startswith("#")]
+
+
+class MultiSourceMonitor(object):
+
+    def __init__(self,
+                 sources: List[SourceConfig],
+                 dogstatsd_host: str,
+                 dogstatsd_port: int,
+                 extra_tags: Optional[List[str]],
+                 verbose: bool = False,
+                 aggregate_interval: float = 0,
+                 refresh_logfiles_seconds: int = 60,
+                 sleep_seconds: int = 1,
+                 use_inotify: bool = True,
+                 self_metrics_interval: float = 0,
+                 dogstatsd_socket: Optional[str] = None,
+                 max_packet_size: int = 0,
+                 packet_flush_interval: float = 1,
+                 mmu_interval: float = 0,
+                 mmu_windows: Sequence[float] = DEFAULT_WINDOWS,
+                 log_format: str = FORMAT_AUTO,
+                 prometheus_port: int = 0,
+                 health_interval: float = 0,
+                 health_thresholds: HealthThresholds = DEFAULT_THRESHOLDS) -> None:
+        """
+        Monitor the GC log directories of many JVMs from one asyncio event loop. Each source has its own log handler
+        and `GCEventProcessor` state, tagged with the source's tags, and all of them send through one DogStatsd
+        client.
+
+        :param sources: Log directories to monitor
+        :param dogstatsd_host: dogstatsd connection host
+        :param dogstatsd_port: dogstatsd connection port
+        :param extra_tags: dogstatsd constant tags, shared by all sources
+        :param verbose: If True, print extra info when processing logs
+        :param aggregate_interval: If set, aggregate timings and histograms in process and send percentile summaries
+                                   every `aggregate_interval` seconds instead of sending every sample
+        :param refresh_logfiles_seconds: How often (in seconds) to check for newer rotated log files
+        :param sleep_seconds: How often (in seconds) to poll for new log lines when inotify is not used
+        :param use_inotify: If True, wait for inotify events instead of polling when inotify is available
+        :param self_metrics_interval: If set, send each source's own throughput, lag and parse failure metrics every
+                                      `self_metrics_interval` seconds
+        :param dogstatsd_socket: If set, send to the dogstatsd unix domain socket at this path instead of over UDP
+        :param max_packet_size: If set, pack metrics into datagrams of up to this many bytes instead of sending one
+                                datagram per metric
+        :param packet_flush_interval: How often (in seconds) to send a partly filled datagram, with `max_packet_size`
+        :param mmu_interval: If set, send each source's minimum mutator utilization over `mmu_windows` every
+                             `mmu_interval` seconds
+        :param mmu_windows: Window lengths (in seconds) to send the minimum mutator utilization of
+        :param log_format: Format of the GC logs (see `garbagedog.formats`), by default told from each source's first
+                           record
+        :param prometheus_port: If set, also serve every source's pause, allocation, promotion and GC frequency
+                                histograms for Prometheus on this port, labelled with the source's tags
+        :param health_interval: If set, send each source's GC health gauges every `health_interval` seconds, and
+                                events when `health_thresholds` are crossed
+        :param health_thresholds: When to send GC health events, with `health_interval`
+        """
+        self.sources = sources
+        self.verbose = verbose
+        self.refresh_logfiles_seconds = refresh_logfiles_seconds
+        self.sleep_seconds = sleep_seconds
+        self.use_inotify = use_inotify
+
+        self.buffered_stats = None  # type: Optional[BufferedStatsd]
+        if max_packet_size:
+            self.buffered_stats = BufferedStatsd(host=dogstatsd_host, port=dogstatsd_port, socket_path=dogstatsd_socket,
+                                                 constant_tags=extra_tags, max_packet_size=max_packet_size,
+                                                 flush_interval=packet_flush_interval)
+            self.buffered_stats.start()
+            self.stats = self.buffered_stats  # type: Any
+        else:
+            self.stats = DogStatsd(host=dogstatsd_host, port=dogstatsd_port, constant_tags=extra_tags,
+                                   socket_path=dogstatsd_socket)
+        self.aggregator = None  # type: Optional[MetricAggregator]
+        if aggregate_interval:
+            self.aggregator = MetricAggregator(self.stats, flush_interval=aggregate_interval)
+            self.aggregator.start()
+            self.stats = self.aggregator
+        self.prometheus = None  # type: Optional[PrometheusExporter]
+        if prometheus_port:
+            self.prometheus = PrometheusExporter(self.stats, prometheus_port, constant_tags=extra_tags)
+            self.prometheus.start()
+            self.stats = self.prometheus
+
+        self.processors = [GCEventProcessor(dogstatsd_host, str(dogstatsd_port), source.tags, verbose, stats=self.stats,
+                                            self_metrics_interval=self_metrics_interval,
+                                            mmu_interval=mmu_interval, mmu_windows=mmu_windows,
+                                            log_format=log_format, health_interval=health_interval,
+                                            health_thresholds=health_thresholds)
+                           for source in sources]
+
+    def run(self) -> None:
+        """
+        Monitor all sources until interrupted
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        tasks = [loop.create_task(self.monitor_source(source, processor))
+                 for source, processor in zip(self.sources, self.processors)]
+        gathered = asyncio.gather(*tasks)
+        try:
+            loop.run_until_complete(gathered)
+        finally:
+            # Let every source unwind, closing its log file and inotify watcher, before the loop goes
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            if not gathered.cancelled():
+                # Already raised, don't let asyncio log it as never retrieved
+                gathered.exception()
+            loop.close()
+
+    def close(self) -> None:
+        """
+        Flush any metrics still held in process
+        """
+        for processor in self.processors:
+            processor.close()
+        if self.prometheus:
+            self.prometheus.stop()
+        if self.aggregator:
+            self.aggregator.stop()
+        if self.buffered_stats:
+            self.buffered_stats.stop()
+
+    async def monitor_source(self, source: SourceConfig, processor: GCEventProcessor) -> None:
+        """
+        Process new lines from one source, forever
+
+        :param source: Log directory to monitor
+        :param processor: Event processor holding this source's state
+        """
+        with GCLogHandler(source.log_dir,
+                          glob_pattern=source.glob_pattern,
+                          refresh_logfiles_seconds=self.refresh_logfiles_seconds,
+                          sleep_seconds=self.sleep_seconds,
+                          verbose=self.verbose,
+                          use_inotify=self.use_inotify) as log_handler:
+            if processor.self_metrics:
+                processor.self_metrics.log_handler = log_handler
+            while True:
+                lines_this_turn = 0
+                for line in log_handler.read_available_lines():
+                    processor._process_line(line)
+                    lines_this_turn += 1
+                    if lines_this_turn == _LINES_PER_TURN:
+                        lines_this_turn = 0
+                        await asyncio.sleep(0)
+                await self._wait_for_changes(log_handler)
+
+    async def _wait_for_changes(self, log_handler: GCLogHandler) -> None:
+        if not log_handler.watcher:
+            await asyncio.sleep(log_handler.wait_seconds())
+            return
+
+        loop = asyncio.get_event_loop()
+        changed = asyncio.Event()
+        fd = log_handler.watcher.fileno()
+        loop.add_reader(fd, changed.set)
+        try:
+            # Bounded like GCLogHandler's own wait, so rotated files are still rechecked periodically
+            await asyncio.wait_for(changed.wait(), log_handler.refresh_logfiles_seconds)
+        except asyncio.TimeoutError:
+            printv("No changes in {} for {} seconds"
+                   .format(log_handler.log_directory, log_handler.refresh_logfiles_seconds), self.verbose)
+        finally:
+            loop.remove_reader(fd)
+        log_handler.handle_watcher_events(log_handler.watcher.read_events())
@@ -0,0 +1,326 @@
+import re
+
+from typing import Any, List, Optional, Tuple
+
+from .constants import GCEventType, GCSizeInfo
+from .timestamps import TimestampDecoder
+
+# Line classes returned by `classify_line`
+RECORD_START = 0
+CONFLATED = 1
+CONTINUATION = 2
+
+# Which collection frequency a record counts towards
+GENERATION_NONE = 0
+GENERATION_MINOR = 1
+GENERATION_MAJOR = 2
+
+# Records longer than this are dropped, a record that never ends must not grow without limit
+DEFAULT_MAX_RECORD_LENGTH = 64 * 1024
+
+
+class GCEvent(object):
+    """
+    One parsed log record, passed through the whole pipeline. A slotted object of plain floats and ints: the sizes are
+    held flat rather than in a `GCSizeInfo`, so a record is a single object, and the event type is a reference to the
+    shared `GCEventType` member. Sizes are all None if the record has none.
+
+    Records of a safepoint (-XX:+PrintGCApplicationStoppedTime) have `stopped_time` set instead of `duration`, and
+    `safepoint_time` if the JVM logs how long stopping the threads took.
+    """
+    __slots__ = ("timestamp", "event_type", "duration", "generation", "stopped_time", "safepoint_time",
+                 "young_begin_k", "young_end_k", "young_total_k",
+                 "whole_heap_begin_k", "whole_heap_end_k", "whole_heap_total_k")
+
+    def __init__(self,
+                 timestamp: Optional[float] = None,
+                 event_type: Optional[GCEventType] = None,
+                 duration: Optional[float] = None,
+                 generation: int = GENERATION_NONE,
+                 stopped_time: Optional[float] = None,
+                 safepoint_time: Optional[float] = None,
+                 young_begin_k: Optional[int] = None,
+                 young_end_k: Optional[int] = None,
+                 young_total_k: Optional[int] = None,
+                 whole_heap_begin_k: Optional[int] = None,
+                 whole_heap_end_k: Optional[int] = None,
+                 whole_heap_total_k: Optional[int] = None) -> None:
+        """
+        :param timestamp: When the event happened, in seconds since the epoch
+        :param event_type: GC event type, None if the record has no duration
+        :param duration: Real time (in seconds) the event took
+        :param generation: Which collection frequency the record counts towards, one of the GENERATION_ constants
+        :param stopped_time: Seconds the application threads were stopped at a safepoint
+        :param safepoint_time: Seconds it took to stop the application threads
+        """
+        # Typed loosely, as the fields of the namedtuple this replaced were: which are None depends on the kind of record
+        self.timestamp = timestamp  # type: Any
+        self.event_type = event_type  # type: Any
+        self.duration = duration  # type: Any
+        self.generation = generation
+        self.stopped_time = stopped_time  # type: Any
+        self.safepoint_time = safepoint_time  # type: Any
+        self.young_begin_k = young_begin_k  # type: Any
+        self.young_end_k = young_end_k  # type: Any
+        self.young_total_k = young_total_k  # type: Any
+        self.whole_heap_begin_k = whole_heap_begin_k  # type: Any
+        self.whole_heap_end_k = whole_heap_end_k  # type: Any
+        self.whole_heap_total_k = whole_heap_total_k  # type: Any
+
+    @property
+    def size_info(self) -> Any:
+        """
+        The sizes as a `GCSizeInfo`, or None, built on each access for callers of the earlier API
+        """
+        if self.young_begin_k is None:
+            return None
+        return GCSizeInfo(self.young_begin_k, self.young_end_k, self.young_total_k,
+                          self.whole_heap_begin_k, self.whole_heap_end_k, self.whole_heap_total_k)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, GCEvent):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return "GCEvent({})".format(", ".join("{}={!r}".format(name, getattr(self, name)) for name in self.__slots__))
+
+
+# Anchored patterns, only ever tried at a position the scanner has already found a candidate for. None of them start
+# with `.*`, so unlike the regexes in constants.py they can not backtrack over the whole record.
+_ABSOLUTE_TIME_AT = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}[.][0-9]{3}[+-][0-9]{4}:")
+_RELATIVE_TIME_AT = re.compile(r"[0-9]+[.][0-9]+: ")
+_DATE_TIME_AT = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}")
+_REAL_TIME_AT = re.compile(r"([0-9]+[.][0-9]+) secs\]")
+_SIZE_PREFIX_AT = re.compile(r"[0-9]+[.][0-9]{3}: ")
+_SIZE_TRIPLE = re.compile(r" ([0-9]+)K->([0-9]+)K\(([0-9]+)K\)")
+# -XX:+PrintGCApplicationStoppedTime, printed at the end of every safepoint, GC or not
+_STOPPED_TEXT = "Total time for which application threads were stopped: "
+_STOPPED_TIME_AT = re.compile(r"([0-9]+[.][0-9]+) seconds(?:, Stopping threads took: ([0-9]+[.][0-9]+) seconds)?")
+
+_ABSOLUTE_TIME_LENGTH = len("2012-04-04T19:08:23.054+0000")
+_DIGITS = "0123456789"
+
+# Checked in declaration order, so the first match wins exactly like `GCEventType.from_gc_line`
+_EVENT_TYPE_TEXTS = tuple((gc_type.gc_text, gc_type) for gc_type in GCEventType if gc_type.gc_text)
+_MAJOR_GC_TEXTS = (GCEventType.CMS_INITIAL_MARK.gc_text, GCEventType.FULL_GC.gc_text)
+_MINOR_GC_TEXTS = (GCEventType.PAR_NEW.gc_text, GCEventType.PS_YOUNG_GEN.gc_text)
+
+# -XX:+PrintHeapAtGC blocks, from their first line up to a line of just "}", and -XX:+PrintTenuringDistribution lines.
+# None of them hold anything the metrics use.
+_HEAP_DUMP_STARTS = ("{Heap before GC", "Heap after GC")
+_HEAP_DUMP_END = "}"
+_TENURING_STARTS = ("Desired survivor size", "- age ")
+
+_decode_timestamp = TimestampDecoder().decode
+
+
+def classify_line(line: str) -> Tuple[int, int]:
+    """
+    Classify a stripped log line in a single scan. Records start with an absolute or relative timestamp; a line can
+    also end one record and start the next mid-line when the JVM interleaves concurrent phase output (a conflated
+    line). Everything else continues the current record.
+
+    :param line: Log line with trailing whitespace removed
+    :return: Tuple of (RECORD_START, CONFLATED or CONTINUATION, index the new record starts at)
+    """
+    if line[:1] in _DIGITS and (_ABSOLUTE_TIME_AT.match(line) or _RELATIVE_TIME_AT.match(line)):
+        return RECORD_START, 0
+
+    # "... 0.031 secs]12.345: [..." - the last relative timestamp directly following a timing
+    secs_index = line.rfind("secs]")
+    while secs_index > 0:
+        split = secs_index + 5
+        if _RELATIVE_TIME_AT.match(line, split) and _ends_with_seconds(line, secs_index):
+            return CONFLATED, split
+        secs_index = line.rfind("secs]", 0, secs_index)
+
+    # "... [ParNew2017-07-27T18:01:31.005+0000: ..." - the last absolute timestamp anywhere in the line
+    t_index = line.rfind("T")
+    while t_index >= 10:
+        if _DATE_TIME_AT.match(line, t_index - 10):
+            return CONFLATED, t_index - 10
+        t_index = line.rfind("T", 0, t_index)
+
+    return CONTINUATION, 0
+
+
+def parse_record(record: str) -> Optional[GCEvent]:
+    """
+    Extract the timestamp, event type, duration, sizes and collection generation from an assembled record. This gives
+    the same results as `ABSOLUTE_TIME_REGEX` and the regex cascade once behind `parse_line_for_times` and
+    `parse_line_for_sizes`, without running a separate regex for each. The timestamp is decoded once, into epoch
+    seconds.
+
+    :param record: Assembled log record
+    :return: Parsed record, or None if nothing could be extracted
+    """
+    timestamp = None
+    generation = GENERATION_NONE
+    sizes = None
+    if record[:1] in _DIGITS and _ABSOLUTE_TIME_AT.match(record):
+        timestamp = _decode_timestamp(record[:_ABSOLUTE_TIME_LENGTH])
+        for gc_text in _MAJOR_GC_TEXTS:
+            if gc_text in record:
+                generation = GENERATION_MAJOR
+                break
+        else:
+            for gc_text in _MINOR_GC_TEXTS:
+                if gc_text in record:
+                    generation = GENERATION_MINOR
+                    break
+        sizes = _parse_sizes(record)
+
+    event_type = None
+    duration = None
+    real_index = record.rfind("real=")
+    while real_index >= 0:
+        real_match = _REAL_TIME_AT.match(record, real_index + 5)
+        if real_match:
+            duration = float(real_match.group(1))
+            event_type = GCEventType.UNKNOWN
+            for gc_text, gc_type in _EVENT_TYPE_TEXTS:
+                if gc_text in record:
+                    event_type = gc_type
+                    break
+            break
+        real_index = record.rfind("real=", 0, real_index)
+
+    stopped_time = None
+    safepoint_time = None
+    if duration is None and timestamp is not None:
+        # "2017-07-27T18:01:22.425+0000: 1.040: Total time for which application threads were stopped: ..."
+        relative_match = _RELATIVE_TIME_AT.match(record, _ABSOLUTE_TIME_LENGTH + 2)
+        if relative_match and record.startswith(_STOPPED_TEXT, relative_match.end()):
+            stopped_match = _STOPPED_TIME_AT.match(record, relative_match.end() + len(_STOPPED_TEXT))
+            if stopped_match:
+                stopped_time = float(stopped_match.group(1))
+                if stopped_match.group(2):
+                    safepoint_time = float(stopped_match.group(2))
+
+    if timestamp is None and duration is None:
+        return None
+    if sizes is None:
+        return GCEvent(timestamp, event_type, duration, generation, stopped_time, safepoint_time)
+    return GCEvent(timestamp, event_type, duration, generation, stopped_time, safepoint_time, *sizes)
+
+
+class RecordAssembler(object):
+
+    def __init__(self, max_record_length: int = DEFAULT_MAX_RECORD_LENGTH) -> None:
+        """
+        Assemble multi-line log records from stripped lines. Fragments are collected in a list and joined once when
+        the record ends, instead of copying the whole record for every continuation line. Heap dump and tenuring
+        distribution lines are left out, and a record longer than `max_record_length` is dropped and counted in
+        `truncated_records`.
+
+        :param max_record_length: Maximum length of an assembled record
+        """
+        self.max_record_length = max_record_length
+        self.truncated_records = 0
+
+        self._fragments = []  # type: List[str]
+        self._length = 0
+        self._truncated = False
+        self._in_heap_dump = False
+
+    def add_line(self, line: str) -> Optional[str]:
+        """
+        :param line: Log line with trailing whitespace removed
+        :return: The record this line completes, if any
+        """
+        line_class, split = classify_line(line)
+        if line_class == RECORD_START:
+            record = self._complete()
+            self._append(line)
+            return record
+        if line_class == CONFLATED:
+            self._append(line[:split])
+            record = self._complete()
+            self._append(line[split:])
+            return record
+
+        if self._in_heap_dump:
+            if line == _HEAP_DUMP_END:
+                self._in_heap_dump = False
+            return None
+        if line.startswith(_HEAP_DUMP_STARTS):
+            self._in_heap_dump = True
+            return None
+        if line.startswith(_TENURING_STARTS):
+            return None
+
+        self._append(" ")
+        self._append(line)
+        return None
+
+    def pending(self) -> str:
+        """
+        :return: The record assembled so far
+        """
+        return "".join(self._fragments)
+
+    def reset(self, pending: str = "") -> None:
+        """
+        Drop the record assembled so far, and continue from `pending` instead
+
+        :param pending: Partially assembled record, as returned by `pending`
+        """
+        self._fragments = []
+        self._length = 0
+        self._truncated = False
+        self._in_heap_dump = False
+        self._append(pending)
+
+    def _append(self, fragment: str) -> None:
+        if self._truncated:
+            return
+        self._length += len(fragment)
+        if self._length > self.max_record_length:
+            self._truncated = True
+            self._fragments = []
+            return
+        self._fragments.append(fragment)
+
+    def _complete(self) -> Optional[str]:
+        fragments, truncated = self._fragments, self._truncated
+        self._fragments = []
+        self._length = 0
+        self._truncated = False
+        self._in_heap_dump = False
+        if truncated:
+            self.truncated_records += 1
+            return None
+        if len(fragments) == 1:
+            return fragments[0]
+        return "".join(fragments)
+
+
+def _ends_with_seconds(line: str, end: int) -> bool:
+    # Equivalent to `line[:end]` matching r"[0-9]+[.][0-9]+ $"
+    index = end - 1
+    if index < 0 or line[index] != " ":
+        return False
+    index -= 1
+    fraction_start = index
+    while index >= 0 and line[index] in _DIGITS:
+        index -= 1
+    return index < fraction_start and index >= 1 and line[index] == "." and line[index - 1] in _DIGITS
+
+
+def _parse_sizes(record: str) -> Optional[Tuple[int, int, int, int, int, int]]:
+    prefix_match = _SIZE_PREFIX_AT.match(record, _ABSOLUTE_TIME_LENGTH + 2)
+    if not prefix_match or record[_ABSOLUTE_TIME_LENGTH + 1] != " ":
+        return None
+
+    # SIZE_REGEX is greedy, so it settles on the last two "xK->yK(zK)" groups of the record
+    last = previous = None
+    for triple_match in _SIZE_TRIPLE.finditer(record, prefix_match.end()):
+        previous, last = last, triple_match
+    if previous is None or last is None:
+        return None
+
+    young_begin_k, young_end_k, young_total_k = previous.groups()
+    whole_heap_begin_k, whole_heap_end_k, whole_heap_total_k = last.groups()
+    return (int(young_begin_k), int(young_end_k), int(young_total_k),
+            int(whole_heap_begin_k), int(whole_heap_end_k), int(whole_heap_total_k))
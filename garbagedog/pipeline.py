@@ -0,0 +1,157 @@
+import queue
+import threading
+import time
+
+from typing import Any, Iterable, Optional
+
+from .utils import printv
+
+BLOCK = "block"
+DROP = "drop"
+QUEUE_POLICIES = (BLOCK, DROP)
+
+# Tells the stage reading a queue that nothing more will come
+_STOP = object()
+
+
+class QueueingEmitter(object):
+
+    def __init__(self, metric_queue: queue.Queue, policy: str = BLOCK) -> None:
+        """
+        Stand in for a DogStatsd client that puts every call on `metric_queue`, for an emitter thread to send. When
+        the queue is full, calls either block until there is room or are dropped and counted, depending on `policy`.
+
+        :param metric_queue: Bounded queue of (method name, args, kwargs) calls
+        :param policy: BLOCK or DROP
+        """
+        if policy not in QUEUE_POLICIES:
+            raise ValueError("Unknown queue policy {!r}, expected one of {}".format(policy, QUEUE_POLICIES))
+        self.metric_queue = metric_queue
+        self.policy = policy
+        self.dropped = 0
+
+    def __getattr__(self, name: str):
+        def enqueue(*args, **kwargs):
+            self.put((name, args, kwargs))
+        return enqueue
+
+    def put(self, item: Any) -> None:
+        if self.policy == BLOCK:
+            self.metric_queue.put(item)
+            return
+        try:
+            self.metric_queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+
+class Pipeline(object):
+
+    def __init__(self,
+                 stats,
+                 queue_size: int = 10000,
+                 policy: str = BLOCK,
+                 stats_interval: float = 10,
+                 verbose: bool = False) -> None:
+        """
+        Run reading, parsing and sending in separate stages joined by bounded queues, so a slow DogStatsd send (or
+        DNS lookup) does not stall reading the log, and a burst of parsing does not delay sending. A reader thread
+        puts log lines on the line queue, which always blocks when full so no line is lost. The calling thread parses
+        them, and its metrics go on the metric queue to an emitter thread. `policy` decides whether parsing blocks or
+        metrics are dropped when the emitter falls behind.
+
+        Every `stats_interval` seconds the emitter sends the queue depths as `garbagedog_pipeline_queue_depth` and
+        the number of dropped metrics as `garbagedog_pipeline_dropped_metrics`.
+
+        :param stats: DogStatsd compatible client the emitter thread sends with
+        :param queue_size: Maximum number of items in each queue
+        :param policy: BLOCK or DROP, what to do with metrics when the metric queue is full
+        :param stats_interval: How often (in seconds) to send queue depth and drop counters
+        :param verbose: If True, print queue depth and drop counters as they are sent
+        """
+        self.stats = stats
+        self.stats_interval = stats_interval
+        self.verbose = verbose
+
+        self.line_queue = queue.Queue(maxsize=queue_size)  # type: queue.Queue
+        self.metric_queue = queue.Queue(maxsize=queue_size)  # type: queue.Queue
+        self.emitter = QueueingEmitter(self.metric_queue, policy)
+
+        self._reader_error = None  # type: Optional[BaseException]
+        self._emitter_thread = None  # type: Optional[threading.Thread]
+        self._reported_dropped = 0
+
+    def run(self, lines: Iterable[str], processor) -> None:
+        """
+        Feed `lines` through `processor` until they run out or KeyboardInterrupt, then send any queued metrics. The
+        processor's metrics are routed through the pipeline while this runs.
+
+        :param lines: Log lines, iterated in a reader thread
+        :param processor: GCEventProcessor to parse lines with
+        """
+        processor_stats, processor.stats = processor.stats, self.emitter
+        reader_thread = threading.Thread(target=self._read, args=(lines,), name="garbagedog-reader", daemon=True)
+        self._emitter_thread = threading.Thread(target=self._emit, name="garbagedog-emitter", daemon=True)
+        self._emitter_thread.start()
+        reader_thread.start()
+        try:
+            while True:
+                line = self.line_queue.get()
+                if line is _STOP:
+                    break
+                processor._process_line(line)
+            if self._reader_error:
+                raise self._reader_error
+        finally:
+            self.stop()
+            processor.stats = processor_stats
+
+    def stop(self) -> None:
+        """
+        Wait for the emitter thread to send everything already queued
+        """
+        if self._emitter_thread:
+            self.metric_queue.put(_STOP)
+            self._emitter_thread.join()
+            self._emitter_thread = None
+
+    def _read(self, lines: Iterable[str]) -> None:
+        try:
+            for line in lines:
+                self.line_queue.put(line)
+        except BaseException as e:
+            self._reader_error = e
+        self.line_queue.put(_STOP)
+
+    def _emit(self) -> None:
+        next_report = time.monotonic() + self.stats_interval
+        while True:
+            try:
+                item = self.metric_queue.get(timeout=max(0.0, next_report - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._report()
+                return
+            if item is not None:
+                name, args, kwargs = item
+                try:
+                    getattr(self.stats, name)(*args, **kwargs)
+                except Exception as e:
+                    printv("Failed to send {}: {}".format(name, e), self.verbose)
+
+            if time.monotonic() >= next_report:
+                self._report()
+                next_report = time.monotonic() + self.stats_interval
+
+    def _report(self) -> None:
+        line_depth, metric_depth = self.line_queue.qsize(), self.metric_queue.qsize()
+        dropped = self.emitter.dropped
+        self.stats.gauge("garbagedog_pipeline_queue_depth", line_depth, tags=["queue:lines"])
+        self.stats.gauge("garbagedog_pipeline_queue_depth", metric_depth, tags=["queue:metrics"])
+        if dropped > self._reported_dropped:
+            self.stats.increment("garbagedog_pipeline_dropped_metrics", dropped - self._reported_dropped)
+            self._reported_dropped = dropped
+        printv("Queued lines: {}, queued metrics: {}, dropped metrics: {}".format(line_depth, metric_depth, dropped),
+               self.verbose)
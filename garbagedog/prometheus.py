@@ -0,0 +1,256 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Trailing windows (in seconds) served for every histogram, labelled `window="1m"` and so on
+DEFAULT_WINDOWS = (60, 300, 900)
+DEFAULT_BUCKET_SECONDS = 10
+
+# Upper bounds of the `le` buckets, by metric. Durations are in seconds and rates in KB per second.
+DURATION_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+INTERVAL_BOUNDS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 600, 1800, 3600)
+RATE_BOUNDS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+METRIC_BOUNDS = {
+    "garbagedog_allocation_rate_histogram": RATE_BOUNDS,
+    "garbagedog_promotion_rate_histogram": RATE_BOUNDS,
+    "garbagedog_time_between_young_gc": INTERVAL_BOUNDS,
+    "garbagedog_time_between_old_gc": INTERVAL_BOUNDS,
+}  # type: Dict[str, Sequence[float]]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_INVALID_LABEL_CHARACTERS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class RollingHistogram(object):
+
+    def __init__(self, bounds: Sequence[float], bucket_seconds: float, buckets: int) -> None:
+        """
+        Histogram of the values added over the last `buckets` * `bucket_seconds` seconds. Values are counted into a
+        ring of time buckets, each holding the counts below every bound and the sum of the values added while it was
+        current, and a time bucket is cleared when the ring comes back round to it. Adding is O(1), and summing a
+        window only looks at the time buckets, however many values were added.
+
+        :param bounds: Ascending upper bounds of the value buckets, values above the last are counted as `+Inf`
+        :param bucket_seconds: Length (in seconds) of each time bucket
+        :param buckets: Number of time buckets kept
+        """
+        self.bounds = bounds
+        self.bucket_seconds = bucket_seconds
+        self._epochs = [-1] * buckets
+        self._counts = [[0] * (len(bounds) + 1) for _ in range(buckets)]
+        self._sums = [0.0] * buckets
+
+    def add(self, value: float, now: float) -> None:
+        """
+        :param value: Value to count
+        :param now: Current time, in seconds
+        """
+        epoch = int(now // self.bucket_seconds)
+        index = epoch % len(self._epochs)
+        counts = self._counts[index]
+        if self._epochs[index] != epoch:
+            self._epochs[index] = epoch
+            for bound_index in range(len(counts)):
+                counts[bound_index] = 0
+            self._sums[index] = 0.0
+        counts[bisect_left(self.bounds, value)] += 1
+        self._sums[index] += value
+
+    def windows(self, spans: Sequence[int], now: float) -> List[Tuple[List[int], float]]:
+        """
+        Sum the time buckets of several trailing windows in one pass, newest first. A window includes the current,
+        partly elapsed time bucket, so covers between `span - 1` and `span` whole time buckets.
+
+        :param spans: Ascending window lengths, in time buckets
+        :param now: Current time, in seconds
+        :return: For each window, a tuple of (cumulative count at or below each bound then in total, sum)
+        """
+        epoch = int(now // self.bucket_seconds)
+        counts = [0] * (len(self.bounds) + 1)
+        total = 0.0
+        results = []  # type: List[Tuple[List[int], float]]
+        age = 0
+        for span in spans:
+            while age < min(span, len(self._epochs)):
+                index = (epoch - age) % len(self._epochs)
+                if self._epochs[index] == epoch - age:
+                    for bound_index, count in enumerate(self._counts[index]):
+                        counts[bound_index] += count
+                    total += self._sums[index]
+                age += 1
+            cumulative = []
+            running = 0
+            for count in counts:
+                running += count
+                cumulative.append(running)
+            results.append((cumulative, total))
+        return results
+
+
+class PrometheusExporter(object):
+
+    def __init__(self,
+                 stats,
+                 port: int,
+                 host: str = "",
+                 windows: Sequence[int] = DEFAULT_WINDOWS,
+                 bucket_seconds: float = DEFAULT_BUCKET_SECONDS,
+                 constant_tags: Optional[List[str]] = None,
+                 clock: Callable[[], float] = time.time) -> None:
+        """
+        Stand in for a DogStatsd client that keeps every `timing` and `histogram` sample in a `RollingHistogram` per
+        metric and tag set, and serves them over HTTP in the Prometheus text format from `start` until `stop`. Every
+        call, these included, is also passed through to `stats`, so Prometheus and dogstatsd see the same samples.
+
+        Each histogram is served once per trailing window, labelled `window="1m"`, `window="5m"` and so on, with its
+        `_bucket`, `_sum` and `_count` series covering only the samples of that window. They go down as samples age out,
+        so are read as they are (ie `histogram_quantile(0.99, garbagedog_gc_event_duration_bucket{window="5m"})`)
+        rather than through `rate`. `key:value` tags become labels; tags without a value are left out.
+
+        :param stats: DogStatsd compatible client to pass every call through to
+        :param port: Port to serve `/metrics` on
+        :param host: Address to serve on, by default all interfaces
+        :param windows: Window lengths (in seconds), multiples of `bucket_seconds`
+        :param bucket_seconds: Length (in seconds) of the time buckets windows are summed from, and so how precisely
+                               their start follows the current time
+        :param constant_tags: Tags added to every metric, like the DogStatsd client's own
+        :param clock: Current time, in seconds
+        """
+        self.stats = stats
+        self.port = port
+        self.host = host
+        self.windows = sorted(windows)
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+
+        self._spans = [int(round(seconds / bucket_seconds)) for seconds in self.windows]
+        self._window_labels = ['window="{}"'.format(_window_name(seconds)) for seconds in self.windows]
+        self._constant_tags = tuple(constant_tags or ())
+        self._histograms = {}  # type: Dict[Tuple[str, Tuple[str, ...]], RollingHistogram]
+        self._labels = {}  # type: Dict[Tuple[str, ...], str]
+        self._lock = threading.Lock()
+        self._server = None  # type: Optional[HTTPServer]
+        self._serve_thread = None  # type: Optional[threading.Thread]
+
+    def timing(self, metric: str, value: float, tags: Optional[List[str]] = None, sample_rate: float = 1) -> None:
+        self._add(metric, value, tags)
+        self.stats.timing(metric, value, tags=tags, sample_rate=sample_rate)
+
+    def histogram(self, metric: str, value: float, tags: Optional[List[str]] = None, sample_rate: float = 1) -> None:
+        self._add(metric, value, tags)
+        self.stats.histogram(metric, value, tags=tags, sample_rate=sample_rate)
+
+    def __getattr__(self, name: str):
+        # gauge, increment, event, ... are only sent to dogstatsd
+        return getattr(self.stats, name)
+
+    def start(self) -> None:
+        """
+        Serve the histograms from a background thread. With a `port` of 0 one is picked, and `port` set to it.
+        """
+        self._server = HTTPServer((self.host, self.port), _handler(self))
+        self.port = self._server.server_address[1]
+        self._serve_thread = threading.Thread(target=self._server.serve_forever, name="garbagedog-prometheus",
+                                              daemon=True)
+        self._serve_thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop serving
+        """
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._serve_thread:
+            self._serve_thread.join()
+            self._serve_thread = None
+
+    def render(self) -> str:
+        """
+        :return: Every histogram over every window, in the Prometheus text format
+        """
+        now = self.clock()
+        with self._lock:
+            snapshots = [(metric, self._labels[tags], histogram.bounds, histogram.windows(self._spans, now))
+                         for (metric, tags), histogram in sorted(self._histograms.items())]
+
+        lines = []
+        last_metric = None
+        for metric, labels, bounds, windows in snapshots:
+            if metric != last_metric:
+                lines.append("# TYPE {} histogram".format(metric))
+                last_metric = metric
+            for window_label, (cumulative, total) in zip(self._window_labels, windows):
+                series_labels = labels + window_label
+                for bound, count in zip(bounds, cumulative):
+                    lines.append('{}_bucket{{{},le="{}"}} {}'.format(metric, series_labels, _format_value(bound), count))
+                lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(metric, series_labels, cumulative[-1]))
+                lines.append("{}_sum{{{}}} {}".format(metric, series_labels, _format_value(total)))
+                lines.append("{}_count{{{}}} {}".format(metric, series_labels, cumulative[-1]))
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric: str, value: float, tags: Optional[List[str]]) -> None:
+        key = (metric, tuple(tags) if tags else ())
+        now = self.clock()
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = RollingHistogram(
+                    METRIC_BOUNDS.get(metric, DURATION_BOUNDS), self.bucket_seconds, self._spans[-1])
+                if key[1] not in self._labels:
+                    self._labels[key[1]] = _labels(self._constant_tags + key[1])
+            histogram.add(value, now)
+
+
+def _handler(exporter: PrometheusExporter) -> type:
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = exporter.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            # Not every scrape on stderr
+            pass
+
+    return MetricsHandler
+
+
+def _labels(tags: Sequence[str]) -> str:
+    """
+    :return: `name="value",` for each `name:value` tag, sorted by name
+    """
+    labels = {}
+    for tag in tags:
+        name, separator, value = tag.partition(":")
+        if not separator:
+            continue
+        name = _INVALID_LABEL_CHARACTERS.sub("_", name)
+        if name[:1].isdigit():
+            name = "_" + name
+        labels[name] = value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return "".join('{}="{}",'.format(name, value) for name, value in sorted(labels.items()))
+
+
+def _window_name(seconds: float) -> str:
+    if seconds % 60 == 0:
+        return "{:g}m".format(seconds / 60)
+    return "{:g}s".format(seconds)
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
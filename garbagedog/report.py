@@ -0,0 +1,198 @@
+import csv
+import json
+
+from typing import Any, Dict, List, Optional, Sequence, TextIO, Tuple
+
+from .backfill import DEFAULT_CHUNK_BYTES, EVENT_TYPES, map_chunks, parse_chunk_packed, split_files
+from .constants import GCEventType
+from .formats import FORMAT_AUTO
+from .parser import GCEvent, GENERATION_MINOR, GENERATION_MAJOR
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # type: ignore
+
+REPORT_FORMATS = ("text", "csv", "json")
+DEFAULT_PERCENTILES = (50, 90, 99, 99.9)
+
+# A column for each field of `GCEvent`, holding floats with NaN for None. Event types are their index in
+# `garbagedog.backfill.EVENT_TYPES`.
+COLUMNS = GCEvent.__slots__
+
+# (metric, tags, values)
+Series = Tuple[str, List[str], Any]
+
+
+def require_numpy() -> None:
+    """
+    :raises ImportError: If NumPy, which reports are computed with, is not installed
+    """
+    if numpy is None:
+        raise ImportError("garbagedog report needs NumPy, install it with `pip install garbagedog[report]`")
+
+
+def load_columns(paths: List[str],
+                 log_format: str = FORMAT_AUTO,
+                 workers: Optional[int] = None,
+                 chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Dict[str, Any]:
+    """
+    Parse whole GC log files into one NumPy array per `GCEvent` field, in time order. Files are split into chunks
+    and parsed in a pool of `workers` processes like `backfill`, each returning its chunk as a single array, so only
+    arrays are passed between processes and nothing is done per record once parsed. Parsing is still done record by
+    record in Python, at roughly 18 MB/s per process, and takes nearly all of a report's time.
+
+    :param paths: Log files, in any order
+    :param log_format: Format of the log files, sniffed from each file if FORMAT_AUTO
+    :param workers: Number of parser processes, defaults to the number of CPUs
+    :param chunk_bytes: Approximate size of the chunks files are split into
+    :return: Dict of column name to array
+    """
+    require_numpy()
+    chunks = split_files(paths, log_format, chunk_bytes)
+    chunk_arrays = map_chunks(_parse_chunk_array, chunks, workers)
+
+    file_arrays = []
+    for path in paths:
+        arrays = [array for (chunk_path, _, _, _), array in zip(chunks, chunk_arrays) if chunk_path == path]
+        file_arrays.append(numpy.concatenate(arrays) if arrays else numpy.empty((0, len(COLUMNS))))
+
+    # Like backfill, records without an absolute timestamp keep their place after the last timestamped one of their file
+    keys, file_indexes, sequences = [], [], []
+    for file_index, array in enumerate(file_arrays):
+        timestamps = array[:, 0]
+        has_timestamp = ~numpy.isnan(timestamps)
+        last_with_timestamp = numpy.maximum.accumulate(numpy.where(has_timestamp, numpy.arange(len(array)), -1))
+        keys.append(numpy.where(last_with_timestamp >= 0, timestamps[last_with_timestamp], 0.0))
+        file_indexes.append(numpy.full(len(array), file_index))
+        sequences.append(numpy.arange(len(array)))
+    merged = numpy.concatenate(file_arrays)
+    order = numpy.lexsort((numpy.concatenate(sequences), numpy.concatenate(file_indexes), numpy.concatenate(keys)))
+    merged = merged[order]
+    return {name: merged[:, index] for index, name in enumerate(COLUMNS)}
+
+
+def compute_series(columns: Dict[str, Any]) -> List[Series]:
+    """
+    Compute the quantities `GCEventProcessor` sends for each record over whole columns at once, under the same metric
+    names and tags: pause durations by event type, safepoint stopped times, allocation and promotion rates between
+    consecutive sized records and the time between young and between old collections. Added to them is
+    `garbagedog_old_gen_after_full_gc`, the old generation occupancy (in KB) each full GC left, read from the heap and
+    young generation sizes before the next young collection, as JDK 8 full GC records end with the metaspace rather
+    than the heap sizes.
+
+    :param columns: Columns from `load_columns`
+    :return: List of (metric, tags, values) series
+    """
+    require_numpy()
+    timestamps = columns["timestamp"]
+    event_types = columns["event_type"]
+    generations = columns["generation"]
+    series = []  # type: List[Series]
+
+    has_event_type = ~numpy.isnan(event_types)
+    event_durations = columns["duration"][has_event_type]
+    event_codes = event_types[has_event_type].astype(int)
+    for code in numpy.unique(event_codes):
+        event_type = EVENT_TYPES[code]
+        tags = ["stw:{}".format(event_type.is_stop_the_world), "event_type:{}".format(event_type.stats_name)]
+        durations = event_durations[event_codes == code]
+        series.append(("garbagedog_gc_event_duration", tags, durations[~numpy.isnan(durations)]))
+
+    stopped_times = columns["stopped_time"]
+    series.append(("garbagedog_app_stopped_time", [], stopped_times[~numpy.isnan(stopped_times)]))
+    safepoint_times = columns["safepoint_time"]
+    series.append(("garbagedog_time_to_safepoint", [], safepoint_times[~numpy.isnan(safepoint_times)]))
+
+    sized = ~numpy.isnan(columns["young_begin_k"]) & ~numpy.isnan(timestamps)
+    sized_timestamps = timestamps[sized]
+    young_begin = columns["young_begin_k"][sized]
+    young_end = columns["young_end_k"][sized]
+    heap_begin = columns["whole_heap_begin_k"][sized]
+    heap_end = columns["whole_heap_end_k"][sized]
+    elapsed = numpy.diff(sized_timestamps)
+    # Records logged in the same millisecond have no rate between them
+    has_elapsed = elapsed > 0
+    allocated = numpy.abs(young_begin[1:] - young_end[:-1])
+    series.append(("garbagedog_allocation_rate_histogram", [], allocated[has_elapsed] / elapsed[has_elapsed]))
+    young_decreased = numpy.abs(young_begin[1:] - young_end[1:])
+    total_decreased = numpy.abs(heap_begin[1:] - heap_end[1:])
+    promoted = has_elapsed & (total_decreased < young_decreased)
+    series.append(("garbagedog_promotion_rate_histogram", [],
+                   (young_decreased - total_decreased)[promoted] / elapsed[promoted]))
+
+    series.append(("garbagedog_time_between_young_gc", [], numpy.diff(timestamps[generations == GENERATION_MINOR])))
+    series.append(("garbagedog_time_between_old_gc", [], numpy.diff(timestamps[generations == GENERATION_MAJOR])))
+
+    full_gc_times = timestamps[event_types == EVENT_TYPES.index(GCEventType.FULL_GC)]
+    young = sized & (generations == GENERATION_MINOR)
+    young_timestamps = timestamps[young]
+    next_young = numpy.searchsorted(young_timestamps, full_gc_times, side="right")
+    # Only the last of several full GCs before the same young collection
+    last_full_gc = numpy.ones(len(next_young), dtype=bool)
+    last_full_gc[:-1] = next_young[1:] != next_young[:-1]
+    next_young = next_young[last_full_gc & (next_young < len(young_timestamps))]
+    old_gen = columns["whole_heap_begin_k"][young] - columns["young_begin_k"][young]
+    series.append(("garbagedog_old_gen_after_full_gc", [], old_gen[next_young]))
+    return series
+
+
+def summarize(series: List[Series], percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> List[Dict[str, Any]]:
+    """
+    :param series: Series from `compute_series`
+    :param percentiles: Percentiles (between 0 and 100) to compute of each series
+    :return: For each series with values, a dict of its metric, tags, count, mean, max and percentiles, keyed `p50`
+             and so on
+    """
+    require_numpy()
+    rows = []
+    for metric, tags, values in series:
+        if not len(values):
+            continue
+        row = {"metric": metric, "tags": tags, "count": int(len(values)), "mean": float(numpy.mean(values)),
+               "max": float(numpy.max(values))}  # type: Dict[str, Any]
+        for name, value in zip(_percentile_names(percentiles), numpy.percentile(values, percentiles)):
+            row[name] = float(value)
+        rows.append(row)
+    return rows
+
+
+def write_report(rows: List[Dict[str, Any]],
+                 out: TextIO,
+                 report_format: str = "text",
+                 percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> None:
+    """
+    :param rows: Rows from `summarize`
+    :param out: File to write to
+    :param report_format: One of REPORT_FORMATS: an aligned table, CSV with tags joined by commas, or a JSON list
+    :param percentiles: Percentiles the rows were summarized with
+    """
+    if report_format not in REPORT_FORMATS:
+        raise ValueError("Unknown report format {!r}, expected one of {}".format(report_format, REPORT_FORMATS))
+    if report_format == "json":
+        json.dump(rows, out, indent=2)
+        out.write("\n")
+        return
+
+    fields = ["metric", "tags", "count", "mean"] + _percentile_names(percentiles) + ["max"]
+    if report_format == "csv":
+        writer = csv.writer(out)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow([",".join(row["tags"]) if field == "tags" else row[field] for field in fields])
+        return
+
+    header = "{:<38} {:<56} {:>8}".format("metric", "tags", "count")
+    out.write(header + "".join(" {:>12}".format(field) for field in fields[3:]) + "\n")
+    for row in rows:
+        line = "{:<38} {:<56} {:>8}".format(row["metric"], ",".join(row["tags"]), row["count"])
+        out.write(line + "".join(" {:>12.6g}".format(row[field]) for field in fields[3:]) + "\n")
+
+
+def _parse_chunk_array(path: str, start: int, end: int, log_format: str) -> Any:
+    # None becomes NaN
+    return numpy.array(parse_chunk_packed(path, start, end, log_format), dtype=float).reshape(-1, len(COLUMNS))
+
+
+def _percentile_names(percentiles: Sequence[float]) -> List[str]:
+    return ["p{:g}".format(percentile) for percentile in percentiles]
@@ -0,0 +1,151 @@
+import threading
+import time
+
+from typing import Any, Dict, List, Optional
+
+from .constants import GCEventType
+from .parser import GCEvent
+
+# Counters sent as the difference since the last flush
+_COUNTERS = (
+    ("lines", "garbagedog_self_lines"),
+    ("records", "garbagedog_self_records"),
+    ("unmatched_times", "garbagedog_self_records_without_times"),
+    ("unmatched_sizes", "garbagedog_self_records_without_sizes"),
+    ("unknown_events", "garbagedog_self_unknown_events"),
+)
+
+
+class SelfMetrics(object):
+
+    def __init__(self, stats, flush_interval: float = 10, tags: Optional[List[str]] = None) -> None:
+        """
+        Count what garbagedog itself is doing, and send it every `flush_interval` seconds, so falling behind or no
+        longer matching log lines shows up in datadog:
+
+        - `garbagedog_self_lines`, `garbagedog_self_records`: log lines read and records assembled
+        - `garbagedog_self_records_without_times`, `garbagedog_self_records_without_sizes`: records no duration
+          (`TIMES_REGEX`) or sizes (`SIZE_REGEX`) were found in
+        - `garbagedog_self_unknown_events`: durations of an unrecognized event type
+        - `garbagedog_self_truncated_records`: records dropped for being too long
+        - `garbagedog_self_bytes_behind`: size of the log file minus the read offset
+        - `garbagedog_self_record_age_max`: the most seconds between a GC event and processing it
+        - `garbagedog_self_parse_time_avg`: average seconds to parse a record
+
+        Counting is plain attribute increments on the processing thread; the flush thread only reads them and sends
+        the difference since the last flush, so nothing is locked per line.
+
+        :param stats: DogStatsd compatible client to send with
+        :param flush_interval: How often (in seconds) to send when started with `start`
+        :param tags: Tags added to every metric
+        """
+        self.stats = stats
+        self.flush_interval = flush_interval
+        self.tags = tags or None
+
+        self.lines = 0
+        self.records = 0
+        self.unmatched_times = 0
+        self.unmatched_sizes = 0
+        self.unknown_events = 0
+        self.parse_seconds = 0.0
+        self.max_record_age = None  # type: Optional[float]
+
+        # Sampled when flushing, set by whoever owns them
+        self._assembler = None  # type: Any
+        self.log_handler = None  # type: Any
+        # Records truncated by assemblers that have since been replaced
+        self._replaced_truncated_records = 0
+
+        self._flushed = {}  # type: Dict[str, float]
+        self._stop_event = threading.Event()
+        self._flush_thread = None  # type: Optional[threading.Thread]
+
+    @property
+    def assembler(self) -> Any:
+        """
+        Record assembler whose `truncated_records` is sampled when flushing
+        """
+        return self._assembler
+
+    @assembler.setter
+    def assembler(self, assembler: Any) -> None:
+        # A new assembler counts from zero, so keep what the one it replaces counted
+        if self._assembler is not None and assembler is not self._assembler:
+            self._replaced_truncated_records += self._assembler.truncated_records
+        self._assembler = assembler
+
+    def count_record(self, record: Optional[GCEvent], parse_seconds: float) -> None:
+        """
+        :param record: Parse result of an assembled record
+        :param parse_seconds: Time taken to parse it
+        """
+        self.records += 1
+        self.parse_seconds += parse_seconds
+        if record is None:
+            self.unmatched_times += 1
+            self.unmatched_sizes += 1
+            return
+        if record.duration is None and record.stopped_time is None:
+            self.unmatched_times += 1
+        elif record.event_type == GCEventType.UNKNOWN:
+            self.unknown_events += 1
+        if record.young_begin_k is None:
+            self.unmatched_sizes += 1
+        if record.timestamp is not None:
+            age = time.time() - record.timestamp
+            if self.max_record_age is None or age > self.max_record_age:
+                self.max_record_age = age
+
+    def start(self) -> None:
+        """
+        Flush every `flush_interval` seconds from a background thread
+        """
+        self._stop_event.clear()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="garbagedog-self-metrics", daemon=True)
+        self._flush_thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread, and flush anything counted since the last flush
+        """
+        self._stop_event.set()
+        if self._flush_thread:
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Send everything counted since the last flush
+        """
+        for attribute, metric in _COUNTERS:
+            self._increment(metric, getattr(self, attribute))
+        assembler = self._assembler
+        if assembler is not None:
+            self._increment("garbagedog_self_truncated_records",
+                            self._replaced_truncated_records + assembler.truncated_records)
+
+        records, parse_seconds = self.records, self.parse_seconds
+        flushed_records = records - self._flushed.get("records_parsed", 0)
+        if flushed_records:
+            average = (parse_seconds - self._flushed.get("parse_seconds", 0.0)) / flushed_records
+            self.stats.gauge("garbagedog_self_parse_time_avg", average, tags=self.tags)
+        self._flushed["records_parsed"], self._flushed["parse_seconds"] = records, parse_seconds
+
+        max_record_age, self.max_record_age = self.max_record_age, None
+        if max_record_age is not None:
+            self.stats.gauge("garbagedog_self_record_age_max", max_record_age, tags=self.tags)
+
+        if self.log_handler is not None:
+            bytes_behind = self.log_handler.bytes_behind()
+            if bytes_behind is not None:
+                self.stats.gauge("garbagedog_self_bytes_behind", bytes_behind, tags=self.tags)
+
+    def _increment(self, metric: str, total: int) -> None:
+        self.stats.increment(metric, total - self._flushed.get(metric, 0), tags=self.tags)
+        self._flushed[metric] = total
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
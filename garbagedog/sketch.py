@@ -0,0 +1,92 @@
+import math
+
+from typing import Dict
+
+# Values at or below this are counted as zero, GC durations and rates are never negative
+MIN_INDEXABLE_VALUE = 1e-9
+
+
+class DDSketch(object):
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048) -> None:
+        """
+        A mergeable quantile sketch with relative error guarantees (see DDSketch, Masson et al. 2019). Values are
+        counted in logarithmically sized bins, so any quantile estimate is within `relative_accuracy` of the true
+        value. Memory is bounded by `max_bins`: when it is exceeded the lowest bins are collapsed, which only costs
+        accuracy on the smallest values.
+
+        :param relative_accuracy: Maximum relative error of quantile estimates
+        :param max_bins: Maximum number of bins to keep
+        """
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+
+        self.bins = {}  # type: Dict[int, int]
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = -float("inf")
+
+    def add(self, value: float) -> None:
+        """
+        :param value: Value to add to the sketch
+        """
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += 1
+            return
+        index = int(math.ceil(math.log(value) / self._log_gamma))
+        bins = self.bins
+        bins[index] = bins.get(index, 0) + 1
+        if len(bins) > self.max_bins:
+            self._collapse()
+
+    def merge(self, other: "DDSketch") -> None:
+        """
+        Add all values counted by `other`, which must have the same relative accuracy
+
+        :param other: Sketch to merge into this one
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Can not merge sketches with different relative accuracy")
+        for index, bin_count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + bin_count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def quantile(self, q: float) -> float:
+        """
+        :param q: Quantile between 0 and 1
+        :return: Estimated value at quantile `q`, or NaN if the sketch is empty
+        """
+        if not self.count:
+            return float("nan")
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return max(self.min, 0.0)
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                estimate = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def _collapse(self) -> None:
+        lowest, second_lowest = sorted(self.bins)[:2]
+        self.bins[second_lowest] += self.bins.pop(lowest)
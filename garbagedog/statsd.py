@@ -0,0 +1,204 @@
+import errno
+import random
+import socket
+import threading
+
+from typing import Any, Dict, List, Optional, Tuple
+
+# Fits in one Ethernet frame after IP and UDP headers
+DEFAULT_UDP_PACKET_SIZE = 1432
+# The largest datagram the datadog agent reads from its unix socket by default
+DEFAULT_UDS_PACKET_SIZE = 8192
+
+# Tag sets are fixed per event type and source, this only guards against a caller building new ones forever
+_MAX_CACHED_TAG_SETS = 1024
+
+
+class BufferedStatsd(object):
+
+    def __init__(self,
+                 host: str = "localhost",
+                 port: int = 8125,
+                 socket_path: Optional[str] = None,
+                 constant_tags: Optional[List[str]] = None,
+                 max_packet_size: Optional[int] = None,
+                 flush_interval: float = 1) -> None:
+        """
+        Stand in for a DogStatsd client that packs many metrics into each datagram, one per line, instead of sending
+        one datagram per metric. A datagram is sent once the next metric would not fit in `max_packet_size` bytes, and
+        every `flush_interval` seconds when started with `start`, so a quiet log is not held back.
+
+        The `|#tags` part of each metric is formatted once per tag set and reused, with `constant_tags` already
+        appended.
+
+        Sends never block: datagrams the agent has no room for are counted in `dropped_packets` and the metrics in them
+        are lost, as they would be with UDP.
+
+        :param host: dogstatsd host, when sending over UDP
+        :param port: dogstatsd port, when sending over UDP
+        :param socket_path: If set, send to the dogstatsd unix domain socket at this path instead of over UDP
+        :param constant_tags: Tags added to every metric
+        :param max_packet_size: Maximum size (in bytes) of each datagram, by default 1432 for UDP and 8192 for a unix
+                                socket
+        :param flush_interval: How often (in seconds) to flush when started with `start`
+        """
+        self.host = host
+        self.port = int(port)
+        self.socket_path = socket_path
+        self.constant_tags = list(constant_tags or [])
+        if max_packet_size is None:
+            max_packet_size = DEFAULT_UDS_PACKET_SIZE if socket_path else DEFAULT_UDP_PACKET_SIZE
+        self.max_packet_size = max_packet_size
+        self.flush_interval = flush_interval
+
+        # One send syscall each
+        self.packets = 0
+        self.dropped_packets = 0
+
+        self._constant_tags_suffix = "|#" + ",".join(self.constant_tags) if self.constant_tags else ""
+        self._tag_suffixes = {}  # type: Dict[Tuple[str, ...], str]
+        self._buffer = []  # type: List[bytes]
+        self._buffer_size = 0
+        self._socket = None  # type: Optional[socket.socket]
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flush_thread = None  # type: Optional[threading.Thread]
+
+    def timing(self, metric: str, value: float, tags: Optional[List[str]] = None, sample_rate: float = 1) -> None:
+        self._report(metric, "ms", value, tags, sample_rate)
+
+    def histogram(self, metric: str, value: float, tags: Optional[List[str]] = None, sample_rate: float = 1) -> None:
+        self._report(metric, "h", value, tags, sample_rate)
+
+    def distribution(self, metric: str, value: float, tags: Optional[List[str]] = None,
+                     sample_rate: float = 1) -> None:
+        self._report(metric, "d", value, tags, sample_rate)
+
+    def gauge(self, metric: str, value: float, tags: Optional[List[str]] = None, sample_rate: float = 1) -> None:
+        self._report(metric, "g", value, tags, sample_rate)
+
+    def increment(self, metric: str, value: float = 1, tags: Optional[List[str]] = None,
+                  sample_rate: float = 1) -> None:
+        self._report(metric, "c", value, tags, sample_rate)
+
+    def decrement(self, metric: str, value: float = 1, tags: Optional[List[str]] = None,
+                  sample_rate: float = 1) -> None:
+        self._report(metric, "c", -value, tags, sample_rate)
+
+    def event(self,
+              title: str,
+              text: str,
+              alert_type: Optional[str] = None,
+              aggregation_key: Optional[str] = None,
+              source_type_name: Optional[str] = None,
+              date_happened: Optional[int] = None,
+              priority: Optional[str] = None,
+              tags: Optional[List[str]] = None,
+              hostname: Optional[str] = None) -> None:
+        title = title.replace("\n", "\\n")
+        text = text.replace("\n", "\\n")
+        payload = "_e{{{},{}}}:{}|{}".format(len(title.encode("utf-8")), len(text.encode("utf-8")), title, text)
+        for prefix, value in (("d", date_happened), ("h", hostname), ("k", aggregation_key), ("p", priority),
+                              ("s", source_type_name), ("t", alert_type)):
+            if value:
+                payload += "|{}:{}".format(prefix, value)
+        self._add(payload + self._tag_suffix(tags))
+
+    def start(self) -> None:
+        """
+        Flush every `flush_interval` seconds from a background thread
+        """
+        self._stop_event.clear()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="garbagedog-statsd", daemon=True)
+        self._flush_thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread, send anything still buffered and close the socket
+        """
+        self._stop_event.set()
+        if self._flush_thread:
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+        with self._lock:
+            if self._socket:
+                self._socket.close()
+                self._socket = None
+
+    def flush(self) -> None:
+        """
+        Send everything buffered since the last flush
+        """
+        with self._lock:
+            self._flush()
+
+    def _report(self, metric: str, metric_type: str, value: float, tags: Optional[List[str]],
+                sample_rate: float) -> None:
+        if sample_rate != 1:
+            if random.random() > sample_rate:
+                return
+            metric_type += "|@{}".format(sample_rate)
+        self._add(metric + ":" + str(value) + "|" + metric_type + self._tag_suffix(tags))
+
+    def _tag_suffix(self, tags: Optional[List[str]]) -> str:
+        if not tags:
+            return self._constant_tags_suffix
+        key = tuple(tags)
+        suffix = self._tag_suffixes.get(key)
+        if suffix is None:
+            if len(self._tag_suffixes) >= _MAX_CACHED_TAG_SETS:
+                self._tag_suffixes.clear()
+            suffix = self._tag_suffixes[key] = "|#" + ",".join(list(key) + self.constant_tags)
+        return suffix
+
+    def _add(self, payload: str) -> None:
+        encoded = payload.encode("utf-8")
+        with self._lock:
+            # Metrics are separated by newlines
+            if self._buffer and self._buffer_size + 1 + len(encoded) > self.max_packet_size:
+                self._flush()
+            if self._buffer:
+                self._buffer_size += 1
+            self._buffer.append(encoded)
+            self._buffer_size += len(encoded)
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        packet = b"\n".join(self._buffer)
+        self._buffer = []
+        self._buffer_size = 0
+        self._send(packet)
+
+    def _send(self, packet: bytes) -> None:
+        try:
+            if self._socket is None:
+                self._socket = self._connect()
+            self._socket.send(packet)
+            self.packets += 1
+        except OSError as e:
+            self.dropped_packets += 1
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ENOBUFS) and self._socket:
+                # The agent may have restarted, reconnect on the next send
+                self._socket.close()
+                self._socket = None
+
+    def _connect(self) -> socket.socket:
+        if self.socket_path:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            address = self.socket_path  # type: Any
+        else:
+            family, _, _, _, address = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_DGRAM)[0]
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class TimestampDecoder(object):
+
+    def __init__(self) -> None:
+        """
+        Decode `-XX:+PrintGCDateStamps` timestamps (`2012-04-04T19:08:23.054+0000`, see `TIMEFORMAT`) into epoch
+        seconds. GC events arrive in time order, so the date, hour and timezone of consecutive records are almost always
+        the same: they are converted once and cached, and only the minutes, seconds and milliseconds are sliced out
+        of each timestamp. This is much cheaper than `datetime.strptime`.
+
+        Timestamps must already have been matched against the layout, ie by `ABSOLUTE_TIME_REGEX`.
+        """
+        # (date/hour prefix, timezone suffix, epoch seconds at the start of that hour)
+        self._cache = ("", "", 0.0)
+
+    def decode(self, timestamp: str) -> float:
+        """
+        :param timestamp: Timestamp in `TIMEFORMAT` layout
+        :return: Seconds since the epoch
+        :raises ValueError: If a field is out of range
+        """
+        prefix, zone, hour_epoch = self._cache
+        if not prefix or not (timestamp.startswith(prefix) and timestamp.endswith(zone)):
+            hour_epoch = self._cache_hour(timestamp)
+
+        minutes = int(timestamp[14:16])
+        seconds = int(timestamp[17:19])
+        if minutes > 59 or seconds > 61:
+            raise ValueError("time out of range in {!r}".format(timestamp))
+        return hour_epoch + minutes * 60 + seconds + int(timestamp[20:23]) / 1000
+
+    def _cache_hour(self, timestamp: str) -> float:
+        zone = timestamp[23:28]
+        offset_seconds = int(zone[1:3]) * 3600 + int(zone[3:5]) * 60
+        if zone[0] == "-":
+            offset_seconds = -offset_seconds
+
+        hour_start = datetime(int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]), int(timestamp[11:13]))
+        hour_epoch = (hour_start - _EPOCH).total_seconds() - offset_seconds
+        self._cache = (timestamp[:13], zone, hour_epoch)
+        return hour_epoch
@@ -0,0 +1,289 @@
+import re
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from .constants import GCEventType
+from .parser import GCEvent, GENERATION_NONE, GENERATION_MINOR, GENERATION_MAJOR
+from .timestamps import TimestampDecoder
+
+# "[2020-01-01T12:00:00.123+0000][1.234s][info][gc,heap     ] GC(0) Eden regions: 12->0(11)". The `time` decoration,
+# if logged, always comes first and the tags last; the message follows the tags after a space.
+_TIME_DECORATION = re.compile(r"\[([0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}[.][0-9]{3}[+-][0-9]{4})\]")
+# What the first decoration of a unified logging line can be: time, uptime, level, ...
+UNIFIED_LINE_AT = re.compile(r"\[(?:[0-9]{4}-[0-9]{2}-[0-9]{2}T[^\]]*|[0-9]+[.][0-9]+s|[0-9]+m?s|[0-9]+ns|"
+                             r"trace|debug|info|warning|error)\]")
+
+_SIZES = re.compile(r"([0-9]+)([BKMG])->([0-9]+)([BKMG])\(([0-9]+)([BKMG])\)$")
+_REGIONS = re.compile(r"GC\(([0-9]+)\) (Eden|Survivor|Old|Humongous) regions: ([0-9]+)->([0-9]+)(?:\(([0-9]+)\))?$")
+_YOUNG_GENERATION = re.compile(r"GC\(([0-9]+)\) (PSYoungGen|DefNew|ParNew): ([0-9]+)K->([0-9]+)K\(([0-9]+)K\)$")
+_REGION_SIZE = re.compile(r"Heap [Rr]egion [Ss]ize: ([0-9]+)([KMG])$")
+_STOPPED = re.compile(r"Total time for which application threads were stopped: ([0-9]+[.][0-9]+) seconds"
+                      r"(?:, Stopping threads took: ([0-9]+[.][0-9]+) seconds)?")
+# JDK 17+
+_SAFEPOINT = re.compile(r"Safepoint \"[^\"]*\", Time since last: [0-9]+ ns, Reaching safepoint: ([0-9]+) ns, "
+                        r"(?:Cleanup: [0-9]+ ns, )?At safepoint: [0-9]+ ns, Total: ([0-9]+) ns")
+
+_KILOBYTES = {"B": 1 / 1024, "K": 1, "M": 1024, "G": 1024 * 1024}
+
+# Young pauses of G1 name their kind first; other collectors put the cause there
+_G1_YOUNG_KINDS = ("Normal", "Concurrent Start", "Prepare Mixed", "Initial Mark", "G1 ")
+# Which event a young pause of each collector is, from the "Using ..." line logged at startup
+_YOUNG_EVENT_TYPES = {
+    "Parallel": GCEventType.PS_YOUNG_GEN,
+    "Serial": GCEventType.DEF_NEW,
+    "Concurrent Mark Sweep": GCEventType.PAR_NEW,
+    "G1": GCEventType.G1_YOUNG,
+}
+# Which collector logs each young generation, for logs read from after the "Using ..." line
+_YOUNG_GENERATION_COLLECTORS = {
+    "PSYoungGen": "Parallel",
+    "DefNew": "Serial",
+    "ParNew": "Concurrent Mark Sweep",
+}
+
+
+class UnifiedLogParser(object):
+
+    def __init__(self) -> None:
+        """
+        Parse JDK 9+ unified logging (`-Xlog:gc*`) output, from G1 and the other collectors. Every line is a record of
+        its own, so unlike `RecordAssembler` nothing is assembled: `add_line` picks out the lines to parse, the pause
+        summaries logged with the `gc` tag and the `safepoint` lines, and takes note of the heap sizes logged before
+        each summary. The young generation of G1 is sized in regions, converted with the region size logged at
+        startup.
+
+        The collector and region size are only logged as the JVM starts, so a log read from the middle lacks them.
+        Until they are seen, the collector is told from the generations logged with each pause, and the region size
+        is estimated from the first pause as the power of two just above the heap used per used region; both are kept
+        across restarts with `get_state`.
+
+        Timestamps, and so frequencies and allocation and promotion rates, need the `time` decoration, ie
+        `-Xlog:gc*,safepoint:file=gc.log:time,uptime,level,tags`.
+        """
+        self.truncated_records = 0
+        self.collector = None  # type: Optional[str]
+        self.region_k = None  # type: Optional[float]
+
+        self._decode_timestamp = TimestampDecoder().decode
+        # GC id of the pause being logged, with its young generation (begin, end, total) in K, or in regions by space
+        self._young_gc = None  # type: Optional[str]
+        self._young_k = None  # type: Optional[List[float]]
+        self._regions = {}  # type: Dict[str, Tuple[int, int, Optional[int]]]
+
+    def add_line(self, line: str) -> Optional[str]:
+        """
+        :param line: Log line with trailing whitespace removed
+        :return: The line, if it is a record to parse
+        """
+        tags, message_start = _split_decorations(line)
+        if tags == "gc" or tags == "safepoint":
+            return line
+        if tags == "gc,heap" or tags == "gc,init":
+            self._note_heap(line[message_start:])
+        return None
+
+    def parse(self, record: str) -> Optional[GCEvent]:
+        """
+        :param record: Line returned by `add_line`
+        :return: Parsed record, or None if nothing could be extracted
+        """
+        tags, message_start = _split_decorations(record)
+        if tags is None:
+            return None
+        message = record[message_start:]
+        time_decoration = _TIME_DECORATION.match(record)
+        timestamp = self._decode_timestamp(time_decoration.group(1)) if time_decoration else None
+
+        if tags == "safepoint":
+            return self._parse_safepoint(message, timestamp)
+        if message.startswith("GC("):
+            return self._parse_gc(message, timestamp)
+        if message.startswith("Using "):
+            self.collector = message[6:]
+        return None
+
+    def pending(self) -> str:
+        """
+        :return: Always empty, records are never split over lines
+        """
+        return ""
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        :return: What was learnt from the start of the log, as a JSON serializable dict
+        """
+        return {"collector": self.collector, "region_k": self.region_k}
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        """
+        :param state: State returned by `get_state`
+        """
+        self.collector = state.get("collector")
+        self.region_k = state.get("region_k")
+
+    def reset(self, pending: str = "") -> None:
+        """
+        Forget the heap sizes noted for the pause being logged
+
+        :param pending: Ignored, see `pending`
+        """
+        self._young_gc = None
+        self._young_k = None
+        self._regions = {}
+
+    def _parse_gc(self, message: str, timestamp: Optional[float]) -> Optional[GCEvent]:
+        # "GC(12) Pause Young (Normal) (G1 Evacuation Pause) 24M->3M(256M) 11.234ms"
+        id_end = message.find(") ")
+        if id_end < 0:
+            return None
+        gc_id = message[3:id_end]
+        event = message[id_end + 2:]
+
+        duration = None
+        if event.endswith("ms"):
+            space = event.rfind(" ")
+            try:
+                duration = float(event[space + 1:-2]) / 1000
+            except ValueError:
+                return None
+            event = event[:space]
+        sizes = None
+        if event.endswith(")") and "->" in event:
+            space = event.rfind(" ")
+            sizes = _SIZES.match(event, space + 1)
+            if sizes:
+                event = event[:space]
+
+        event_type, generation = self._classify(event, duration)
+        if event_type is not None and duration is None:
+            # Only the summary logged as a pause ends is counted
+            return None
+        if timestamp is None:
+            if event_type is None:
+                return None
+            return GCEvent(None, event_type, duration)
+        if event_type is None and generation == GENERATION_NONE:
+            return None
+
+        if sizes and event_type is not None and event_type.is_stop_the_world:
+            if self.region_k is None and gc_id == self._young_gc:
+                self._estimate_region_size(int(sizes.group(1)) * _KILOBYTES[sizes.group(2)])
+            young_k = self._young_sizes(gc_id)
+            if young_k:
+                before, before_unit, after, after_unit, total, total_unit = sizes.groups()
+                return GCEvent(timestamp, event_type, duration, generation, None, None,
+                               int(young_k[0]), int(young_k[1]), int(young_k[2]),
+                               int(int(before) * _KILOBYTES[before_unit]),
+                               int(int(after) * _KILOBYTES[after_unit]),
+                               int(int(total) * _KILOBYTES[total_unit]))
+        return GCEvent(timestamp, event_type, duration, generation)
+
+    def _classify(self, event: str, duration: Optional[float]) -> Tuple[Optional[GCEventType], int]:
+        """
+        :return: Tuple of (event type, generation), the event type is None unless this is a pause or a concurrent cycle
+        """
+        if event.startswith("Pause Young"):
+            if event.startswith("Pause Young (Mixed)"):
+                return GCEventType.G1_MIXED, GENERATION_MINOR
+            if event.startswith(_G1_YOUNG_KINDS, 13):
+                return GCEventType.G1_YOUNG, GENERATION_MINOR
+            return _YOUNG_EVENT_TYPES.get(self.collector or "", GCEventType.UNKNOWN), GENERATION_MINOR
+        if event.startswith("Pause Full"):
+            return GCEventType.FULL_GC, GENERATION_MAJOR
+        if event.startswith("Pause Remark"):
+            if self.collector == "Concurrent Mark Sweep":
+                return GCEventType.CMS_REMARK, GENERATION_NONE
+            return GCEventType.G1_REMARK, GENERATION_NONE
+        if event.startswith("Pause Cleanup"):
+            return GCEventType.G1_CLEANUP, GENERATION_NONE
+        if event.startswith("Pause Initial Mark"):
+            if self.collector == "Concurrent Mark Sweep":
+                return GCEventType.CMS_INITIAL_MARK, GENERATION_MAJOR
+            return GCEventType.G1_YOUNG, GENERATION_MINOR
+        if event == "Concurrent Cycle" or event == "Concurrent Mark Cycle":
+            if duration is None:
+                # The start of an old generation collection, counted like CMS-initial-mark
+                return None, GENERATION_MAJOR
+            return GCEventType.G1_CONCURRENT_CYCLE, GENERATION_NONE
+        if event.startswith("Pause "):
+            return GCEventType.UNKNOWN, GENERATION_NONE
+        return None, GENERATION_NONE
+
+    def _parse_safepoint(self, message: str, timestamp: Optional[float]) -> Optional[GCEvent]:
+        stopped = _STOPPED.match(message)
+        if stopped:
+            safepoint_time = stopped.group(2)
+            return GCEvent(timestamp, None, None, GENERATION_NONE, float(stopped.group(1)),
+                           None if safepoint_time is None else float(safepoint_time))
+        safepoint = _SAFEPOINT.match(message)
+        if safepoint:
+            return GCEvent(timestamp, None, None, GENERATION_NONE, int(safepoint.group(2)) / 1e9,
+                           int(safepoint.group(1)) / 1e9)
+        return None
+
+    def _note_heap(self, message: str) -> None:
+        if message.startswith("GC("):
+            regions = _REGIONS.match(message)
+            if regions:
+                gc_id, space, before, after, target = regions.groups()
+                if gc_id != self._young_gc:
+                    self.reset()
+                    self._young_gc = gc_id
+                    if self.collector is None:
+                        self.collector = "G1"
+                self._regions[space] = (int(before), int(after), None if target is None else int(target))
+                return
+            young = _YOUNG_GENERATION.match(message)
+            if young:
+                self.reset()
+                self._young_gc = young.group(1)
+                self._young_k = [float(young.group(3)), float(young.group(4)), float(young.group(5))]
+                if self.collector is None:
+                    self.collector = _YOUNG_GENERATION_COLLECTORS[young.group(2)]
+            return
+
+        region_size = _REGION_SIZE.match(message)
+        if region_size:
+            self.region_k = int(region_size.group(1)) * _KILOBYTES[region_size.group(2)]
+
+    def _young_sizes(self, gc_id: str) -> Optional[List[float]]:
+        if gc_id != self._young_gc:
+            return None
+        if self._young_k is not None:
+            return self._young_k
+        eden, survivor = self._regions.get("Eden"), self._regions.get("Survivor")
+        if self.region_k is None or eden is None or survivor is None or eden[2] is None or survivor[2] is None:
+            return None
+        return [(eden[0] + survivor[0]) * self.region_k,
+                (eden[1] + survivor[1]) * self.region_k,
+                (eden[2] + survivor[2]) * self.region_k]
+
+    def _estimate_region_size(self, used_k: float) -> None:
+        # Only the last region of each space is partly used, and Eden is full when a pause starts, so the heap used
+        # per used region is more than half the region size. Region sizes are powers of two of at least 1M.
+        if len(self._regions) < 4:
+            return
+        used_regions = sum(before for before, _, _ in self._regions.values())
+        if not used_regions:
+            return
+        region_k = 1024.0
+        while region_k < used_k / used_regions:
+            region_k *= 2
+        self.region_k = region_k
+
+
+def _split_decorations(line: str) -> Tuple[Optional[str], int]:
+    """
+    No decoration holds "] ", so the first one ends the tags, the last decoration
+
+    :return: Tuple of (tags, offset of the message), the tags are None if the line is not decorated
+    """
+    if line[:1] != "[":
+        return None, 0
+    tags_end = line.find("] ")
+    if tags_end < 0:
+        if line[-1:] != "]":
+            return None, 0
+        # Nothing logged after the decorations
+        tags_end = len(line) - 1
+    return line[line.rfind("[", 0, tags_end) + 1:tags_end].rstrip(), tags_end + 2
@@ -1,13 +1,16 @@
+import fnmatch
 import glob
 import os
 import time
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
-from typing import Tuple, Optional, Generator
-from typing.io import TextIO
+from typing import BinaryIO, List, Tuple, Optional, Generator
 
 from .constants import GCEventType, GCSizeInfo
-from .constants import SIZE_REGEX, TIMES_REGEX, TIMEFORMAT, THREE_ARROWS_REGEX
+from .inotify import InotifyWatcher, IN_CREATE, IN_MOVED_TO
+from .parser import parse_record
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
 
 class GCLogHandler(object):
@@ -17,7 +20,10 @@ class GCLogHandler(object):
                  glob_pattern: str = "gc.log*",
                  refresh_logfiles_seconds: int = 60,
                  sleep_seconds: int = 1,
-                 verbose: bool = False) -> None:
+                 verbose: bool = False,
+                 use_inotify: bool = True,
+                 resume_position: Optional[Tuple[int, int, int]] = None,
+                 max_catchup_bytes: Optional[int] = None) -> None:
         """
         Given a `log_directory`, provide an object for returning new GC logs in that directory. This object can
         be used as a contextmanager for convenience. For example:
@@ -26,95 +32,310 @@ class GCLogHandler(object):
                 for line in gc_log_handler:
                     print(line)
 
-        This log handler object will also handle opening rotated log files when they are created.
+        This log handler object will also handle opening rotated log files when they are created. Files are tracked
+        by (device, inode, offset): when the file being read is renamed away, replaced, or a newer log file appears,
+        the rest of the old file is drained before the new one is read from its start. A file that shrinks below the
+        read offset is treated as truncated and re-read from its start.
+
+        Lines are only returned once their newline has been written, as the JVM writes some records in pieces around
+        the pause. The start of a line is held back, and `offset` stays at its start, until the rest arrives; only the
+        last line of a rotated file is returned without one. `consumed_offset` only passes a line once the next one is
+        asked for, so a checkpoint taken after an interruption re-reads the line that was being handled.
+
+        By default reading starts at the end of the newest log file. If `resume_position` names a file that still
+        exists, reading resumes from the saved offset in that file instead, skipping ahead if more than
+        `max_catchup_bytes` would have to be replayed.
+
+        Where inotify is available the handler sleeps until the log directory is written to, instead of waking up
+        every `sleep_seconds` to poll. Otherwise it falls back to polling.
 
         :param log_directory: Directory to find GC logs
         :param glob_pattern: Pattern to match for garbage collection logs
         :param refresh_logfiles_seconds: How often (in seconds) to check for newer rotated log files
         :param sleep_seconds: How often (in seconds) to poll for new log lines
         :param verbose: If True, print extra info when log files are opened
+        :param use_inotify: If True, wait for inotify events instead of polling when inotify is available
+        :param resume_position: (device, inode, offset) to resume reading from, as saved from a previous run
+        :param max_catchup_bytes: Maximum number of bytes to replay when resuming, None for no limit
         """
         self.log_directory = log_directory
         self.glob_pattern = glob_pattern
         self.refresh_logfiles_seconds = refresh_logfiles_seconds
         self.sleep_seconds = sleep_seconds
         self.verbose = verbose
+        self.use_inotify = use_inotify
+        self.resume_position = resume_position
+        self.max_catchup_bytes = max_catchup_bytes
+
+        self.watcher = None  # type: Optional[InotifyWatcher]
+        self.log_file = None  # type: Optional[BinaryIO]
+        self.log_path = None  # type: Optional[str]
+        self.file_identity = None  # type: Optional[Tuple[int, int]]
+        self.offset = 0  # type: int
+        # Offset past the last line the caller has moved on from
+        self.consumed_offset = 0  # type: int
+        self.resumed = False  # type: bool
 
-        self.log_file = None  # type: TextIO
-        self.last_new_line_seen = datetime.utcfromtimestamp(0)  # type: datetime
-        self.previous_record = ""  # type: str
+        self._rescan_needed = False
+        self._last_scan = 0.0
+        # Start of a line read before its newline was written
+        self._partial = b""
 
     def __enter__(self):
-        self._load_newest_file()
+        if self.use_inotify:
+            self._start_watcher()
+        if self.resume_position and self._resume(*self.resume_position):
+            return self
+        newest_log = self._find_newest_log()
+        if newest_log:
+            # Only lines written after startup are interesting, later files are read from their start
+            self._open_log(newest_log, seek_to_end=True)
         return self
 
     def __exit__(self, exception_type, exception_value, traceback):
-        if self.log_file:
-            self.log_file.close()
+        self._close_log()
+        if self.watcher:
+            self.watcher.close()
+            self.watcher = None
 
     def __iter__(self):
         return self.get_log_lines()
 
     def get_log_lines(self) -> Generator:
         """
-        Generator that returns the next log line. If there are no new log lines, this will sleep for `sleep_time` seconds.
-        If the log file is not updated after `refresh_logfiles_seconds` and a new log file exists, the new log file will
-        be used.
+        Generator that returns the next log line. If there are no new log lines, this will wait for the log directory to
+        change (or sleep for `sleep_seconds` seconds when polling). Rotation and truncation are checked each time the
+        end of the current file is reached.
 
         :return: The next log line in GC logs
         """
         while True:
-            current_time = datetime.now()
+            yield from self.read_available_lines()
+            self._wait_for_changes(self.wait_seconds())
 
-            # gc.logs rotate, so if we dont see output for a while, we should make sure were reading the newest file
-            if (current_time - self.last_new_line_seen).total_seconds() > self.refresh_logfiles_seconds:
-                self._load_newest_file()
+    def read_available_lines(self) -> Generator:
+        """
+        Generator that returns the log lines available right now, following rotation and truncation, and stops once
+        it has caught up. Use this instead of `get_log_lines` to wait for changes elsewhere, ie in an event loop.
 
-                if not self.log_file:
-                    printv("No logfiles found in {}, sleeping for {} seconds"
-                           .format(self.log_directory, self.refresh_logfiles_seconds), self.verbose)
-                    time.sleep(self.refresh_logfiles_seconds)
+        :return: The next log line in GC logs
+        """
+        while True:
+            if not self.log_file:
+                newest_log = self._find_newest_log()
+                if newest_log:
+                    self._open_log(newest_log, seek_to_end=False)
                     continue
+                printv("No logfiles found in {}, sleeping for {} seconds"
+                       .format(self.log_directory, self.refresh_logfiles_seconds), self.verbose)
+                return
 
-            line = self.log_file.readline()
+            line = self._readline()
             if line:
-                self.last_new_line_seen = current_time
                 yield line
-            else:
-                time.sleep(self.sleep_seconds)
+                self.consumed_offset = self.offset
+                continue
 
-    def _load_newest_file(self) -> None:
+            if self._check_truncated():
+                continue
+
+            rotated_log = self._check_rotated()
+            if rotated_log:
+                # Anything written to the old file between our last read and the rotation is still there, and
+                # nothing more will be
+                line = self._readline(partial_ok=True)
+                while line:
+                    yield line
+                    self.consumed_offset = self.offset
+                    line = self._readline(partial_ok=True)
+                self._open_log(rotated_log, seek_to_end=False)
+                continue
+
+            return
+
+    def wait_seconds(self) -> float:
+        """
+        :return: How long (in seconds) to wait for changes after `read_available_lines` has caught up
+        """
+        return self.sleep_seconds if self.log_file else self.refresh_logfiles_seconds
+
+    def bytes_behind(self) -> Optional[int]:
+        """
+        Safe to call from another thread
+
+        :return: How many bytes of the current log file have not been read yet, or None if no file is open
+        """
+        log_file = self.log_file
+        if log_file is None:
+            return None
+        try:
+            return max(0, os.fstat(log_file.fileno()).st_size - self.offset)
+        except (OSError, ValueError):
+            # Closed by rotation in the meantime
+            return None
+
+    def handle_watcher_events(self, events: List[Tuple[int, str]]) -> None:
+        """
+        Take note of inotify events read from `watcher`
+
+        :param events: List of (mask, file name) events
+        """
+        for mask, name in events:
+            if mask & (IN_CREATE | IN_MOVED_TO) and fnmatch.fnmatch(name, self.glob_pattern):
+                self._rescan_needed = True
+
+    def _readline(self, partial_ok: bool = False) -> str:
+        assert self.log_file is not None
+        raw_line = self._partial + self.log_file.readline()
+        if not partial_ok and raw_line[-1:] != b"\n":
+            # Written in pieces, wait for the rest
+            self._partial = raw_line
+            return ""
+        self._partial = b""
+        self.offset += len(raw_line)
+        return raw_line.decode("utf-8", errors="replace")
+
+    def _open_log(self, log_path: str, seek_to_end: bool) -> None:
+        self._close_log()
         printv("", self.verbose)
-        printv("Last line seen {} seconds ago!"
-               .format((datetime.now() - self.last_new_line_seen).total_seconds()), self.verbose)
+        printv("Now reading from: {}!".format(log_path), self.verbose)
 
-        gc_logs = glob.glob(os.path.join(self.log_directory, self.glob_pattern))
+        try:
+            log_file = open(log_path, "rb")
+        except FileNotFoundError:
+            return
 
-        if gc_logs:
-            newest_log_name = max(gc_logs, key=os.path.getctime)
-            if self.log_file:
-                self.log_file.close()
-            printv("Now reading from: {}!".format(newest_log_name), self.verbose)
+        stat = os.fstat(log_file.fileno())
+        self.log_file = log_file
+        self.log_path = log_path
+        self.file_identity = (stat.st_dev, stat.st_ino)
+        self.offset = self.consumed_offset = log_file.seek(0, 2) if seek_to_end else 0
 
-            self.log_file = open(newest_log_name)
-            self.log_file.seek(0, 2)
-            self.last_new_line_seen = datetime.now()
+    def _resume(self, device: int, inode: int, offset: int) -> bool:
+        # The file may have been renamed by rotation while we were down, so look it up by identity
+        for log_path in glob.glob(os.path.join(self.log_directory, self.glob_pattern)):
+            try:
+                stat = os.stat(log_path)
+            except FileNotFoundError:
+                continue
+            if (stat.st_dev, stat.st_ino) == (device, inode):
+                break
         else:
-            self.log_file = None
+            printv("Checkpointed log file is gone, starting from the newest log file", self.verbose)
+            return False
+
+        self._open_log(log_path, seek_to_end=False)
+        if not self.log_file:
+            return False
+
+        resume_offset = offset if offset <= stat.st_size else 0
+        if self.max_catchup_bytes is not None and stat.st_size - resume_offset > self.max_catchup_bytes:
+            resume_offset = stat.st_size - self.max_catchup_bytes
+            printv("Skipping {} bytes of {} to stay within the catch-up window"
+                   .format(resume_offset - offset, log_path), self.verbose)
+        self.resumed = resume_offset == offset
+
+        self.offset = self.log_file.seek(resume_offset)
+        if not self.resumed and resume_offset:
+            # We landed mid-line, the partial line is of no use
+            self._readline(partial_ok=True)
+        self.consumed_offset = self.offset
+        printv("Resuming {} at offset {}".format(log_path, self.offset), self.verbose)
+        return True
+
+    def _close_log(self) -> None:
+        if self.log_file:
+            self.log_file.close()
+        self.log_file = None
+        self.log_path = None
+        self.file_identity = None
+        self.offset = self.consumed_offset = 0
+        self._partial = b""
+
+    def _check_truncated(self) -> bool:
+        assert self.log_file is not None
+        if os.fstat(self.log_file.fileno()).st_size < self.offset:
+            printv("{} was truncated, reading from the start".format(self.log_path), self.verbose)
+            self.log_file.seek(0)
+            self.offset = self.consumed_offset = 0
+            self._partial = b""
+            return True
+        return False
+
+    def _check_rotated(self) -> Optional[str]:
+        """
+        :return: Path of the log file to switch to, if the current one has been rotated
+        """
+        assert self.log_path is not None
+        try:
+            path_stat = os.stat(self.log_path)
+            moved = (path_stat.st_dev, path_stat.st_ino) != self.file_identity
+        except FileNotFoundError:
+            moved = True
+
+        rescan_due = time.monotonic() - self._last_scan > self.refresh_logfiles_seconds
+        if not (moved or self._rescan_needed or rescan_due):
+            return None
+
+        newest_log = self._find_newest_log()
+        if not newest_log:
+            return None
+        try:
+            newest_stat = os.stat(newest_log)
+        except FileNotFoundError:
+            return None
+        if (newest_stat.st_dev, newest_stat.st_ino) == self.file_identity:
+            # Our file may have been renamed (gc.log.0.current -> gc.log.0), but it is still the one being written
+            self.log_path = newest_log
+            return None
+        return newest_log
+
+    def _find_newest_log(self) -> Optional[str]:
+        self._rescan_needed = False
+        self._last_scan = time.monotonic()
+
+        newest_log = None
+        newest_mtime = None
+        for log_path in glob.glob(os.path.join(self.log_directory, self.glob_pattern)):
+            try:
+                mtime = os.stat(log_path).st_mtime
+            except FileNotFoundError:
+                continue
+            # mtime only moves when the JVM writes, unlike ctime which also changes on rename or chmod
+            if newest_mtime is None or mtime > newest_mtime:
+                newest_log, newest_mtime = log_path, mtime
+        return newest_log
+
+    def _start_watcher(self) -> None:
+        try:
+            self.watcher = InotifyWatcher(self.log_directory)
+            printv("Watching {} with inotify".format(self.log_directory), self.verbose)
+        except OSError as e:
+            printv("inotify unavailable ({}), polling every {} seconds instead"
+                   .format(e, self.sleep_seconds), self.verbose)
+            self.watcher = None
+
+    def _wait_for_changes(self, sleep_seconds: float) -> None:
+        if not self.watcher:
+            time.sleep(sleep_seconds)
+            return
+
+        # Without polling, nothing else wakes us up to recheck for rotated files, so never block past that deadline
+        self.handle_watcher_events(self.watcher.wait(self.refresh_logfiles_seconds))
 
 
 def parse_line_for_times(line: str) -> Optional[Tuple[GCEventType, float]]:
     """
-    Given a log line, return an event type and duration if it exists
+    Given a log line, return an event type and duration if it exists. Kept for callers of the regex parser this
+    replaced, `parse_record` gives both this and `parse_line_for_sizes` in one pass.
 
     :param line: Log line
     :return: Tuple of (event type, duration)
     """
-    time_match = TIMES_REGEX.match(line)
-    if time_match:
-        gctime_in_seconds = time_match.group(1)
-        event_type = GCEventType.from_gc_line(line)
-        return event_type, float(gctime_in_seconds)
+    event = parse_record(line)
+    if event is None or event.duration is None:
+        return None
+    return event.event_type, event.duration
 
 
 def parse_line_for_sizes(line: str) -> Optional[Tuple[datetime, GCSizeInfo]]:
@@ -124,19 +345,11 @@ def parse_line_for_sizes(line: str) -> Optional[Tuple[datetime, GCSizeInfo]]:
     :param line: Log line
     :return: Tuple of (timestamp, size info object)
     """
-    arrows_match = THREE_ARROWS_REGEX.match(line)
-    size_match = SIZE_REGEX.match(line)
-    if size_match and not arrows_match:
-        date_str, _, young_begin_k, young_end_k, young_total_k, whole_heap_begin_k, whole_heap_end_k, whole_heap_total_k = size_match.groups()
-        timestamp = datetime.strptime(date_str, TIMEFORMAT)
-        size_info = GCSizeInfo(
-            young_begin_k=int(young_begin_k),
-            young_end_k=int(young_end_k),
-            young_total_k=int(young_total_k),
-            whole_heap_begin_k=int(whole_heap_begin_k),
-            whole_heap_end_k=int(whole_heap_end_k),
-            whole_heap_total_k=int(whole_heap_total_k))
-        return timestamp, size_info
+    event = parse_record(line)
+    if event is None or event.timestamp is None or event.young_begin_k is None:
+        return None
+    # Logs have millisecond timestamps, which epoch floats far from 1970 only hold to the nearest few microseconds
+    return _EPOCH + timedelta(milliseconds=round(event.timestamp * 1000)), event.size_info
 
 
 def printv(line: str, verbose: bool) -> None:
@@ -12,10 +12,13 @@ setup(
     scripts=[
         'bin/garbagedog'
     ],
-    python_requires='>=3.4',
+    python_requires='>=3.5',
     install_requires=[
         'datadog>=0.26.0',
         'typing',
         'setuptools>=40.8.0'
     ],
+    extras_require={
+        'report': ['numpy'],
+    },
 )
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+from mock import call, Mock
+
+from garbagedog.aggregator import MetricAggregator
+
+
+def test_flush_summaries():
+    stats = Mock()
+    aggregator = MetricAggregator(stats)
+    for value in [1.0, 2.0, 3.0, 4.0]:
+        aggregator.timing("garbagedog_gc_event_duration", value, tags=["stw:True", "event_type:ParNew"])
+    aggregator.histogram("garbagedog_allocation_rate_histogram", 10.0)
+
+    aggregator.flush()
+
+    tags = ["stw:True", "event_type:ParNew"]
+    stats.gauge.assert_has_calls([
+        call("garbagedog_gc_event_duration.max", 4.0, tags=tags),
+        call("garbagedog_gc_event_duration.avg", 2.5, tags=tags),
+        call("garbagedog_gc_event_duration.sum", 10.0, tags=tags),
+        call("garbagedog_allocation_rate_histogram.max", 10.0, tags=None),
+    ], any_order=True)
+    stats.increment.assert_has_calls([
+        call("garbagedog_gc_event_duration.count", 4, tags=tags),
+        call("garbagedog_allocation_rate_histogram.count", 1, tags=None),
+    ], any_order=True)
+    gauge_names = [gauge_call[0][0] for gauge_call in stats.gauge.call_args_list]
+    assert "garbagedog_gc_event_duration.median" in gauge_names
+    assert "garbagedog_gc_event_duration.95percentile" in gauge_names
+    assert "garbagedog_gc_event_duration.99percentile" in gauge_names
+
+    # Nothing left to send until new samples arrive
+    stats.reset_mock()
+    aggregator.flush()
+    assert not stats.gauge.called
+
+def test_percentiles_match_raw_emission():
+    rng = random.Random(3)
+    raw_stats = Mock()
+    aggregator = MetricAggregator(Mock())
+    for _ in range(10000):
+        value = rng.lognormvariate(-4, 1)
+        raw_stats.timing("garbagedog_gc_event_duration", value, tags=["event_type:ParNew"])
+        aggregator.timing("garbagedog_gc_event_duration", value, tags=["event_type:ParNew"])
+    aggregator.flush()
+
+    raw_values = sorted(timing_call[0][1] for timing_call in raw_stats.timing.call_args_list)
+    sent = {gauge_call[0][0]: gauge_call[0][1] for gauge_call in aggregator.stats.gauge.call_args_list}
+    for name, q in [("median", 0.5), ("95percentile", 0.95), ("99percentile", 0.99)]:
+        expected = raw_values[int(q * (len(raw_values) - 1))]
+        assert sent["garbagedog_gc_event_duration." + name] == pytest.approx(expected, rel=0.01)
+    assert sent["garbagedog_gc_event_duration.max"] == raw_values[-1]
+
+def test_passes_other_calls_through():
+    stats = Mock()
+    MetricAggregator(stats).gauge("garbagedog_something", 1)
+    stats.gauge.assert_called_once_with("garbagedog_something", 1)
+
+def test_stop_flushes():
+    stats = Mock()
+    aggregator = MetricAggregator(stats, flush_interval=3600)
+    aggregator.start()
+    aggregator.timing("garbagedog_gc_event_duration", 1.0)
+    aggregator.stop()
+    stats.increment.assert_called_once_with("garbagedog_gc_event_duration.count", 1, tags=None)
@@ -0,0 +1,140 @@
+import io
+import json
+import os
+
+from mock import Mock
+
+from benchmarks.gc_log_generator import generate_unified_gc_log
+from garbagedog.backfill import JSONLinesEmitter, _ChunkStreams, _merge_by_time, backfill, parse_chunk, split_chunks, \
+    split_files
+from garbagedog.event_processor import GCEventProcessor
+from garbagedog.parser import RECORD_START, classify_line
+
+GOLDEN_LOG = os.path.join(os.path.dirname(__file__), "data", "jdk8_golden.log")
+
+PAR_NEW_LINE = "2017-07-27T18:01:{:02d}.000+0000: 2.346: [GC (Allocation Failure) 2.346: [ParNew: " \
+               "{}K->8704K(78656K), 0.0312710 secs] 76034K->19240K(253440K), 0.0313630 secs] " \
+               "[Times: user=0.09 sys=0.01, real=0.03 secs]\n"
+
+
+class _CountingPool(object):
+    # Runs chunks when their result is asked for, counting how many were submitted but not yet collected
+    def __init__(self):
+        self.outstanding = self.most_outstanding = 0
+
+    def apply_async(self, function, args):
+        self.outstanding += 1
+        self.most_outstanding = max(self.most_outstanding, self.outstanding)
+        return Mock(get=lambda: self._run(function, args))
+
+    def _run(self, function, args):
+        self.outstanding -= 1
+        return function(*args)
+
+
+def _process_sequentially(lines):
+    processor = GCEventProcessor("localhost", "1234", None, stats=Mock())
+    for line in lines:
+        processor._process_line(line)
+    processor._process_eventline(processor.log_parser.pending())
+    return processor.stats.mock_calls
+
+
+def test_split_chunks_at_record_starts():
+    chunks = split_chunks(GOLDEN_LOG, chunk_bytes=500)
+    with open(GOLDEN_LOG, "rb") as f:
+        data = f.read()
+
+    assert len(chunks) > 5
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(data)
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start
+        first_line = data[start:data.index(b"\n", start)].decode().rstrip()
+        assert classify_line(first_line)[0] == RECORD_START
+
+
+def test_chunks_parse_like_the_whole_file():
+    whole = parse_chunk(GOLDEN_LOG, 0, os.path.getsize(GOLDEN_LOG))
+    chunked = [record for start, end in split_chunks(GOLDEN_LOG, chunk_bytes=500)
+               for record in parse_chunk(GOLDEN_LOG, start, end)]
+    assert chunked == whole
+
+
+def test_backfill_matches_sequential_processing(tmpdir):
+    log_file = tmpdir.join("gc.log")
+    log_file.write("".join(PAR_NEW_LINE.format(second, 76034 + second) for second in range(60)))
+
+    stats = Mock()
+    result = backfill([str(log_file)], GCEventProcessor("localhost", "1234", None, stats=stats), workers=2,
+                      chunk_bytes=1000)
+
+    assert result.records == 60
+    assert result.bytes == log_file.size()
+    with open(str(log_file)) as f:
+        assert stats.mock_calls == _process_sequentially(f.readlines())
+
+
+def test_backfill_merges_rotated_files_by_time(tmpdir):
+    lines = [PAR_NEW_LINE.format(second, 76034 + second) for second in range(20)]
+    tmpdir.join("gc.log.0").write("".join(lines[10:]))
+    tmpdir.join("gc.log.1").write("".join(lines[:10]))
+
+    stats = Mock()
+    backfill([str(tmpdir.join("gc.log.0")), str(tmpdir.join("gc.log.1"))],
+             GCEventProcessor("localhost", "1234", None, stats=stats), workers=1)
+
+    assert stats.mock_calls == _process_sequentially(lines)
+
+
+def test_backfill_streams_chunks(tmpdir):
+    lines = [PAR_NEW_LINE.format(second, 76034 + second) for second in range(60)]
+    paths = []
+    for index in range(3):
+        log_file = tmpdir.join("gc.log.{}".format(index))
+        log_file.write("".join(lines[20 * (2 - index):20 * (3 - index)]))
+        paths.append(str(log_file))
+    chunks = split_files(paths, chunk_bytes=500)
+    assert len(chunks) > 10
+
+    pool = _CountingPool()
+    streams = _ChunkStreams(pool, max_in_flight=2)
+    merged = list(_merge_by_time([streams.records([chunk for chunk in chunks if chunk[0] == path])
+                                  for path in paths]))
+
+    assert [record[6] for record in merged] == [76034 + second for second in range(60)]
+    # One chunk held for each file waiting its turn in the merge, and those in flight for the one being merged
+    assert pool.most_outstanding <= 2 + len(paths)
+
+    stats = Mock()
+    backfill(paths, GCEventProcessor("localhost", "1234", None, stats=stats), workers=2, chunk_bytes=500)
+    assert stats.mock_calls == _process_sequentially(lines)
+
+
+def test_backfill_unified_log(tmpdir):
+    lines = generate_unified_gc_log(50)
+    log_file = tmpdir.join("gc.log")
+    log_file.write("".join(lines))
+
+    stats = Mock()
+    result = backfill([str(log_file)], GCEventProcessor("localhost", "1234", None, stats=stats), workers=2,
+                      chunk_bytes=1000)
+
+    assert result.records > 50
+    assert stats.mock_calls == _process_sequentially(lines)
+
+
+def test_json_lines_output(tmpdir):
+    log_file = tmpdir.join("gc.log")
+    log_file.write(PAR_NEW_LINE.format(1, 76034) + PAR_NEW_LINE.format(2, 80000))
+
+    out = io.StringIO()
+    stats = Mock()
+    backfill([str(log_file)], GCEventProcessor("localhost", "1234", None, stats=stats), workers=1,
+             output=JSONLinesEmitter(out, constant_tags=["app:foo"]))
+
+    metrics = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert not stats.mock_calls
+    assert metrics[0] == {"timestamp": 1501178461.0, "metric": "garbagedog_gc_event_duration", "type": "timing",
+                          "value": 0.03, "tags": ["app:foo", "stw:True", "event_type:ParNew"]}
+    assert {"timestamp": 1501178462.0, "metric": "garbagedog_time_between_young_gc", "type": "histogram",
+            "value": 1.0, "tags": ["app:foo"]} in metrics
@@ -0,0 +1,27 @@
+import os
+
+from garbagedog.checkpoint import Checkpointer
+
+
+def test_save_and_load(tmpdir):
+    state_file = str(tmpdir.join("state.json"))
+    checkpointer = Checkpointer(state_file, interval_seconds=0)
+
+    assert checkpointer.load() is None
+    checkpointer.save({"log": {"offset": 10}})
+
+    assert checkpointer.load() == {"log": {"offset": 10}, "version": 2}
+    assert not os.path.exists(state_file + ".tmp")
+    assert checkpointer.due()
+
+def test_load_corrupt(tmpdir):
+    state_file = tmpdir.join("state.json")
+    state_file.write("{not json")
+
+    assert Checkpointer(str(state_file)).load() is None
+
+def test_load_unknown_version(tmpdir):
+    state_file = tmpdir.join("state.json")
+    state_file.write('{"version": 999}')
+
+    assert Checkpointer(str(state_file)).load() is None
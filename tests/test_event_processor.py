@@ -1,5 +1,10 @@
+import json
+import mock
+import os
+import pytest
 from mock import call, Mock
 
+from garbagedog.checkpoint import Checkpointer
 from garbagedog.event_processor import GCEventProcessor
 
 
@@ -17,10 +22,133 @@ def test_process_line():
     gc_event_processor = GCEventProcessor("localhost", "1234", None)
     gc_event_processor.stats.timing = Mock()
 
-    gc_event_processor._process_line(log_line_2, log_line)
+    gc_event_processor._process_line(log_line)
+    gc_event_processor._process_line(log_line_2)
 
     gc_event_processor.stats.timing.assert_has_calls(
         [
             call('garbagedog_gc_event_duration', 0.06, tags=['stw:True', 'event_type:DefNew'])
         ]
     )
+
+
+def test_state_round_trip():
+    log_line = "2012-04-04T19:08:23.054+0000: 511001.548: [GC 511001.549: [ParNew: 100K->10K(200K), 0.01 secs] " \
+               "1000K->910K(2000K), 0.01 secs] [Times: user=0.01 sys=0.00, real=0.01 secs]"
+
+    gc_event_processor = GCEventProcessor("localhost", "1234", None)
+    gc_event_processor._process_line(log_line)
+    gc_event_processor._process_line("2012-04-04T19:08:24.000+0000: next")
+    gc_event_processor._process_line("partial record")
+    state = gc_event_processor.get_state()
+
+    restored = GCEventProcessor("localhost", "1234", None)
+    restored.restore_state(json.loads(json.dumps(state)))
+    assert restored.log_parser.pending() == "2012-04-04T19:08:24.000+0000: next partial record"
+    assert restored.last_sized_event.timestamp == gc_event_processor.last_sized_event.timestamp
+    assert restored.last_sized_event.size_info == gc_event_processor.last_sized_event.size_info
+    assert restored.last_minor_time == gc_event_processor.last_minor_time
+    assert restored.last_major_time is None
+
+
+def test_process_log_directory_checkpoint(tmpdir):
+    log_dir = tmpdir.mkdir("logs")
+    gc_log = log_dir.join("gc.log")
+    gc_log.write("")
+    checkpointer = Checkpointer(str(tmpdir.join("state.json")), interval_seconds=0)
+
+    gc_event_processor = GCEventProcessor("localhost", "1234", None)
+    gc_event_processor._process_line = Mock(side_effect=[None, None, KeyboardInterrupt])
+    with mock.patch("garbagedog.utils.GCLogHandler.get_log_lines", return_value=iter(["a\n", "b\n", "c\n"])):
+        with pytest.raises(KeyboardInterrupt):
+            gc_event_processor.process_log_directory(str(log_dir), use_inotify=False, checkpointer=checkpointer)
+
+    state = checkpointer.load()
+    assert state["log"]["path"] == str(gc_log)
+    assert state["log"]["inode"] == os.stat(str(gc_log)).st_ino
+
+
+def test_checkpoint_rereads_interrupted_line(tmpdir):
+    log_dir = tmpdir.mkdir("logs")
+    gc_log = log_dir.join("gc.log")
+    gc_log.write("a\nb\nc\n")
+    checkpointer = Checkpointer(str(tmpdir.join("state.json")), interval_seconds=3600)
+    gc_event_processor = GCEventProcessor("localhost", "1234", None)
+    stat = os.stat(str(gc_log))
+    checkpointer.save({"log": {"path": str(gc_log), "device": stat.st_dev, "inode": stat.st_ino, "offset": 0},
+                       "processor": gc_event_processor.get_state()})
+
+    gc_event_processor._process_line = Mock(side_effect=[None, KeyboardInterrupt])
+    with pytest.raises(KeyboardInterrupt):
+        gc_event_processor.process_log_directory(str(log_dir), use_inotify=False, checkpointer=checkpointer)
+
+    # "a" was processed, "b" was not
+    assert checkpointer.load()["log"]["offset"] == 2
+
+
+def test_aggregate_interval():
+    log_line = "2015-05-26T14:45:37.987-0200: 151.126: [GC (Allocation Failure) 151.126: " \
+               "[DefNew: 629119K->69888K(629120K), 0.0584157 secs] 1619346K->1273247K(2027264K), " \
+               "0.0585007 secs] [Times: user=0.06 sys=0.00, real=0.06 secs]"
+
+    gc_event_processor = GCEventProcessor("localhost", "1234", None, aggregate_interval=3600)
+    gc_event_processor.aggregator.stats = Mock()
+    gc_event_processor._process_line(log_line)
+    gc_event_processor._process_line("2015-05-26T14:45:38.987-0200: next")
+    gc_event_processor.close()
+
+    gc_event_processor.aggregator.stats.gauge.assert_any_call(
+        "garbagedog_gc_event_duration.max", 0.06, tags=['stw:True', 'event_type:DefNew'])
+
+
+def test_self_metrics():
+    log_line = "2015-05-26T14:45:37.987-0200: 151.126: [GC (Allocation Failure) 151.126: " \
+               "[DefNew: 629119K->69888K(629120K), 0.0584157 secs] 1619346K->1273247K(2027264K), " \
+               "0.0585007 secs] [Times: user=0.06 sys=0.00, real=0.06 secs]"
+
+    stats = Mock()
+    gc_event_processor = GCEventProcessor("localhost", "1234", ["app:foo"], stats=stats, self_metrics_interval=3600)
+    gc_event_processor._process_line(log_line)
+    gc_event_processor._process_line(" continued")
+    gc_event_processor._process_line("2015-05-26T14:45:38.987-0200: next")
+    gc_event_processor.close()
+
+    stats.increment.assert_any_call("garbagedog_self_lines", 3, tags=["app:foo"])
+    stats.increment.assert_any_call("garbagedog_self_records", 1, tags=["app:foo"])
+    stats.increment.assert_any_call("garbagedog_self_records_without_times", 0, tags=["app:foo"])
+
+
+def test_stopped_time():
+    stopped_line = "2017-07-27T18:01:22.{:03d}+0000: 1.040: Total time for which application threads were stopped: " \
+                   "0.2000000 seconds, Stopping threads took: 0.0100000 seconds"
+
+    stats = Mock()
+    gc_event_processor = GCEventProcessor("localhost", "1234", ["app:foo"], stats=stats, mmu_interval=3600,
+                                          mmu_windows=[1])
+    gc_event_processor._process_line(stopped_line.format(200))
+    gc_event_processor._process_line(stopped_line.format(600))
+    gc_event_processor._process_line("2017-07-27T18:01:23.000+0000: 1.615: Application time: 0.4 seconds")
+    gc_event_processor.close()
+
+    stats.timing.assert_has_calls([
+        call("garbagedog_app_stopped_time", 0.2, tags=["app:foo"]),
+        call("garbagedog_time_to_safepoint", 0.01, tags=["app:foo"]),
+    ] * 2)
+    stats.gauge.assert_called_once_with("garbagedog_mmu", pytest.approx(0.6), tags=["window:1s", "app:foo"])
+
+
+def test_rates_skip_records_logged_in_the_same_millisecond():
+    log_line = "2012-04-04T19:08:23.{:03d}+0000: 511001.548: [GC 511001.549: [ParNew: {}K->10K(200K), 0.01 secs] " \
+               "1000K->910K(2000K), 0.01 secs] [Times: user=0.01 sys=0.00, real=0.01 secs]"
+
+    stats = Mock()
+    gc_event_processor = GCEventProcessor("localhost", "1234", None, stats=stats)
+    for millisecond, young_begin_k in [(54, 100), (54, 110), (154, 120)]:
+        gc_event_processor._process_line(log_line.format(millisecond, young_begin_k))
+    gc_event_processor._process_line("2012-04-04T19:08:24.000+0000: next")
+
+    # Only the 100ms from the second record to the third, in which 110K was allocated
+    allocation_rates = [args[1] for args, _ in stats.histogram.call_args_list
+                        if args[0] == "garbagedog_allocation_rate_histogram"]
+    assert allocation_rates == [pytest.approx(1100, rel=1e-3)]
+    assert gc_event_processor.last_sized_event.young_begin_k == 120
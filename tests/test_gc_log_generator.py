@@ -0,0 +1,39 @@
+from benchmarks.gc_log_generator import generate_gc_log, generate_unified_gc_log
+from garbagedog.constants import GCEventType
+from garbagedog.parser import parse_record
+from garbagedog.unified import UnifiedLogParser
+
+from .test_parser import assert_same_parse, classifier_records, regex_records
+
+
+def unified_records(lines):
+    log_parser = UnifiedLogParser()
+    records = [log_parser.add_line(line.rstrip()) for line in lines]
+    return [log_parser.parse(record) for record in records if record]
+
+
+def test_every_event_type():
+    records = [parse_record(record) for record in classifier_records(generate_gc_log(11))]
+    event_types = {record.event_type for record in records if record and record.event_type}
+    records = unified_records(generate_unified_gc_log(4))
+    unified_event_types = {record.event_type for record in records if record and record.event_type}
+
+    # G1 is only logged in detail through unified logging
+    assert event_types == {event_type for event_type in GCEventType if not event_type.name.startswith("G1_")}
+    assert unified_event_types == {GCEventType.G1_YOUNG, GCEventType.G1_MIXED, GCEventType.G1_REMARK,
+                                   GCEventType.G1_CLEANUP, GCEventType.G1_CONCURRENT_CYCLE, GCEventType.FULL_GC}
+
+
+def test_deterministic():
+    assert generate_gc_log(200, seed=7) == generate_gc_log(200, seed=7)
+    assert generate_gc_log(200, seed=7) != generate_gc_log(200, seed=8)
+    assert generate_unified_gc_log(200, seed=7) == generate_unified_gc_log(200, seed=7)
+
+
+def test_records_match_regex_cascade():
+    lines = generate_gc_log(300, seed=3)
+    records = classifier_records(lines)
+
+    assert records == regex_records(lines)
+    for record in records:
+        assert_same_parse(record)
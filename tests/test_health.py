@@ -0,0 +1,154 @@
+import pytest
+from mock import Mock
+
+from garbagedog.constants import GCEventType
+from garbagedog.event_processor import GCEventProcessor
+from garbagedog.health import DEFAULT_THRESHOLDS, HealthMonitor, parse_thresholds
+from garbagedog.parser import GCEvent, GENERATION_MAJOR, GENERATION_MINOR, GENERATION_NONE
+
+FULL_GC = "2017-07-27T18:{:02d}:{:06.3f}+0000: 6.127: [Full GC (Allocation Failure) 6.127: " \
+          "[CMS: 90000K->70000K(174784K), 0.0952091 secs] 128935K->70000K(253440K), " \
+          "[Metaspace: 21032K->21032K(1069056K)], 0.0953022 secs] [Times: user=0.09 sys=0.00, real=0.10 secs]\n"
+PAR_NEW = "2017-07-27T18:{:02d}:{:06.3f}+0000: 2.346: [GC (Allocation Failure) 2.346: " \
+          "[ParNew: 76034K->8704K(78656K), 0.0312710 secs] {}K->40000K(253440K), 0.0313630 secs] " \
+          "[Times: user=0.09 sys=0.01, real=0.03 secs]\n"
+
+
+def pause(timestamp, duration, event_type=GCEventType.PAR_NEW):
+    return GCEvent(timestamp, event_type, duration, GENERATION_MINOR, None, None, None, None, None, None, None, None)
+
+
+def full_gc(timestamp):
+    # JDK 8 full GC records end with the metaspace sizes, which must not be taken for the old gen
+    return GCEvent(timestamp, GCEventType.FULL_GC, 0.1, GENERATION_MAJOR, None, None, 128935, 70000, 253440, 21032,
+                   21032, 1069056)
+
+
+def young_gc(timestamp, old_gen_k, old_gen_capacity_k=174784):
+    return GCEvent(timestamp, GCEventType.PAR_NEW, 0.01, GENERATION_MINOR, None, None, 76034, 8704, 78656,
+                   76034 + old_gen_k, 8704 + old_gen_k, 78656 + old_gen_capacity_k)
+
+
+def sent_gauges(stats):
+    return {gauge_call[0][0]: gauge_call[0][1] for gauge_call in stats.gauge.call_args_list}
+
+
+def sent_events(stats):
+    return [(event_call[1]["aggregation_key"], event_call[1]["alert_type"])
+            for event_call in stats.event.call_args_list]
+
+
+def test_gc_fraction():
+    stats = Mock()
+    monitor = HealthMonitor(stats, thresholds=DEFAULT_THRESHOLDS._replace(gc_fraction=0.15), tags=["app:foo"])
+    # A 100ms pause every second, for 20 minutes
+    for second in range(1200):
+        monitor.add_record(pause(1000.0 + second, 0.1))
+    monitor.add_record(GCEvent(2200.0, GCEventType.CMS_CONCURRENT_MARK, 5.0, GENERATION_NONE, None, None, None, None,
+                               None, None, None, None))
+    monitor.flush()
+
+    gauges = sent_gauges(stats)
+    assert gauges["garbagedog_gc_time_fraction"] == pytest.approx(0.1, rel=0.05)
+    assert gauges["garbagedog_pause_time_ewma"] == pytest.approx(0.1)
+    assert "garbagedog_old_gen_after_major_gc" not in gauges
+    stats.gauge.assert_any_call("garbagedog_gc_time_fraction", gauges["garbagedog_gc_time_fraction"],
+                                tags=["app:foo"])
+    assert not stats.event.called
+
+    # Pauses doubling to 200ms take it over the threshold
+    for second in range(1200, 1800):
+        monitor.add_record(pause(1000.0 + second, 0.2))
+    assert monitor.gc_fraction == pytest.approx(0.2, rel=0.1)
+    assert sent_events(stats) == [("garbagedog_gc_fraction", "warning")]
+
+
+def test_gc_fraction_waits_for_a_whole_time_constant():
+    stats = Mock()
+    monitor = HealthMonitor(stats, gc_fraction_seconds=300)
+    monitor.add_record(pause(1000.0, 0.1))
+    monitor.add_record(pause(1001.0, 2.0))
+    assert monitor.gc_fraction == 1.0
+    assert not stats.event.called
+
+
+def test_old_gen_trend():
+    stats = Mock()
+    monitor = HealthMonitor(stats, tags=["app:foo"])
+    for index in range(20):
+        monitor.add_record(full_gc(1000.0 + 600 * index))
+        # Only the young collection right after a major one is measured
+        monitor.add_record(young_gc(1010.0 + 600 * index, 50000 + 1200 * index))
+        monitor.add_record(young_gc(1100.0 + 600 * index, 150000))
+    monitor.flush()
+
+    gauges = sent_gauges(stats)
+    assert gauges["garbagedog_old_gen_after_major_gc"] == 50000 + 1200 * 19
+    assert gauges["garbagedog_old_gen_growth_rate"] == pytest.approx(2.0)
+    assert gauges["garbagedog_old_gen_seconds_to_full"] == pytest.approx((174784 - 72800) / 2.0)
+    assert not stats.event.called
+
+
+def test_old_gen_alerts():
+    stats = Mock()
+    monitor = HealthMonitor(stats, thresholds=DEFAULT_THRESHOLDS._replace(seconds_to_full=7200, alert_interval=3600))
+    for index in range(4):
+        monitor.add_record(full_gc(1000.0 + 600 * index))
+        monitor.add_record(young_gc(1010.0 + 600 * index, 100000 + 15000 * index))
+    # The CMS sweep ending counts as a major collection too
+    monitor.add_record(GCEvent(3500.0, GCEventType.CMS_CONCURRENT_SWEEP, 0.5, GENERATION_NONE, None, None, None, None,
+                               None, None, None, None))
+    monitor.add_record(young_gc(3510.0, 170000))
+
+    assert monitor.old_gen_k == 170000
+    assert sent_events(stats) == [("garbagedog_seconds_to_full", "warning"), ("garbagedog_old_gen_fraction", "warning")]
+    event_call = stats.event.call_args_list[1]
+    assert event_call[0][0] == "garbagedog: Old gen 97% full after a major GC"
+    assert event_call[1]["date_happened"] == 3510
+
+
+def test_back_to_back_full_gcs():
+    stats = Mock()
+    monitor = HealthMonitor(stats, thresholds=DEFAULT_THRESHOLDS._replace(alert_interval=100))
+    for timestamp in [1000.0, 1100.0, 1130.0, 1160.0, 1190.0, 1220.0, 1250.0, 1280.0, 1400.0, 1430.0]:
+        monitor.add_record(full_gc(timestamp))
+    assert monitor.full_gcs_in_a_row == 2
+    # At the third in a row, and again once `alert_interval` has passed
+    assert [event_call[1]["date_happened"] for event_call in stats.event.call_args_list] == [1160, 1280]
+    assert sent_events(stats) == [("garbagedog_back_to_back_full_gcs", "error")] * 2
+
+
+def test_promotion_failure():
+    stats = Mock()
+    monitor = HealthMonitor(stats, tags=["app:foo"])
+    monitor.add_record(pause(1000.0, 0.5, GCEventType.PROMOTION_FAILED))
+    monitor.add_record(pause(1060.0, 0.5, GCEventType.CONCURRENT_MODE_FAILURE))
+    monitor.add_record(pause(1700.0, 0.5, GCEventType.CONCURRENT_MODE_FAILURE))
+    assert sent_events(stats) == [("garbagedog_promotion_failure", "error")] * 2
+    assert stats.event.call_args_list[0][1]["tags"] == ["app:foo"]
+
+
+def test_parse_thresholds():
+    assert parse_thresholds("") == DEFAULT_THRESHOLDS
+    thresholds = parse_thresholds("gc_fraction=0.05, back_to_back_full_gcs=5")
+    assert thresholds == DEFAULT_THRESHOLDS._replace(gc_fraction=0.05, back_to_back_full_gcs=5)
+    assert isinstance(thresholds.back_to_back_full_gcs, int)
+
+    for spec in ["gc_fraction", "gc_overhead=0.05", "back_to_back_full_gcs=many"]:
+        with pytest.raises(ValueError):
+            parse_thresholds(spec)
+
+
+def test_processor_sends_health():
+    stats = Mock()
+    gc_event_processor = GCEventProcessor("localhost", "1234", ["app:foo"], stats=stats, health_interval=3600)
+    for second in range(3):
+        gc_event_processor._process_line(FULL_GC.format(1, 10.0 * second))
+    gc_event_processor._process_line(PAR_NEW.format(1, 40.0, 106034))
+    # Which is only processed once the next record starts
+    gc_event_processor._process_line(PAR_NEW.format(1, 50.0, 116034))
+    gc_event_processor.close()
+
+    assert sent_events(stats) == [("garbagedog_back_to_back_full_gcs", "error")]
+    assert stats.event.call_args[1]["tags"] == ["app:foo"]
+    stats.gauge.assert_any_call("garbagedog_old_gen_after_major_gc", 106034 - 76034, tags=["app:foo"])
@@ -0,0 +1,25 @@
+import os
+import pytest
+
+from garbagedog.inotify import InotifyWatcher, inotify_available, IN_CREATE, IN_MODIFY
+
+pytestmark = pytest.mark.skipif(not inotify_available(), reason="inotify not available")
+
+
+def test_watcher_reports_create_and_modify(tmpdir):
+    with InotifyWatcher(str(tmpdir)) as watcher:
+        gc_log = tmpdir.join("gc.log.0")
+        gc_log.write("")
+        gc_log.write("foo", mode="a")
+
+        events = watcher.wait(1)
+        assert (IN_CREATE, "gc.log.0") in [(mask & IN_CREATE, name) for mask, name in events]
+        assert any(mask & IN_MODIFY for mask, _ in events)
+
+def test_watcher_times_out(tmpdir):
+    with InotifyWatcher(str(tmpdir)) as watcher:
+        assert watcher.wait(0.01) == []
+
+def test_watcher_missing_directory(tmpdir):
+    with pytest.raises(OSError):
+        InotifyWatcher(os.path.join(str(tmpdir), "missing"))
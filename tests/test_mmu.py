@@ -0,0 +1,85 @@
+import random
+
+import pytest
+from mock import Mock
+
+from garbagedog.mmu import MMUTracker
+
+
+def random_pauses(rng, count):
+    pauses = []
+    end = 1000.0
+    for _ in range(count):
+        end += rng.expovariate(5) + rng.uniform(0.001, 0.3)
+        pauses.append((end, min(rng.expovariate(20), end - (pauses[-1][0] if pauses else 0))))
+    return pauses
+
+
+def brute_force_mmu(pauses, window, window_ends):
+    utilizations = []
+    for window_end in window_ends:
+        window_start = window_end - window
+        paused = sum(max(0.0, min(end, window_end) - max(end - duration, window_start)) for end, duration in pauses)
+        utilizations.append(1 - paused / window)
+    return max(0.0, min(utilizations))
+
+
+def sent_mmu(stats):
+    return {gauge_call[1]["tags"][0]: gauge_call[0][1] for gauge_call in stats.gauge.call_args_list}
+
+
+def test_matches_brute_force():
+    rng = random.Random(7)
+    pauses = random_pauses(rng, 100)
+    stats = Mock()
+    tracker = MMUTracker(stats, windows=(0.1, 1, 10))
+    for end, duration in pauses:
+        tracker.add_pause(end, duration)
+    tracker.flush()
+
+    sent = sent_mmu(stats)
+    last_end = pauses[-1][0]
+    for window, tag in [(0.1, "window:0.1s"), (1, "window:1s"), (10, "window:10s")]:
+        assert sent[tag] == pytest.approx(brute_force_mmu(pauses, window, [end for end, _ in pauses]))
+        # No window ending anywhere else is less utilized
+        grid = [pauses[0][0] + i * 0.02 for i in range(int((last_end - pauses[0][0]) / 0.02))]
+        assert sent[tag] <= brute_force_mmu(pauses, window, grid) + 1e-9
+
+
+def test_flush_covers_pauses_since_last_flush():
+    stats = Mock()
+    tracker = MMUTracker(stats, windows=(1,), tags=["app:foo"])
+    tracker.add_pause(100.0, 0.5)
+    tracker.flush()
+    stats.gauge.assert_called_once_with("garbagedog_mmu", 0.5, tags=["window:1s", "app:foo"])
+
+    stats.reset_mock()
+    tracker.flush()
+    assert not stats.gauge.called
+
+    # The earlier pause is still within a second of this one
+    tracker.add_pause(100.6, 0.1)
+    tracker.flush()
+    stats.gauge.assert_called_once_with("garbagedog_mmu", pytest.approx(0.5), tags=["window:1s", "app:foo"])
+
+
+def test_pause_longer_than_window():
+    stats = Mock()
+    tracker = MMUTracker(stats, windows=(1,))
+    tracker.add_pause(100.0, 2.5)
+    tracker.flush()
+    stats.gauge.assert_called_once_with("garbagedog_mmu", 0.0, tags=["window:1s"])
+
+
+def test_bounded_memory():
+    rng = random.Random(7)
+    pauses = random_pauses(rng, 1000)
+    stats = Mock()
+    tracker = MMUTracker(stats, windows=(60,), max_pauses=32)
+    for end, duration in pauses:
+        tracker.add_pause(end, duration)
+    tracker.flush()
+
+    assert len(tracker.windows[0]._pauses) <= 32
+    exact = brute_force_mmu(pauses, 60, [end for end, _ in pauses])
+    assert sent_mmu(stats)["window:60s"] == pytest.approx(exact, abs=0.01)
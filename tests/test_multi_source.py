@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from mock import Mock, patch
+
+from garbagedog.multi_source import MultiSourceMonitor, SourceConfig, load_source_file, parse_source_spec
+from garbagedog.utils import GCLogHandler
+
+PAR_NEW_LINE = "2017-07-27T18:01:23.731+0000: 2.346: [GC (Allocation Failure) 2017-07-27T18:01:23.731+0000: 2.346: " \
+               "[ParNew: 76034K->8704K(78656K), 0.0312710 secs] 76034K->19240K(253440K), 0.0313630 secs] " \
+               "[Times: user=0.09 sys=0.01, real=0.03 secs]\n"
+NEXT_LINE = "2017-07-27T18:01:24.000+0000: 2.615: Application time: 0.2 seconds\n"
+
+
+def test_parse_source_spec():
+    assert parse_source_spec("dir=/var/log/app1,tags=app:foo, env:prod") == \
+        SourceConfig(log_dir="/var/log/app1", glob_pattern="gc.log*", tags=["app:foo", "env:prod"])
+    assert parse_source_spec("dir=/var/log/app2,glob=gc*.log", "x") == \
+        SourceConfig(log_dir="/var/log/app2", glob_pattern="gc*.log", tags=[])
+
+@pytest.mark.parametrize("spec", ["tags=app:foo", "dir=/a,dir=/b", "dir=/a,colour=red", "dir=/a,glob=x,y"])
+def test_parse_source_spec_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_source_spec(spec)
+
+def test_load_source_file(tmpdir):
+    source_file = tmpdir.join("sources")
+    source_file.write("# app servers\ndir=/var/log/app1,tags=app:foo\n\ndir=/var/log/app2\n")
+
+    assert [source.log_dir for source in load_source_file(str(source_file))] == ["/var/log/app1", "/var/log/app2"]
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_monitor_sources_share_emitter(tmpdir, use_inotify):
+    sources = []
+    for name in ["app1", "app2"]:
+        tmpdir.mkdir(name).join("gc.log").write("")
+        sources.append(parse_source_spec("dir={},tags=app:{}".format(tmpdir.join(name), name)))
+
+    monitor = MultiSourceMonitor(sources, "localhost", 1234, ["dc:test"], use_inotify=use_inotify, sleep_seconds=0)
+    monitor.stats = Mock()
+    for processor in monitor.processors:
+        processor.stats = monitor.stats
+
+    async def write_logs():
+        await asyncio.sleep(0.1)
+        for name in ["app1", "app2"]:
+            tmpdir.join(name).join("gc.log").write(PAR_NEW_LINE + NEXT_LINE, mode="a")
+        for _ in range(100):
+            if monitor.stats.timing.call_count == 2:
+                return
+            await asyncio.sleep(0.05)
+
+    async def run():
+        monitors = [asyncio.ensure_future(monitor.monitor_source(source, processor))
+                    for source, processor in zip(monitor.sources, monitor.processors)]
+        await write_logs()
+        for future in monitors:
+            future.cancel()
+        await asyncio.gather(*monitors, return_exceptions=True)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
+
+    tag_sets = sorted(timing_call[1]["tags"] for timing_call in monitor.stats.timing.call_args_list)
+    assert tag_sets == [["stw:True", "event_type:ParNew", "app:app1"], ["stw:True", "event_type:ParNew", "app:app2"]]
+
+def test_run_closes_sources_when_interrupted(tmpdir):
+    sources = []
+    for name in ["app1", "app2"]:
+        tmpdir.mkdir(name).join("gc.log").write("")
+        sources.append(parse_source_spec("dir={}".format(tmpdir.join(name))))
+    monitor = MultiSourceMonitor(sources, "localhost", 1234, None, use_inotify=False, sleep_seconds=0)
+
+    waits = []
+
+    async def wait_for_changes(log_handler):
+        waits.append(log_handler)
+        if len(waits) == 2:
+            raise KeyboardInterrupt
+        await asyncio.sleep(0.01)
+
+    monitor._wait_for_changes = wait_for_changes
+    with patch.object(GCLogHandler, "_close_log", autospec=True, side_effect=GCLogHandler._close_log) as close_log:
+        with pytest.raises(KeyboardInterrupt):
+            monitor.run()
+
+    assert {close_call[0][0] for close_call in close_log.call_args_list} >= set(waits)
+    assert len(set(waits)) == 2
+
+def test_sources_share_prometheus_exporter(tmpdir):
+    sources = [SourceConfig(log_dir=str(tmpdir), glob_pattern="gc.log*", tags=["app:{}".format(name)])
+               for name in ["app1", "app2"]]
+    with patch("garbagedog.multi_source.PrometheusExporter") as exporter_class:
+        monitor = MultiSourceMonitor(sources, "localhost", 1234, ["dc:test"], prometheus_port=9100)
+        exporter = exporter_class.return_value
+        exporter.start.assert_called_once_with()
+        assert exporter_class.call_args[1] == {"constant_tags": ["dc:test"]}
+        assert [processor.stats for processor in monitor.processors] == [exporter, exporter]
+        assert [processor.prometheus for processor in monitor.processors] == [None, None]
+
+        monitor.close()
+        exporter.stop.assert_called_once_with()
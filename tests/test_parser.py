@@ -0,0 +1,199 @@
+import os
+import pytest
+import random
+from datetime import datetime
+
+from garbagedog.constants import ABSOLUTE_TIME_REGEX, RELATIVE_TIME_REGEX, CONFLATED_RELATIVE_REGEX, \
+    CONFLATED_ABSOLUTE_REGEX, GCEventType, GCSizeInfo, SIZE_REGEX, THREE_ARROWS_REGEX, TIMEFORMAT, TIMES_REGEX
+from garbagedog.parser import classify_line, parse_record, RecordAssembler, RECORD_START, CONFLATED, CONTINUATION, \
+    GENERATION_NONE, GENERATION_MINOR, GENERATION_MAJOR, DEFAULT_MAX_RECORD_LENGTH
+from garbagedog.utils import parse_line_for_sizes
+
+GOLDEN_LOG = os.path.join(os.path.dirname(__file__), "data", "jdk8_golden.log")
+
+
+def regex_records(lines):
+    """The regex cascade GCEventProcessor._process_line used before the single pass classifier"""
+    records = []
+    previous_record = ""
+    for line in lines:
+        stripped_line = line.rstrip()
+        conflated_relative = CONFLATED_RELATIVE_REGEX.match(stripped_line)
+        conflated_absolute = CONFLATED_ABSOLUTE_REGEX.match(stripped_line)
+        if ABSOLUTE_TIME_REGEX.match(stripped_line) or RELATIVE_TIME_REGEX.match(stripped_line):
+            records.append(previous_record)
+            previous_record = stripped_line
+        elif conflated_relative:
+            records.append(previous_record + conflated_relative.group(1))
+            previous_record = conflated_relative.group(2)
+        elif conflated_absolute:
+            records.append(previous_record + conflated_absolute.group(1))
+            previous_record = conflated_absolute.group(2)
+        else:
+            previous_record = previous_record + " " + stripped_line
+    return records
+
+
+def classifier_records(lines):
+    records = []
+    previous_record = ""
+    for line in lines:
+        stripped_line = line.rstrip()
+        line_class, split = classify_line(stripped_line)
+        if line_class == RECORD_START:
+            records.append(previous_record)
+            previous_record = stripped_line
+        elif line_class == CONFLATED:
+            records.append(previous_record + stripped_line[:split])
+            previous_record = stripped_line[split:]
+        else:
+            previous_record = previous_record + " " + stripped_line
+    return records
+
+
+def regex_times(record):
+    """The regex parse_line_for_times ran before it wrapped parse_record"""
+    time_match = TIMES_REGEX.match(record)
+    if time_match:
+        return GCEventType.from_gc_line(record), float(time_match.group(1))
+    return None
+
+
+def regex_sizes(record):
+    """The regex parse_line_for_sizes ran before it wrapped parse_record"""
+    size_match = SIZE_REGEX.match(record)
+    if size_match and not THREE_ARROWS_REGEX.match(record):
+        return datetime.strptime(size_match.group(1), TIMEFORMAT), GCSizeInfo(*[int(size) for size in size_match.groups()[2:]])
+    return None
+
+
+def regex_generation(record):
+    if not ABSOLUTE_TIME_REGEX.match(record):
+        return GENERATION_NONE
+    if GCEventType.CMS_INITIAL_MARK.gc_text in record or GCEventType.FULL_GC.gc_text in record:
+        return GENERATION_MAJOR
+    if GCEventType.PAR_NEW.gc_text in record or GCEventType.PS_YOUNG_GEN.gc_text in record:
+        return GENERATION_MINOR
+    return GENERATION_NONE
+
+
+def assert_same_parse(record):
+    time_info = regex_times(record)
+    time_match = ABSOLUTE_TIME_REGEX.match(record)
+    try:
+        time_and_size_info = regex_sizes(record)
+        expected_timestamp = datetime.strptime(time_match.group(1), TIMEFORMAT).timestamp() if time_match else None
+    except ValueError:
+        # Spliced lines can produce impossible dates, which both parsers must reject
+        with pytest.raises(ValueError):
+            parse_record(record)
+        return
+    parsed = parse_record(record)
+
+    if not (time_info or time_match):
+        assert parsed is None, record
+        return
+    assert parsed.timestamp == expected_timestamp, record
+    assert (parsed.event_type, parsed.duration) == (time_info or (None, None)), record
+    assert parsed.size_info == (time_and_size_info[1] if time_and_size_info else None), record
+    assert parsed.generation == regex_generation(record), record
+    if time_and_size_info:
+        assert parse_line_for_sizes(record) == time_and_size_info, record
+
+
+def golden_lines():
+    with open(GOLDEN_LOG) as f:
+        return f.readlines()
+
+
+def test_golden_records_match_regex_cascade():
+    lines = golden_lines()
+    records = classifier_records(lines)
+
+    assert records == regex_records(lines)
+    assert len([record for record in records if parse_line_for_sizes(record)]) >= 10
+    for record in records:
+        assert_same_parse(record)
+
+
+def test_mangled_lines_match_regex_cascade():
+    # Splice golden lines at random points, the way interleaved JVM output conflates them
+    lines = [line.rstrip() for line in golden_lines()]
+    rng = random.Random(1234)
+    mangled = []
+    for _ in range(2000):
+        first, second = rng.choice(lines), rng.choice(lines)
+        mangled.append(first[:rng.randint(0, len(first))] + second[rng.randint(0, len(second)):])
+
+    records = classifier_records(mangled)
+    assert records == regex_records(mangled)
+    for record in records:
+        assert_same_parse(record)
+
+
+def test_classify_line():
+    assert classify_line("2017-07-27T18:01:22.406+0000: 1.021: Application time") == (RECORD_START, 0)
+    assert classify_line("12.345: [GC") == (RECORD_START, 0)
+    assert classify_line("[Times: user=0.00 sys=0.00, real=0.00 secs]14.001: [CMS") == (CONFLATED, 43)
+    assert classify_line("[ParNew2017-07-27T18:01:31.005+0000: 9.620:") == (CONFLATED, 7)
+    assert classify_line("- age   1:    6171496 bytes,    6171496 total") == (CONTINUATION, 0)
+    assert classify_line("") == (CONTINUATION, 0)
+
+
+def test_parse_record_no_match():
+    assert parse_record("Desired survivor size 4456448 bytes") is None
+
+
+def assembler_records(lines, max_record_length=DEFAULT_MAX_RECORD_LENGTH):
+    assembler = RecordAssembler(max_record_length)
+    records = [assembler.add_line(line.rstrip()) for line in lines]
+    return [record for record in records if record is not None], assembler
+
+
+def test_assembler_parses_like_concatenation():
+    lines = golden_lines()
+    records, assembler = assembler_records(lines)
+
+    assert [parse_record(record) for record in records] == [parse_record(record) for record in classifier_records(lines)]
+    assert assembler.truncated_records == 0
+
+
+def test_assembler_skips_heap_dumps():
+    lines = golden_lines()
+    records, _ = assembler_records(lines)
+
+    for skipped in ["Heap before", "Heap after", "eden space", "- age"]:
+        assert not [record for record in records if skipped in record]
+    assert "[ParNew : 69952K->6082K(78656K)" in records[2]
+    assert records[2].endswith("real=0.02 secs]")
+
+
+def test_assembler_truncates_long_records():
+    lines = ["2017-07-27T18:01:22.406+0000: 1.021: [GC"] + ["x" * 100] * 50 + ["2017-07-27T18:01:23.406+0000: 2.021: [GC"]
+    records, assembler = assembler_records(lines, max_record_length=1000)
+
+    assert records == [""]
+    assert assembler.truncated_records == 1
+    assert assembler.pending() == "2017-07-27T18:01:23.406+0000: 2.021: [GC"
+
+
+def test_assembler_reset():
+    assembler = RecordAssembler()
+    assembler.add_line("{Heap before GC invocations=0 (full 0):")
+    assembler.reset("2017-07-27T18:01:22.406+0000: 1.021: [GC")
+    assembler.add_line("[Times: user=0.04 sys=0.01, real=0.02 secs]")
+
+    assert assembler.pending() == "2017-07-27T18:01:22.406+0000: 1.021: [GC [Times: user=0.04 sys=0.01, real=0.02 secs]"
+
+
+def test_parse_record_stopped_time():
+    parsed = parse_record("2017-07-27T18:01:22.425+0000: 1.040: Total time for which application threads were "
+                          "stopped: 0.0151620 seconds, Stopping threads took: 0.0000358 seconds")
+    assert (parsed.stopped_time, parsed.safepoint_time, parsed.duration) == (0.015162, 0.0000358, None)
+
+    parsed = parse_record("2017-07-27T18:01:22.425+0000: 1.040: Total time for which application threads were "
+                          "stopped: 0.0151620 seconds")
+    assert (parsed.stopped_time, parsed.safepoint_time) == (0.015162, None)
+
+    parsed = parse_record("2017-07-27T18:01:22.425+0000: 1.040: Application time: 0.4512 seconds")
+    assert parsed.stopped_time is None
@@ -0,0 +1,74 @@
+import os
+import queue
+
+import pytest
+from mock import Mock
+
+from garbagedog.event_processor import GCEventProcessor
+from garbagedog.pipeline import DROP, Pipeline, QueueingEmitter
+
+GOLDEN_LOG = os.path.join(os.path.dirname(__file__), "data", "jdk8_golden.log")
+
+
+def _sent_calls(stats):
+    return [(name, args, kwargs) for name, args, kwargs in stats.mock_calls
+            if not args[0].startswith("garbagedog_pipeline")]
+
+
+def test_pipeline_matches_inline_processing():
+    with open(GOLDEN_LOG) as f:
+        lines = f.readlines()
+
+    inline_processor = GCEventProcessor("localhost", "1234", None, stats=Mock())
+    for line in lines:
+        inline_processor._process_line(line)
+
+    stats = Mock()
+    pipelined_processor = GCEventProcessor("localhost", "1234", None, stats=stats)
+    Pipeline(stats, queue_size=16).run(lines, pipelined_processor)
+
+    assert inline_processor.stats.mock_calls
+    assert _sent_calls(stats) == inline_processor.stats.mock_calls
+    assert pipelined_processor.stats is stats
+
+
+def test_drop_policy_counts_dropped_metrics():
+    emitter = QueueingEmitter(queue.Queue(maxsize=2), policy=DROP)
+    for i in range(5):
+        emitter.histogram("garbagedog_allocation_rate_histogram", i)
+
+    assert emitter.metric_queue.qsize() == 2
+    assert emitter.dropped == 3
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        QueueingEmitter(queue.Queue(), policy="sometimes")
+
+
+def test_interrupt_flushes_queued_metrics():
+    stats = Mock()
+    processor = Mock()
+
+    def process_line(line):
+        if line == "stop":
+            raise KeyboardInterrupt()
+        processor.stats.timing("garbagedog_gc_event_duration", float(line))
+    processor._process_line.side_effect = process_line
+
+    pipeline = Pipeline(stats, queue_size=100)
+    with pytest.raises(KeyboardInterrupt):
+        pipeline.run(["1", "2", "3", "stop", "4"], processor)
+
+    assert [timing_call[0][1] for timing_call in stats.timing.call_args_list] == [1.0, 2.0, 3.0]
+    stats.gauge.assert_any_call("garbagedog_pipeline_queue_depth", 0, tags=["queue:metrics"])
+    assert processor.stats is not pipeline.emitter
+
+
+def test_reader_error_is_raised():
+    def lines():
+        yield "1"
+        raise IOError("log went away")
+
+    with pytest.raises(IOError):
+        Pipeline(Mock(), queue_size=10).run(lines(), Mock())
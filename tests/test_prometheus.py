@@ -0,0 +1,128 @@
+import random
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import mock
+import pytest
+from mock import call, Mock
+
+from garbagedog.event_processor import GCEventProcessor
+from garbagedog.prometheus import CONTENT_TYPE, PrometheusExporter, RollingHistogram
+
+
+class FakeClock(object):
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def series(text):
+    values = {}
+    for line in text.splitlines():
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            values[name] = float(value)
+    return values
+
+
+def test_rolling_histogram_matches_brute_force():
+    rng = random.Random(3)
+    histogram = RollingHistogram((0.01, 0.1, 1), bucket_seconds=10, buckets=90)
+    samples = []
+    now = 0.0
+    for _ in range(2000):
+        now += rng.expovariate(1)
+        value = rng.expovariate(10)
+        histogram.add(value, now)
+        samples.append((now, value))
+
+    windows = histogram.windows([6, 30, 90], now)
+    for span, (cumulative, total) in zip([6, 30, 90], windows):
+        # Whole time buckets, counting back from the current one
+        start = (int(now // 10) - span + 1) * 10
+        in_window = [value for time, value in samples if time >= start]
+        assert cumulative == [len([value for value in in_window if value <= bound]) for bound in (0.01, 0.1, 1)] + \
+            [len(in_window)]
+        assert total == pytest.approx(sum(in_window))
+
+
+def test_rolling_histogram_forgets_old_buckets():
+    histogram = RollingHistogram((1,), bucket_seconds=10, buckets=6)
+    histogram.add(0.5, 5)
+    histogram.add(2, 15)
+    assert histogram.windows([1, 6], 15) == [([0, 1], 2), ([1, 2], 2.5)]
+
+    # 60 seconds on, the ring has come round to the first bucket again
+    histogram.add(0.5, 65)
+    assert histogram.windows([1, 6], 65) == [([1, 1], 0.5), ([1, 2], 2.5)]
+    assert histogram.windows([6], 200) == [([0, 0], 0)]
+
+
+def test_passes_calls_through():
+    stats = Mock()
+    exporter = PrometheusExporter(stats, 0, clock=FakeClock())
+    exporter.timing("garbagedog_gc_event_duration", 0.02, tags=["stw:True"])
+    exporter.histogram("garbagedog_allocation_rate_histogram", 5000.0)
+    exporter.gauge("garbagedog_mmu", 0.5, tags=["window:1s"])
+
+    stats.timing.assert_called_once_with("garbagedog_gc_event_duration", 0.02, tags=["stw:True"], sample_rate=1)
+    stats.histogram.assert_called_once_with("garbagedog_allocation_rate_histogram", 5000.0, tags=None, sample_rate=1)
+    stats.gauge.assert_called_once_with("garbagedog_mmu", 0.5, tags=["window:1s"])
+    assert "garbagedog_mmu" not in exporter.render()
+
+
+def test_render():
+    clock = FakeClock()
+    exporter = PrometheusExporter(Mock(), 0, constant_tags=["dc:us-west", "canary"], clock=clock)
+    tags = ["stw:True", "event_type:ParNew", "app.name:a\"b"]
+    exporter.timing("garbagedog_gc_event_duration", 0.02, tags=tags)
+    clock.now += 120
+    exporter.timing("garbagedog_gc_event_duration", 0.2, tags=tags)
+    exporter.timing("garbagedog_gc_event_duration", 20, tags=tags)
+
+    text = exporter.render()
+    assert text.count("# TYPE garbagedog_gc_event_duration histogram") == 1
+    values = series(text)
+    labels = 'app_name="a\\"b",dc="us-west",event_type="ParNew",stw="True",window="{}"'
+    assert values['garbagedog_gc_event_duration_bucket{' + labels.format("1m") + ',le="0.025"}'] == 0
+    assert values['garbagedog_gc_event_duration_bucket{' + labels.format("1m") + ',le="0.25"}'] == 1
+    assert values['garbagedog_gc_event_duration_bucket{' + labels.format("1m") + ',le="+Inf"}'] == 2
+    assert values['garbagedog_gc_event_duration_count{' + labels.format("1m") + '}'] == 2
+    assert values['garbagedog_gc_event_duration_sum{' + labels.format("1m") + '}'] == pytest.approx(20.2)
+    assert values['garbagedog_gc_event_duration_bucket{' + labels.format("5m") + ',le="0.025"}'] == 1
+    assert values['garbagedog_gc_event_duration_count{' + labels.format("15m") + '}'] == 3
+
+    clock.now += 900
+    assert series(exporter.render())['garbagedog_gc_event_duration_count{' + labels.format("15m") + '}'] == 0
+
+
+def test_serves_metrics():
+    exporter = PrometheusExporter(Mock(), 0, host="127.0.0.1")
+    exporter.histogram("garbagedog_time_between_young_gc", 3.0)
+    exporter.start()
+    try:
+        url = "http://127.0.0.1:{}".format(exporter.port)
+        with urlopen(url + "/metrics") as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            body = response.read().decode("utf-8")
+        assert 'garbagedog_time_between_young_gc_bucket{window="1m",le="5.0"} 1' in body.splitlines()
+
+        with pytest.raises(HTTPError) as error:
+            urlopen(url + "/other")
+        assert error.value.code == 404
+    finally:
+        exporter.stop()
+
+
+def test_processor_serves_prometheus():
+    with mock.patch("garbagedog.event_processor.PrometheusExporter") as exporter_class:
+        gc_event_processor = GCEventProcessor("localhost", "1234", ["app:foo"], prometheus_port=9100)
+        exporter = exporter_class.return_value
+        assert exporter_class.call_args == call(mock.ANY, 9100, constant_tags=["app:foo"])
+        exporter.start.assert_called_once_with()
+        assert gc_event_processor.stats is exporter
+
+        gc_event_processor.close()
+        exporter.stop.assert_called_once_with()
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+from collections import defaultdict
+
+import pytest
+from mock import Mock
+
+from benchmarks.gc_log_generator import generate_gc_log, generate_unified_gc_log
+from garbagedog.backfill import backfill
+from garbagedog.event_processor import GCEventProcessor
+
+numpy = pytest.importorskip("numpy")
+
+from garbagedog.report import compute_series, load_columns, summarize, write_report  # noqa: E402
+
+FULL_GC = "2017-07-27T18:01:{:06.3f}+0000: 6.127: [Full GC (Allocation Failure) 6.127: [CMS: {}K->{}K(174784K), " \
+          "0.0952091 secs] 128935K->{}K(253440K), [Metaspace: 21032K->21032K(1069056K)], 0.0953022 secs] " \
+          "[Times: user=0.09 sys=0.00, real=0.10 secs]\n"
+PAR_NEW = "2017-07-27T18:01:{:06.3f}+0000: 2.346: [GC (Allocation Failure) 2.346: [ParNew: 76034K->8704K(78656K), " \
+          "0.0312710 secs] {}K->{}K(253440K), 0.0313630 secs] [Times: user=0.09 sys=0.01, real=0.03 secs]\n"
+
+
+def processor_series(paths):
+    # What GCEventProcessor sends for the same logs, by metric and tags
+    stats = Mock()
+    processor = GCEventProcessor("localhost", "1234", None, stats=stats)
+    backfill(paths, processor, workers=1)
+    sent = defaultdict(list)
+    for sent_call in stats.timing.call_args_list + stats.histogram.call_args_list:
+        sent[(sent_call[0][0], tuple(sent_call[1]["tags"] or ()))].append(sent_call[0][1])
+    return sent
+
+
+def report_series(paths, **kwargs):
+    series = compute_series(load_columns(paths, **kwargs))
+    return {(metric, tuple(tags)): list(values) for metric, tags, values in series}
+
+
+@pytest.mark.parametrize("generate", [generate_gc_log, generate_unified_gc_log])
+def test_matches_processor(tmpdir, generate):
+    paths = []
+    for index in range(2):
+        log = tmpdir.join("gc.log.{}".format(index))
+        log.write("\n".join(line.rstrip("\n") for line in generate(300, seed=index)) + "\n")
+        paths.append(str(log))
+
+    expected = processor_series(paths)
+    reported = report_series(paths, workers=1, chunk_bytes=4096)
+    assert len(expected) > 5
+    for key, values in expected.items():
+        assert reported[key] == pytest.approx(values), key
+    assert set(reported) - set(expected) <= {("garbagedog_old_gen_after_full_gc", ())}
+
+
+def test_old_gen_after_full_gc(tmpdir):
+    log = tmpdir.join("gc.log")
+    log.write("".join([
+        PAR_NEW.format(1.0, 100000, 40000),
+        # Only the last full GC before a young collection counts
+        FULL_GC.format(2.0, 90000, 70000, 70000),
+        FULL_GC.format(3.0, 70000, 30000, 30000),
+        PAR_NEW.format(4.0, 106034, 40000),
+        FULL_GC.format(5.0, 60000, 35000, 35000),
+    ]))
+
+    series = report_series([str(log)], workers=1)
+    # The heap less the young generation before the young collection that follows
+    assert series[("garbagedog_old_gen_after_full_gc", ())] == [106034 - 76034]
+    assert series[("garbagedog_time_between_old_gc", ())] == pytest.approx([1.0, 2.0])
+
+
+def test_write_report():
+    series = [("garbagedog_gc_event_duration", ["stw:True", "event_type:ParNew"], numpy.arange(1, 101) / 1000.0),
+              ("garbagedog_promotion_rate_histogram", [], numpy.array([]))]
+    rows = summarize(series, percentiles=(50, 99))
+    assert len(rows) == 1
+    assert rows[0]["count"] == 100
+    assert rows[0]["max"] == pytest.approx(0.1)
+    assert rows[0]["p50"] == pytest.approx(0.0505)
+
+    out = io.StringIO()
+    write_report(rows, out, "json", percentiles=(50, 99))
+    assert json.loads(out.getvalue()) == rows
+
+    out = io.StringIO()
+    write_report(rows, out, "csv", percentiles=(50, 99))
+    header, row = list(csv.reader(io.StringIO(out.getvalue())))
+    assert header == ["metric", "tags", "count", "mean", "p50", "p99", "max"]
+    assert row[:3] == ["garbagedog_gc_event_duration", "stw:True,event_type:ParNew", "100"]
+
+    out = io.StringIO()
+    write_report(rows, out, "text", percentiles=(50, 99))
+    assert out.getvalue().splitlines()[1].split()[:3] == ["garbagedog_gc_event_duration", "stw:True,event_type:ParNew",
+                                                          "100"]
+    with pytest.raises(ValueError):
+        write_report(rows, out, "xml")
@@ -0,0 +1,99 @@
+import time
+
+from mock import call, Mock
+
+from garbagedog.constants import GCEventType, GCSizeInfo
+from garbagedog.event_processor import GCEventProcessor
+from garbagedog.formats import FORMAT_JDK8, FORMAT_UNIFIED
+from garbagedog.parser import GCEvent, RecordAssembler, GENERATION_MINOR, GENERATION_NONE
+from garbagedog.self_metrics import SelfMetrics
+
+SIZES = GCSizeInfo(100, 10, 200, 1000, 910, 2000)
+
+
+def test_flush_sends_differences():
+    stats = Mock()
+    self_metrics = SelfMetrics(stats, tags=["app:foo"])
+    self_metrics.lines += 5
+    self_metrics.count_record(GCEvent(time.time() - 2, GCEventType.PAR_NEW, 0.01, GENERATION_MINOR, None, None, *SIZES), 0.001)
+    self_metrics.count_record(GCEvent(None, GCEventType.UNKNOWN, 0.02, GENERATION_NONE), 0.003)
+    self_metrics.count_record(None, 0.002)
+
+    self_metrics.flush()
+
+    stats.increment.assert_has_calls([
+        call("garbagedog_self_lines", 5, tags=["app:foo"]),
+        call("garbagedog_self_records", 3, tags=["app:foo"]),
+        call("garbagedog_self_records_without_times", 1, tags=["app:foo"]),
+        call("garbagedog_self_records_without_sizes", 2, tags=["app:foo"]),
+        call("garbagedog_self_unknown_events", 1, tags=["app:foo"]),
+    ])
+    gauges = {gauge_call[0][0]: gauge_call[0][1] for gauge_call in stats.gauge.call_args_list}
+    assert abs(gauges["garbagedog_self_parse_time_avg"] - 0.002) < 1e-9
+    assert 2 <= gauges["garbagedog_self_record_age_max"] < 3
+
+    stats.reset_mock()
+    self_metrics.lines += 1
+    self_metrics.flush()
+
+    stats.increment.assert_any_call("garbagedog_self_lines", 1, tags=["app:foo"])
+    stats.increment.assert_any_call("garbagedog_self_records", 0, tags=["app:foo"])
+    assert not stats.gauge.called
+
+
+def test_flush_samples_assembler_and_log_handler():
+    stats = Mock()
+    self_metrics = SelfMetrics(stats)
+    self_metrics.assembler = RecordAssembler(max_record_length=10)
+    self_metrics.assembler.add_line("2017-07-27T18:01:22.406+0000: 1.021: [GC")
+    self_metrics.assembler.add_line("2017-07-27T18:01:23.406+0000: 2.021: [GC")
+    self_metrics.log_handler = Mock()
+    self_metrics.log_handler.bytes_behind.return_value = 4096
+
+    self_metrics.flush()
+
+    stats.increment.assert_any_call("garbagedog_self_truncated_records", 1, tags=None)
+    stats.gauge.assert_any_call("garbagedog_self_bytes_behind", 4096, tags=None)
+
+
+def test_truncated_records_survive_a_new_assembler():
+    stats = Mock()
+    self_metrics = SelfMetrics(stats)
+    self_metrics.assembler = RecordAssembler(max_record_length=10)
+    self_metrics.assembler.add_line("2017-07-27T18:01:22.406+0000: 1.021: [GC")
+    self_metrics.assembler.add_line("2017-07-27T18:01:23.406+0000: 2.021: [GC")
+    self_metrics.flush()
+
+    # As when the processor learns the log format and replaces its parser
+    self_metrics.assembler.add_line("2017-07-27T18:01:24.406+0000: 3.021: [GC")
+    self_metrics.assembler = RecordAssembler(max_record_length=10)
+    stats.reset_mock()
+    self_metrics.flush()
+    stats.increment.assert_any_call("garbagedog_self_truncated_records", 1, tags=None)
+
+    stats.reset_mock()
+    self_metrics.flush()
+    stats.increment.assert_any_call("garbagedog_self_truncated_records", 0, tags=None)
+
+
+def test_processor_switching_format_between_flushes():
+    stats = Mock()
+    gc_event_processor = GCEventProcessor("localhost", "1234", None, stats=stats, self_metrics_interval=3600,
+                                          log_format=FORMAT_JDK8)
+    gc_event_processor.log_parser.truncated_records = 2
+    gc_event_processor.self_metrics.flush()
+    gc_event_processor.set_log_format(FORMAT_UNIFIED)
+    stats.reset_mock()
+    gc_event_processor.close()
+
+    stats.increment.assert_any_call("garbagedog_self_truncated_records", 0, tags=None)
+
+
+def test_stop_flushes():
+    stats = Mock()
+    self_metrics = SelfMetrics(stats, flush_interval=3600)
+    self_metrics.start()
+    self_metrics.lines += 2
+    self_metrics.stop()
+
+    stats.increment.assert_any_call("garbagedog_self_lines", 2, tags=None)
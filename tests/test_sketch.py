@@ -0,0 +1,57 @@
+import math
+import random
+
+import pytest
+
+from garbagedog.sketch import DDSketch
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+@pytest.mark.parametrize("q", [0.0, 0.5, 0.9, 0.95, 0.99, 1.0])
+def test_quantile_relative_accuracy(q):
+    rng = random.Random(42)
+    values = [rng.lognormvariate(-3, 1.5) for _ in range(20000)]
+    sketch = DDSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    expected = exact_quantile(values, q)
+    assert abs(sketch.quantile(q) - expected) <= 0.01 * expected
+    assert sketch.count == len(values)
+    assert sketch.sum == pytest.approx(sum(values))
+
+def test_zero_and_empty():
+    sketch = DDSketch()
+    assert math.isnan(sketch.quantile(0.5))
+
+    for value in [0.0, 0.0, 0.0, 5.0]:
+        sketch.add(value)
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == pytest.approx(5.0, rel=0.01)
+
+def test_merge():
+    rng = random.Random(7)
+    values = [rng.expovariate(10) for _ in range(5000)]
+    first, second, whole = DDSketch(), DDSketch(), DDSketch()
+    for i, value in enumerate(values):
+        (first if i % 2 else second).add(value)
+        whole.add(value)
+
+    first.merge(second)
+    assert first.bins == whole.bins
+    assert first.quantile(0.99) == whole.quantile(0.99)
+
+    with pytest.raises(ValueError):
+        first.merge(DDSketch(relative_accuracy=0.05))
+
+def test_max_bins_bounds_memory():
+    sketch = DDSketch(max_bins=64)
+    for exponent in range(-200, 200):
+        sketch.add(1.1 ** exponent)
+
+    assert len(sketch.bins) == 64
+    # Collapsing only loses accuracy on the smallest values
+    assert sketch.quantile(0.99) == pytest.approx(exact_quantile([1.1 ** e for e in range(-200, 200)], 0.99), rel=0.01)
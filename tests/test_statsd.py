@@ -0,0 +1,109 @@
+import socket
+
+import pytest
+from datadog.dogstatsd.base import DogStatsd
+
+from garbagedog.event_processor import GCEventProcessor
+from garbagedog.statsd import BufferedStatsd
+
+# Fewer than net.unix.max_dgram_qlen, so the sink never has to be read while sending
+METRICS = 8
+
+
+class StatsdSink(object):
+    """Local dogstatsd unix socket, counting the datagrams (one per send syscall) and metrics it receives"""
+
+    def __init__(self, path):
+        self.path = path
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.socket.bind(path)
+        self.socket.setblocking(False)
+        self.packets = []
+
+    def receive(self):
+        while True:
+            try:
+                self.packets.append(self.socket.recv(65536).decode("utf-8"))
+            except BlockingIOError:
+                # DogStatsd ends each packet with a newline
+                return [metric for packet in self.packets for metric in packet.split("\n") if metric]
+
+    def close(self):
+        self.socket.close()
+
+
+@pytest.fixture
+def sink(tmpdir):
+    statsd_sink = StatsdSink(str(tmpdir.join("dsd.socket")))
+    yield statsd_sink
+    statsd_sink.close()
+
+
+def send_metrics(stats):
+    for i in range(METRICS):
+        stats.timing("garbagedog_gc_event_duration", 0.5, tags=["stw:True", "event_type:ParNew"])
+    stats.histogram("garbagedog_allocation_rate_histogram", 1024)
+    stats.increment("garbagedog_self_lines", 3)
+
+
+def test_packs_metrics_into_one_datagram(sink):
+    unbuffered = DogStatsd(socket_path=sink.path, constant_tags=["app:foo"])
+    send_metrics(unbuffered)
+    unbuffered_metrics = sink.receive()
+    assert len(sink.packets) == METRICS + 2
+
+    sink.packets = []
+    buffered = BufferedStatsd(socket_path=sink.path, constant_tags=["app:foo"])
+    send_metrics(buffered)
+    assert sink.receive() == []
+    buffered.flush()
+
+    # Byte for byte what DogStatsd sends
+    assert sink.receive() == unbuffered_metrics
+    assert len(sink.packets) == 1
+    assert buffered.packets == 1
+    assert unbuffered_metrics[0] == "garbagedog_gc_event_duration:0.5|ms|#stw:True,event_type:ParNew,app:foo"
+    assert unbuffered_metrics[-1] == "garbagedog_self_lines:3|c|#app:foo"
+
+
+def test_flushes_when_full(sink):
+    buffered = BufferedStatsd(socket_path=sink.path, max_packet_size=200)
+    send_metrics(buffered)
+    buffered.stop()
+
+    metrics = sink.receive()
+    assert len(metrics) == METRICS + 2
+    assert 1 < len(sink.packets) < METRICS
+    assert all(len(packet) <= 200 for packet in sink.packets)
+
+
+def test_counts_dropped_packets(tmpdir):
+    buffered = BufferedStatsd(socket_path=str(tmpdir.join("missing.socket")))
+    buffered.gauge("garbagedog_something", 1)
+    buffered.flush()
+    assert buffered.packets == 0
+    assert buffered.dropped_packets == 1
+
+
+def test_event(sink):
+    buffered = BufferedStatsd(socket_path=sink.path, constant_tags=["app:foo"])
+    buffered.event("Full GC", "two\nlines", alert_type="warning", tags=["env:prod"])
+    buffered.flush()
+    assert sink.receive() == ["_e{7,10}:Full GC|two\\nlines|t:warning|#env:prod,app:foo"]
+
+
+def test_processor_max_packet_size(sink):
+    log_line = "2015-05-26T14:45:{:02d}.987-0200: 151.126: [GC (Allocation Failure) 151.126: " \
+               "[DefNew: 629119K->69888K(629120K), 0.0584157 secs] 1619346K->1273247K(2027264K), " \
+               "0.0585007 secs] [Times: user=0.06 sys=0.00, real=0.06 secs]"
+
+    gc_event_processor = GCEventProcessor("localhost", "1234", ["app:foo"], dogstatsd_socket=sink.path,
+                                          max_packet_size=8192, packet_flush_interval=3600)
+    for second in range(METRICS):
+        gc_event_processor._process_line(log_line.format(second))
+    gc_event_processor._process_line("2015-05-26T14:46:00.987-0200: next")
+    gc_event_processor.close()
+
+    metrics = sink.receive()
+    assert len(sink.packets) == 1
+    assert metrics.count("garbagedog_gc_event_duration:0.06|ms|#stw:True,event_type:DefNew,app:foo") == METRICS
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+import pytest
+
+from garbagedog.constants import TIMEFORMAT
+from garbagedog.timestamps import TimestampDecoder
+
+
+@pytest.mark.parametrize("timestamp", [
+    "2012-04-04T19:08:23.054+0000",
+    "2015-05-26T14:45:37.987-0200",
+    "2016-02-29T23:59:59.999+0530",
+    "1999-12-31T00:00:00.000-1130",
+])
+def test_decode_matches_strptime(timestamp):
+    expected = datetime.strptime(timestamp, TIMEFORMAT).timestamp()
+    assert TimestampDecoder().decode(timestamp) == pytest.approx(expected, abs=1e-6)
+
+def test_decode_uses_cached_hour():
+    decoder = TimestampDecoder()
+    first = decoder.decode("2012-04-04T19:08:23.054+0000")
+    second = decoder.decode("2012-04-04T19:09:24.055+0000")
+    assert second - first == pytest.approx(61.001)
+
+    # Same hour in a different timezone must not reuse the cache
+    assert decoder.decode("2012-04-04T19:09:24.055-0100") - second == pytest.approx(3600)
+
+def test_decode_out_of_range():
+    decoder = TimestampDecoder()
+    with pytest.raises(ValueError):
+        decoder.decode("2012-13-04T19:08:23.054+0000")
+    with pytest.raises(ValueError):
+        decoder.decode("2012-04-04T19:68:23.054+0000")
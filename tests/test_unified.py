@@ -0,0 +1,175 @@
+import json
+
+import pytest
+from mock import Mock
+
+from garbagedog.constants import GCEventType, GCSizeInfo
+from garbagedog.event_processor import GCEventProcessor
+from garbagedog.formats import FORMAT_JDK8, FORMAT_UNIFIED, create_log_parser, sniff_format, sniff_lines
+from garbagedog.parser import GENERATION_NONE, GENERATION_MINOR, GENERATION_MAJOR
+from garbagedog.unified import UnifiedLogParser
+
+DECORATIONS = "[2020-01-01T12:00:{:06.3f}+0000][{:.3f}s][info][{:<12}] "
+
+G1_YOUNG_PAUSE = [
+    ("gc,start", "GC(3) Pause Young (Normal) (G1 Evacuation Pause)"),
+    ("gc,task", "GC(3) Using 4 workers of 4 for evacuation"),
+    ("gc,heap", "GC(3) Eden regions: 24->0(21)"),
+    ("gc,heap", "GC(3) Survivor regions: 2->3(3)"),
+    ("gc,heap", "GC(3) Old regions: 10->11"),
+    ("gc,heap", "GC(3) Humongous regions: 0->0"),
+    ("gc", "GC(3) Pause Young (Normal) (G1 Evacuation Pause) 36M->14M(256M) 11.500ms"),
+    ("gc,cpu", "GC(3) User=0.02s Sys=0.00s Real=0.01s"),
+]
+
+
+def unified_lines(messages, seconds=1.0):
+    return [DECORATIONS.format(seconds + index * 0.01, seconds + index * 0.01, tags) + message
+            for index, (tags, message) in enumerate(messages)]
+
+
+def parse_lines(lines, log_parser=None):
+    log_parser = log_parser or UnifiedLogParser()
+    records = [log_parser.add_line(line) for line in lines]
+    return [record for record in (log_parser.parse(record) for record in records if record) if record]
+
+
+def test_g1_young_pause():
+    records = parse_lines(unified_lines([("gc,init", "Heap Region Size: 2M"), ("gc", "Using G1")] + G1_YOUNG_PAUSE))
+
+    assert len(records) == 1
+    record = records[0]
+    assert record.event_type == GCEventType.G1_YOUNG
+    assert record.generation == GENERATION_MINOR
+    assert record.duration == pytest.approx(0.0115)
+    assert record.timestamp == pytest.approx(1577880001.07)
+    assert record.size_info == GCSizeInfo(young_begin_k=26 * 2048, young_end_k=3 * 2048, young_total_k=24 * 2048,
+                                          whole_heap_begin_k=36 * 1024, whole_heap_end_k=14 * 1024,
+                                          whole_heap_total_k=256 * 1024)
+
+
+def test_starting_mid_log():
+    # 36M used in 36 regions before the pause, so 1M regions
+    log_parser = UnifiedLogParser()
+    records = parse_lines(unified_lines(G1_YOUNG_PAUSE), log_parser)
+
+    assert log_parser.collector == "G1"
+    assert log_parser.region_k == 1024
+    assert records[0].event_type == GCEventType.G1_YOUNG
+    assert records[0].size_info.young_begin_k == 26 * 1024
+
+    # Mostly full 2M regions
+    log_parser = UnifiedLogParser()
+    parse_lines(unified_lines([(tags, message.replace("36M->", "65M->")) for tags, message in G1_YOUNG_PAUSE]),
+                log_parser)
+    assert log_parser.region_k == 2048
+
+
+def test_logged_region_size_is_kept():
+    log_parser = UnifiedLogParser()
+    log_parser.restore_state({"collector": "G1", "region_k": 4096})
+    records = parse_lines(unified_lines(G1_YOUNG_PAUSE), log_parser)
+
+    assert log_parser.get_state() == {"collector": "G1", "region_k": 4096}
+    assert records[0].size_info.young_begin_k == 26 * 4096
+
+
+@pytest.mark.parametrize("message, event_type, generation", [
+    ("GC(4) Pause Young (Mixed) (G1 Evacuation Pause) 40M->20M(256M) 8.000ms", GCEventType.G1_MIXED,
+     GENERATION_MINOR),
+    ("GC(4) Pause Young (Concurrent Start) (G1 Humongous Allocation) 40M->20M(256M) 8.000ms", GCEventType.G1_YOUNG,
+     GENERATION_MINOR),
+    ("GC(4) Pause Initial Mark (G1 Humongous Allocation) 40M->20M(256M) 8.000ms", GCEventType.G1_YOUNG,
+     GENERATION_MINOR),
+    ("GC(5) Pause Remark 60M->60M(256M) 2.000ms", GCEventType.G1_REMARK, GENERATION_NONE),
+    ("GC(5) Pause Cleanup 60M->60M(256M) 0.100ms", GCEventType.G1_CLEANUP, GENERATION_NONE),
+    ("GC(5) Concurrent Cycle 85.200ms", GCEventType.G1_CONCURRENT_CYCLE, GENERATION_NONE),
+    ("GC(5) Concurrent Mark Cycle", None, GENERATION_MAJOR),
+    ("GC(6) Pause Full (G1 Compaction Pause) 250M->100M(256M) 300.000ms", GCEventType.FULL_GC, GENERATION_MAJOR),
+])
+def test_g1_events(message, event_type, generation):
+    records = parse_lines(unified_lines([("gc", "Using G1"), ("gc", message)]))
+
+    assert [(record.event_type, record.generation) for record in records] == [(event_type, generation)]
+
+
+def test_pause_start_is_not_counted():
+    assert parse_lines(unified_lines([("gc", "Using G1"), ("gc", "GC(5) Pause Remark")])) == []
+
+
+@pytest.mark.parametrize("using", [[("gc", "Using Parallel")], []])
+def test_parallel_young_pause(using):
+    records = parse_lines(unified_lines(using + [
+        ("gc,heap", "GC(0) PSYoungGen: 65536K->10720K(76288K)"),
+        ("gc,heap", "GC(0) ParOldGen: 0K->16K(175104K)"),
+        ("gc", "GC(0) Pause Young (Allocation Failure) 64M->10M(245M) 9.872ms"),
+    ]))
+
+    assert len(records) == 1
+    assert records[0].event_type == GCEventType.PS_YOUNG_GEN
+    assert records[0].size_info == GCSizeInfo(65536, 10720, 76288, 64 * 1024, 10 * 1024, 245 * 1024)
+
+
+@pytest.mark.parametrize("message, stopped_time, safepoint_time", [
+    ("Total time for which application threads were stopped: 0.0114000 seconds, Stopping threads took: "
+     "0.0000600 seconds", 0.0114, 0.00006),
+    ("Safepoint \"G1CollectForAllocation\", Time since last: 621760889 ns, Reaching safepoint: 61200 ns, "
+     "At safepoint: 11400000 ns, Total: 11461200 ns", 0.0114612, 0.0000612),
+])
+def test_safepoint(message, stopped_time, safepoint_time):
+    records = parse_lines(unified_lines([("safepoint", message)]))
+
+    assert len(records) == 1
+    assert records[0].stopped_time == pytest.approx(stopped_time)
+    assert records[0].safepoint_time == pytest.approx(safepoint_time)
+
+
+def test_without_time_decoration():
+    lines = ["[1.234s][info][gc,heap] GC(0) Eden regions: 24->0(21)",
+             "[1.234s][info][gc] GC(0) Pause Young (Normal) (G1 Evacuation Pause) 24M->3M(256M) 11.234ms",
+             "[1.240s][info][gc] GC(1) Concurrent Cycle"]
+    log_parser = UnifiedLogParser()
+    log_parser.collector = "G1"
+    records = parse_lines(lines, log_parser)
+
+    assert len(records) == 1
+    assert records[0].timestamp is None
+    assert records[0].event_type == GCEventType.G1_YOUNG
+    assert records[0].size_info is None
+
+
+def test_sniff_format():
+    assert sniff_format("[2020-01-01T12:00:00.000+0000][0.010s][info][gc] Using G1") == FORMAT_UNIFIED
+    assert sniff_format("[0.010s][info][gc] Using G1") == FORMAT_UNIFIED
+    assert sniff_format("2017-07-27T18:01:22.406+0000: 1.021: [GC (Allocation Failure) ") == FORMAT_JDK8
+    assert sniff_format("Java HotSpot(TM) 64-Bit Server VM (25.131-b11) for linux-amd64 JRE") is None
+    assert sniff_format("[Times: user=0.09 sys=0.01, real=0.03 secs]") is None
+
+    assert sniff_lines(["CommandLine flags: -XX:+PrintGCDetails", "[0.010s][info][gc] Using G1"]) == FORMAT_UNIFIED
+    assert sniff_lines(["CommandLine flags: -XX:+PrintGCDetails"]) == FORMAT_JDK8
+    with pytest.raises(ValueError):
+        create_log_parser("jdk7")
+
+
+def test_processor_sniffs_unified_logs():
+    stats = Mock()
+    processor = GCEventProcessor("localhost", "1234", None, stats=stats)
+    for line in unified_lines([("gc,init", "Heap Region Size: 1M"), ("gc", "Using G1")] + G1_YOUNG_PAUSE):
+        processor._process_line(line)
+
+    assert processor.log_format == FORMAT_UNIFIED
+    stats.timing.assert_called_once_with("garbagedog_gc_event_duration", pytest.approx(0.0115),
+                                         tags=["stw:True", "event_type:G1_young"])
+    assert processor.last_sized_event.young_begin_k == 26 * 1024
+
+
+def test_processor_state_keeps_region_size():
+    processor = GCEventProcessor("localhost", "1234", None, stats=Mock())
+    for line in unified_lines([("gc,init", "Heap Region Size: 4M"), ("gc", "Using G1")]):
+        processor._process_line(line)
+
+    restored = GCEventProcessor("localhost", "1234", None, stats=Mock())
+    restored.restore_state(json.loads(json.dumps(processor.get_state())))
+    for line in unified_lines(G1_YOUNG_PAUSE):
+        restored._process_line(line)
+    assert restored.last_sized_event.young_begin_k == 26 * 4096
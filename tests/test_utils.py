@@ -1,6 +1,7 @@
 import datetime
 import os
 import pytest
+import threading
 import time
 
 from garbagedog.constants import GCEventType, GCSizeInfo
@@ -51,13 +52,13 @@ def test_gc_log_handler(tmpdir):
 
     with GCLogHandler(os.path.join(str(tmpdir), "logs/")) as gc_log_handler:
         log_line_generator = gc_log_handler.get_log_lines()
-        gc_log.write("hello world")
+        gc_log.write("hello world\n")
         line = next(log_line_generator)
-        assert line == "hello world"
+        assert line == "hello world\n"
 
-        gc_log.write("foo", mode="a")
+        gc_log.write("foo\n", mode="a")
         line = next(log_line_generator)
-        assert line == "foo"
+        assert line == "foo\n"
 
 def test_gc_log_handler_newest_log(tmpdir):
 
@@ -69,7 +70,191 @@ def test_gc_log_handler_newest_log(tmpdir):
     gc_log_2.write("")
 
     with GCLogHandler(os.path.join(str(tmpdir), "logs/")) as gc_log_handler:
-        gc_log.write("foo")
-        gc_log_2.write("bar")
+        gc_log.write("foo\n")
+        gc_log_2.write("bar\n")
         line = next(gc_log_handler.get_log_lines())
-        assert line == "bar"
+        assert line == "bar\n"
+
+def test_gc_log_handler_polling(tmpdir):
+
+    gc_log = tmpdir.mkdir("logs").join("gc.log.1")
+    gc_log.write("")
+
+    with GCLogHandler(os.path.join(str(tmpdir), "logs/"), use_inotify=False) as gc_log_handler:
+        assert gc_log_handler.watcher is None
+        log_line_generator = gc_log_handler.get_log_lines()
+        gc_log.write("hello world\n")
+        line = next(log_line_generator)
+        assert line == "hello world\n"
+
+def test_gc_log_handler_partial_line(tmpdir):
+
+    log_dir = tmpdir.mkdir("logs")
+    gc_log = log_dir.join("gc.log")
+    gc_log.write("")
+
+    with GCLogHandler(str(log_dir), use_inotify=False, sleep_seconds=0) as gc_log_handler:
+        # The JVM writes the start of a record before the pause and the rest after it
+        gc_log.write("[ParNew: 30", mode="a")
+        assert list(gc_log_handler.read_available_lines()) == []
+        assert gc_log_handler.offset == 0
+
+        gc_log.write("0K->210K(1000K)]\n", mode="a")
+        assert list(gc_log_handler.read_available_lines()) == ["[ParNew: 300K->210K(1000K)]\n"]
+        assert gc_log_handler.offset == len("[ParNew: 300K->210K(1000K)]\n")
+
+def test_gc_log_handler_rotated_partial_line(tmpdir):
+
+    log_dir = tmpdir.mkdir("logs")
+    gc_log = log_dir.join("gc.log.0.current")
+    gc_log.write("")
+
+    with GCLogHandler(str(log_dir), use_inotify=False, sleep_seconds=0) as gc_log_handler:
+        gc_log.write("unfinished", mode="a")
+        assert list(gc_log_handler.read_available_lines()) == []
+
+        gc_log.rename(log_dir.join("gc.log.0"))
+        gc_log_2 = log_dir.join("gc.log.1.current")
+        gc_log_2.write("next\n")
+        os.utime(str(gc_log_2), (time.time() + 1, time.time() + 1))
+        assert list(gc_log_handler.read_available_lines()) == ["unfinished", "next\n"]
+
+def test_gc_log_handler_inotify_rotation(tmpdir):
+
+    log_dir = tmpdir.mkdir("logs")
+    gc_log = log_dir.join("gc.log.1")
+    gc_log.write("")
+
+    with GCLogHandler(str(log_dir), sleep_seconds=60) as gc_log_handler:
+        if gc_log_handler.watcher is None:
+            pytest.skip("inotify not available")
+        log_line_generator = gc_log_handler.get_log_lines()
+        gc_log.write("foo\n", mode="a")
+        assert next(log_line_generator) == "foo\n"
+
+        # A new log file wakes the handler up without waiting for refresh_logfiles_seconds
+        gc_log_2 = log_dir.join("gc.log.2")
+        threading.Timer(0.2, gc_log_2.write, args=("",)).start()
+        threading.Timer(0.5, gc_log_2.write, args=("bar\n",), kwargs={"mode": "a"}).start()
+        start = time.time()
+        assert next(log_line_generator) == "bar\n"
+        assert time.time() - start < 5
+
+def test_gc_log_handler_drains_rotated_log(tmpdir):
+
+    log_dir = tmpdir.mkdir("logs")
+    gc_log = log_dir.join("gc.log.0.current")
+    gc_log.write("")
+
+    with GCLogHandler(str(log_dir), use_inotify=False, sleep_seconds=0) as gc_log_handler:
+        log_line_generator = gc_log_handler.get_log_lines()
+        gc_log.write("one\n", mode="a")
+        assert next(log_line_generator) == "one\n"
+
+        # The JVM writes the tail of the old file, renames it away and starts a new one
+        gc_log.write("two\n", mode="a")
+        gc_log.rename(log_dir.join("gc.log.0"))
+        gc_log_2 = log_dir.join("gc.log.1.current")
+        gc_log_2.write("three\n")
+        os.utime(str(gc_log_2), (time.time() + 1, time.time() + 1))
+
+        assert next(log_line_generator) == "two\n"
+        assert next(log_line_generator) == "three\n"
+        assert gc_log_handler.log_path == str(gc_log_2)
+        assert gc_log_handler.offset == len("three\n")
+
+def test_gc_log_handler_follows_renamed_log(tmpdir):
+
+    log_dir = tmpdir.mkdir("logs")
+    gc_log = log_dir.join("gc.log.0.current")
+    gc_log.write("")
+
+    with GCLogHandler(str(log_dir), use_inotify=False, sleep_seconds=0) as gc_log_handler:
+        log_line_generator = gc_log_handler.get_log_lines()
+        identity = gc_log_handler.file_identity
+        gc_log.rename(log_dir.join("gc.log.0"))
+        log_dir.join("gc.log.0").write("one\n", mode="a")
+
+        assert next(log_line_generator) == "one\n"
+        assert gc_log_handler.file_identity == identity
+
+def test_gc_log_handler_truncated_log(tmpdir):
+
+    log_dir = tmpdir.mkdir("logs")
+    gc_log = log_dir.join("gc.log")
+    gc_log.write("")
+
+    with GCLogHandler(str(log_dir), use_inotify=False, sleep_seconds=0) as gc_log_handler:
+        log_line_generator = gc_log_handler.get_log_lines()
+        gc_log.write("a long first line\n", mode="a")
+        assert next(log_line_generator) == "a long first line\n"
+
+        with open(str(gc_log), "r+") as log_file:
+            log_file.truncate(0)
+        gc_log.write("short\n", mode="a")
+        assert next(log_line_generator) == "short\n"
+
+def test_gc_log_handler_bytes_behind(tmpdir):
+
+    log_dir = tmpdir.mkdir("logs")
+    gc_log = log_dir.join("gc.log")
+    gc_log.write("")
+
+    with GCLogHandler(str(log_dir), use_inotify=False, sleep_seconds=0) as gc_log_handler:
+        log_line_generator = gc_log_handler.get_log_lines()
+        gc_log.write("one\ntwo\n", mode="a")
+        assert next(log_line_generator) == "one\n"
+        assert gc_log_handler.bytes_behind() == len("two\n")
+        assert next(log_line_generator) == "two\n"
+        assert gc_log_handler.bytes_behind() == 0
+
+def test_gc_log_handler_resume(tmpdir):
+
+    log_dir = tmpdir.mkdir("logs")
+    gc_log = log_dir.join("gc.log.0")
+    gc_log.write("one\ntwo\n")
+    stat = os.stat(str(gc_log))
+
+    # Rotated away while we were down, and a newer file exists
+    gc_log.rename(log_dir.join("gc.log.0.old"))
+    log_dir.join("gc.log.1").write("three\n")
+    os.utime(str(log_dir.join("gc.log.1")), (time.time() + 1, time.time() + 1))
+
+    resume_position = (stat.st_dev, stat.st_ino, len("one\n"))
+    with GCLogHandler(str(log_dir), use_inotify=False, sleep_seconds=0,
+                      resume_position=resume_position) as gc_log_handler:
+        assert gc_log_handler.resumed
+        log_line_generator = gc_log_handler.get_log_lines()
+        assert next(log_line_generator) == "two\n"
+        assert next(log_line_generator) == "three\n"
+
+def test_gc_log_handler_resume_catchup_window(tmpdir):
+
+    log_dir = tmpdir.mkdir("logs")
+    gc_log = log_dir.join("gc.log")
+    gc_log.write("one\ntwo\nthree\n")
+    stat = os.stat(str(gc_log))
+
+    with GCLogHandler(str(log_dir), use_inotify=False, sleep_seconds=0, resume_position=(stat.st_dev, stat.st_ino, 0),
+                      max_catchup_bytes=len("o\nthree\n")) as gc_log_handler:
+        assert not gc_log_handler.resumed
+        assert next(gc_log_handler.get_log_lines()) == "three\n"
+
+def test_gc_log_handler_resume_missing_file(tmpdir):
+
+    log_dir = tmpdir.mkdir("logs")
+    log_dir.join("gc.log").write("old\n")
+
+    with GCLogHandler(str(log_dir), use_inotify=False, resume_position=(0, 0, 0)) as gc_log_handler:
+        assert not gc_log_handler.resumed
+        assert gc_log_handler.offset == len("old\n")
+
+def test_parse_line_for_sizes_timezone_offset():
+    log_line = "2015-05-26T14:45:37.987-0200: 151.126: [GC (Allocation Failure) 151.126: " \
+               "[DefNew: 629119K->69888K(629120K), 0.0584157 secs] 1619346K->1273247K(2027264K), " \
+               "0.0585007 secs] [Times: user=0.06 sys=0.00, real=0.06 secs]"
+
+    timestamp, size_info = parse_line_for_sizes(log_line)
+    assert timestamp == datetime.datetime(2015, 5, 26, 16, 45, 37, 987000, tzinfo=datetime.timezone.utc)
+    assert size_info.young_begin_k == 629119
+    assert size_info.whole_heap_total_k == 2027264